@@ -1,22 +1,377 @@
 import streamlit as st
+import os
+import json
 import re
 from collections import defaultdict
-from modules.GetSpeakers import *
-from modules.PAGE2EzDrama import *
-from modules.DraCorParser import Parser
-import math
+from modules.GetSpeakers import compute_similarity
+from modules.TextStages import find_speaker_lines, extract_bracket_contents, find_speakers, text_to_lines
+from modules.Dehyphenation import WordList
+from modules.EzLines import EzLines, ezlines_path
+from modules.Ingestion import Ingestion, INGEST_STAGE
+from modules.PageCache import PageCache
+from modules.Pipeline import build_pipeline, Pages, MemoryStore, DiskStore
+from modules.PageSource import count_pages
+from modules.Provenance import LineMap, line_sources
+from modules.Workspace import Workspace, StageBuffers, STAGE_FILES, atomic_write_bytes, atomic_write_stream
+from modules.Janitor import janitor_from_env
+from modules.Jobs import JobRunner, DONE, FAILED
+from modules.Metrics import RunMetrics, REPORT_FILENAME
+from modules.Profiling import StageProfiler, profiling_enabled_from_env, PROFILE_DIRNAME
 import io, zipfile, uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Der Parser (bs4, transliterate, yiddish) wird erst beim ersten Lauf von Schritt 6
+# importiert, damit die App beim Kaltstart schneller die ersten Widgets anzeigt.
+
+@st.cache_resource
+def _start_janitor():
+    # ein Aufräum-Thread pro Server-Prozess für alle Sitzungen unter uploads/
+    return janitor_from_env("uploads")
+
+
+_start_janitor()
+
+
+@st.cache_resource
+def _job_runner():
+    # Hintergrund-Jobs gehören zum Server-Prozess und überleben Verbindungsabbrüche
+    return JobRunner(max_workers=int(os.environ.get("DRACOR_JOB_WORKERS", 2)))
+
+
+@st.cache_resource
+def _ingestion_pool():
+    # parst hochgeladene Seiten schon beim Import vorab (siehe modules/Ingestion.py)
+    return ThreadPoolExecutor(
+        max_workers=int(os.environ.get("DRACOR_INGEST_WORKERS", 2)), thread_name_prefix="ingest"
+    )
+
+
+# so lange wartet ein Klick auf einen neuen Job, bevor der Fortschritt angezeigt wird;
+# kurze Jobs sind dann schon fertig und erscheinen ohne Umweg über die Fortschrittsanzeige
+JOB_WAIT_SECONDS = 0.5
+JOB_POLL_SECONDS = 1.0
+
+# hochgeladene Wortliste für Schritt 5 im Arbeitsbereich
+WORD_LIST_FILENAME = "wordlist.txt"
+
+STAGE_LABELS = {
+    INGEST_STAGE: "Seiten parsen",
+    "preprocess": "Seiten lesen",
+    "speakers": "Sprecher übernehmen",
+    "ezdrama": "EzDrama erzeugen",
+    "tei": "TEI erzeugen",
+}
+
 if "session_dir" not in st.session_state:
     st.session_state.session_dir = Path("uploads") / str(uuid.uuid4())
-    st.session_state.session_dir.mkdir(parents=True, exist_ok=True)
 
 if "data_dir" not in st.session_state:
     st.session_state.data_dir = None
 
+if "jobs" not in st.session_state:
+    st.session_state.jobs = {}  # Art des Jobs -> Job-ID
+
 session_dir: Path = st.session_state.session_dir
 
+# Jede Sitzung arbeitet in ihrem eigenen Arbeitsbereich (pages/, output/, cache/),
+# damit gleichzeitige Nutzer sich nicht gegenseitig Dateien überschreiben.
+workspace = Workspace(session_dir)
+workspace.touch()
+
+# Arbeitsbereich wurde nach langer Inaktivität aufgeräumt
+if st.session_state.data_dir and not os.path.exists(st.session_state.data_dir):
+    st.session_state.data_dir = None
+
+# Zwischenstände und Pipeline-Ergebnisse bleiben im Speicher der Sitzung; auf die
+# Festplatte wird nur beim Export bzw. bei einem Sicherungspunkt geschrieben.
+if "stage_buffers" not in st.session_state:
+    st.session_state.stage_buffers = StageBuffers(workspace)
+if "pipeline_store" not in st.session_state:
+    st.session_state.pipeline_store = MemoryStore()
+if "run_metrics" not in st.session_state:
+    st.session_state.run_metrics = RunMetrics()
+
+buffers: StageBuffers = st.session_state.stage_buffers
+
+# Alle Schritte laufen über die Pipeline: Ergebnisse werden nach Inhalts-Hash der
+# Eingaben und Optionen gespeichert und bei unveränderten Eingaben wiederverwendet.
+profiling = st.sidebar.toggle(
+    "Profiling",
+    value=profiling_enabled_from_env(),
+    help="Profiliert jeden neu berechneten Schritt mit cProfile und tracemalloc (langsamer).",
+)
+profiler = StageProfiler(workspace.root / PROFILE_DIRNAME) if profiling else None
+
+# Ergebnisse pro Seite liegen auf der Festplatte des Arbeitsbereichs: Werden Seiten
+# nachträglich hinzugefügt oder ersetzt, parsen Preprocessing und Gesamtausgabe nur diese neu.
+page_cache = PageCache(DiskStore(workspace.cache_dir))
+pipeline = build_pipeline(
+    store=st.session_state.pipeline_store,
+    metrics=st.session_state.run_metrics,
+    profiler=profiler,
+    page_cache=page_cache,
+)
+
+# importierte Seiten werden sofort im Hintergrund vorab geparst (Ergebnisse im PageCache)
+if "ingestion" not in st.session_state:
+    st.session_state.ingestion = Ingestion(page_cache, _ingestion_pool())
+ingestion: Ingestion = st.session_state.ingestion
+
+
+def stage_text(stage_name, step_label):
+    """Zwischenstand aus dem Speicher; fehlt er, wird der Lauf mit einem Hinweis beendet."""
+    text = buffers.get(stage_name)
+    if text is None:
+        st.error(f"Noch kein Ergebnis aus {step_label}. Bitte zuerst diesen Schritt ausführen.")
+        st.stop()
+    return text
+
+
+def set_stage_result(stage_name, input_stage, input_text, results):
+    """
+    Übernimmt das Ergebnis eines Schritts aus pipeline.run_many([stage_name, stage_name + "_map"])
+    samt Zuordnung seiner Zeilen zu Schritt 1, sofern die Eingabe eine hat.
+    """
+    base = buffers.line_map(input_stage) if buffers.get(input_stage) == input_text else None
+    buffers.line_maps.pop(stage_name, None)
+    line_map = results[f"{stage_name}_map"].then(base) if base is not None else None
+    buffers.set(stage_name, results[stage_name], line_map=line_map)
+
+
+# höchstens so viele Treffer zeigt die Textsuche der Herkunftsanzeige
+PROVENANCE_MAX_MATCHES = 20
+
+
+def provenance_lookup(key_prefix, stage_name):
+    """
+    Zeigt zu einer Zeile (oder zu allen Zeilen mit einem Suchtext) des Zwischenstands,
+    aus welcher PAGE-Datei, TextRegion und TextLine sie stammt.
+    """
+    line_map = buffers.line_map(stage_name)
+    lines = buffers.lines(stage_name)
+    ezlines_file = ezlines_path(workspace.stage_path("ezdrama"))
+    if line_map is None or lines is None or len(line_map) != len(lines) or not os.path.exists(ezlines_file):
+        return
+
+    with st.expander("Herkunft in den PAGE-Dateien nachschlagen"):
+        c1, c2 = st.columns([1, 3])
+        with c1:
+            line_number = st.number_input(
+                "Zeile", min_value=1, max_value=max(len(lines), 1), value=1, step=1,
+                key=f"{key_prefix}provenance_line__{stage_name}",
+            )
+        with c2:
+            query = st.text_input(
+                "oder Text suchen (z. B. eine Stelle aus der TEI-Datei)",
+                key=f"{key_prefix}provenance_query__{stage_name}",
+            )
+        if query:
+            matches = [index for index, line in enumerate(lines) if query in line][:PROVENANCE_MAX_MATCHES]
+            if not matches:
+                st.info("Kein Treffer.")
+        else:
+            matches = [int(line_number) - 1] if lines else []
+
+        with EzLines.open(ezlines_file) as ezlines:
+            for index in matches:
+                st.markdown(f"**Zeile {index + 1}:** {lines[index].strip()[:200]}")
+                sources = line_sources(line_map, ezlines, index)
+                if not sources:
+                    st.caption("Keine Herkunft (z. B. Metadaten oder von Hand eingefügt).")
+                    continue
+                st.table([
+                    {
+                        "Seite": source["page"],
+                        "TextRegion": f"{source['region_id']} ({source['region_type']})",
+                        "TextLine": source["line_id"],
+                        "Koordinaten": ", ".join(str(value) for value in source["box"]),
+                    }
+                    for source in sources
+                ])
+
+
+# große Zwischenstände werden im Editor abschnittsweise (je so viele Zeilen) bearbeitet
+EDITOR_CHUNK_LINES = 300
+
+
+def stage_editor(key_prefix, visible=True, empty_message="Noch keine Datei zum Bearbeiten. Führe zuerst den Speicherschritt aus."):
+    """
+    Editor für den zuletzt erzeugten Zwischenstand (st.session_state.current_edit_stage).
+    Gespeichert wird in den Zwischenstand im Speicher.
+    """
+    st.divider()
+    st.subheader("Datei direkt in der App bearbeiten")
+
+    edit_stage = st.session_state.get("current_edit_stage")
+    if not (visible and edit_stage and edit_stage in buffers):
+        st.info(empty_message)
+        return
+
+    file_name = STAGE_FILES[edit_stage]
+    line_count = len(buffers.lines(edit_stage))
+    provenance_lookup(key_prefix, edit_stage)
+
+    if line_count > EDITOR_CHUNK_LINES and st.checkbox(
+        "Abschnittsweise bearbeiten",
+        value=True,
+        key=f"{key_prefix}chunked__{file_name}",
+        help="Lädt nur einen Ausschnitt in den Browser und speichert nur geänderte Zeilen.",
+    ):
+        chunk_editor(key_prefix, edit_stage, file_name)
+        return
+
+    # Editor-Buffer initialisieren, falls Schritt neu ist oder sich geändert hat
+    revision = (edit_stage, buffers.revisions.get(edit_stage, 0))
+    if st.session_state.get("_editor_revision") != revision or "editor_text" not in st.session_state:
+        st.session_state.editor_text = buffers.get(edit_stage)
+        st.session_state._editor_revision = revision
+
+    with st.expander(f"Datei bearbeiten: {file_name}", expanded=True):
+        with st.form(f"{key_prefix}edit_file_form__{file_name}", clear_on_submit=False):
+            editor_value = st.text_area(
+                "Inhalt bearbeiten",
+                value=st.session_state.editor_text,
+                height=420,
+                key=f"{key_prefix}editor_textarea__{file_name}",  # eindeutiger Key pro Datei
+            )
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                save_clicked = st.form_submit_button("Änderungen speichern")
+            with c2:
+                reload_clicked = st.form_submit_button("Original neu laden")
+            with c3:
+                download_clicked = st.form_submit_button("Als Datei herunterladen")
+
+    if save_clicked:
+        buffers.set(edit_stage, editor_value)
+        st.session_state.editor_text = editor_value
+        st.success("Gespeichert.")
+
+    if reload_clicked:
+        st.session_state.editor_text = buffers.get(edit_stage)
+        st.rerun()
+
+    if download_clicked:
+        st.download_button(
+            label="Download starten",
+            data=editor_value.encode("utf-8"),
+            file_name=file_name,
+            mime="text/plain",
+        )
+
+
+def chunk_editor(key_prefix, edit_stage, file_name):
+    """
+    Bearbeitet einen Zwischenstand in Abschnitten von EDITOR_CHUNK_LINES Zeilen.
+    Beim Speichern wird nur der geänderte Abschnitt in den Zwischenstand eingesetzt (buffers.patch).
+    """
+    lines = buffers.lines(edit_stage)
+    chunk_count = (len(lines) + EDITOR_CHUNK_LINES - 1) // EDITOR_CHUNK_LINES
+
+    def chunk_range(chunk):
+        return chunk * EDITOR_CHUNK_LINES, min((chunk + 1) * EDITOR_CHUNK_LINES, len(lines))
+
+    with st.expander(f"Datei bearbeiten: {file_name}", expanded=True):
+        chunk = st.selectbox(
+            "Abschnitt",
+            range(chunk_count),
+            format_func=lambda c: "Zeilen {}–{}".format(chunk_range(c)[0] + 1, chunk_range(c)[1]),
+            key=f"{key_prefix}chunk__{file_name}",
+        )
+        start, stop = chunk_range(min(chunk, chunk_count - 1))
+        original = "".join(lines[start:stop])
+        # Key mit Revision: nach jeder Änderung zeigt das Textfeld den aktuellen Stand
+        ta_key = f"{key_prefix}editor_chunk__{file_name}__{start}__{buffers.revisions.get(edit_stage, 0)}"
+
+        with st.form(f"{key_prefix}edit_chunk_form__{file_name}", clear_on_submit=False):
+            chunk_value = st.text_area(
+                f"Zeilen {start + 1}–{stop} von {len(lines)} bearbeiten",
+                value=original,
+                height=420,
+                key=ta_key,
+            )
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                save_clicked = st.form_submit_button("Änderungen speichern")
+            with c2:
+                reload_clicked = st.form_submit_button("Original neu laden")
+            with c3:
+                download_clicked = st.form_submit_button("Als Datei herunterladen")
+
+    if save_clicked:
+        if chunk_value != original:
+            new_count = buffers.patch(edit_stage, start, stop, chunk_value)
+            st.success(f"Zeilen {start + 1}–{stop} gespeichert ({new_count} Zeilen).")
+        else:
+            st.info("Keine Änderungen in diesem Abschnitt.")
+
+    if reload_clicked:
+        st.session_state.pop(ta_key, None)
+        st.rerun()
+
+    if download_clicked:
+        st.download_button(
+            label="Download starten",
+            data=buffers.get(edit_stage).encode("utf-8"),
+            file_name=file_name,
+            mime="text/plain",
+        )
+
+
+def start_job(kind, name, func, *args, **kwargs):
+    """
+    Startet func(*args, progress=..., **kwargs) als Hintergrund-Job; das Ergebnis übernimmt job_status.
+    """
+    # der Job hält den Arbeitsbereich als benutzt markiert, auch ohne Rerun der Seite
+    job = _job_runner().submit(name, func, *args, heartbeat=workspace.touch, **kwargs)
+    st.session_state.jobs[kind] = job.id
+    job.wait(JOB_WAIT_SECONDS)
+
+
+def job_status(kind, on_done):
+    """
+    Zeigt den Fortschritt des laufenden Jobs dieser Art an. Ist er beendet, wird on_done(result)
+    aufgerufen bzw. der Fehler oder Abbruch gemeldet.
+    """
+    job_id = st.session_state.jobs.get(kind)
+    job = _job_runner().get(job_id) if job_id else None
+    if job is None:
+        st.session_state.jobs.pop(kind, None)
+        return
+    if not job.is_finished:
+        _job_progress(kind, job_id)
+        return
+
+    del st.session_state.jobs[kind]
+    if job.status == DONE:
+        on_done(job.result)
+    elif job.status == FAILED:
+        st.error(f"{job.name} fehlgeschlagen: {job.error}")
+    else:
+        st.warning(f"{job.name} abgebrochen.")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_progress(kind, job_id):
+    job = _job_runner().get(job_id)
+    if job is None or job.is_finished:
+        st.rerun()  # ganze App neu ausführen, damit job_status das Ergebnis übernimmt
+    stage = STAGE_LABELS.get(job.stage, job.stage or "wartet")
+    counter = f" ({job.done}/{job.total})" if job.total else ""
+    st.progress(job.fraction, text=f"{job.name}: {stage}{counter}")
+    if job.cancel_requested:
+        st.caption("Wird abgebrochen ...")
+    elif st.button("Abbrechen", key=f"cancel_{kind}"):
+        job.cancel()
+
+
+with st.sidebar:
+    if st.button("Zwischenstände sichern"):
+        saved = buffers.checkpoint()
+        saved.append(st.session_state.run_metrics.write_report(workspace.output_dir / REPORT_FILENAME))
+        st.success(f"{len(saved)} Datei(en) gesichert unter: {workspace.output_dir}")
+
 st.title("PAGE to EzDrama to DraCorTEI")
 st.text("""
         Mit dieser Anwendung können Dramen von PAGE zu DraCor-TEI konvertiert werden.
@@ -31,17 +386,30 @@ mode = st.radio("Upload-Modus", ["ZIP-Ordner", "Einzelne XMLs"])
 
 if mode == "ZIP-Ordner":
     z = st.file_uploader("ZIP mit deinem Ordner wählen", type=["zip"])
+    read_from_archive = st.checkbox(
+        "Nicht entpacken, Seiten direkt aus dem ZIP lesen",
+        value=False,
+        help="Spart Speicherplatz bei großen Archiven: die PAGE-XML-Dateien werden bei jedem Schritt aus dem ZIP gestreamt."
+    )
     if z and st.button("Ordner importieren"):
-        with zipfile.ZipFile(io.BytesIO(z.read())) as zf:
-            for name in zf.namelist():
-                if name.lower().endswith(".xml") and not name.endswith("/"):
-                    target = session_dir / Path(name).name  # flach ablegen
-                    with zf.open(name) as src, open(target, "wb") as dst:
-                        dst.write(src.read())
-        xmls = list(session_dir.glob("*.xml"))
-        if xmls:
-            st.session_state.data_dir = str(session_dir)
-            st.success(f"{len(xmls)} XML-Datei(en) importiert.")
+        # Upload und Einträge werden gestreamt, nie vollständig in den Speicher geladen
+        if read_from_archive:
+            archive_path = workspace.root / "pages.zip"
+            atomic_write_stream(archive_path, z)
+            source = str(archive_path)
+        else:
+            with zipfile.ZipFile(z) as zf:
+                for info in zf.infolist():
+                    if info.filename.lower().endswith(".xml") and not info.is_dir():
+                        target = workspace.pages_dir / Path(info.filename).name  # flach ablegen
+                        with zf.open(info) as src:
+                            atomic_write_stream(target, src)
+                        ingestion.add(target)
+            source = str(workspace.pages_dir)
+        page_count = count_pages(source)
+        if page_count:
+            st.session_state.data_dir = source
+            st.success(f"{page_count} XML-Datei(en) importiert.")
         else:
             st.error("Keine XML-Dateien im ZIP gefunden.")
 
@@ -49,13 +417,19 @@ else:
     files = st.file_uploader("XML-Dateien wählen", type=["xml"], accept_multiple_files=True)
     if files and st.button("Dateien importieren"):
         for uf in files:
-            (session_dir / uf.name).write_bytes(uf.read())
-        st.session_state.data_dir = str(session_dir)
-        st.success(f"{len(list(session_dir.glob('*.xml')))} XML-Datei(en) importiert.")
+            # jede Seite wird geparst, während die nächsten noch geschrieben werden
+            data = uf.read()
+            target = workspace.pages_dir / Path(uf.name).name
+            atomic_write_bytes(target, data)
+            ingestion.add(target, data)
+        st.session_state.data_dir = str(workspace.pages_dir)
+        st.success(f"{len(list(workspace.pages_dir.glob('*.xml')))} XML-Datei(en) importiert.")
 
 # Anzeige des gültigen Datenpfads
 if st.session_state.data_dir:
     st.info(f"Datenpfad: {st.session_state.data_dir}")
+    if not ingestion.is_idle:
+        st.caption(f"{ingestion.finished} von {ingestion.added} Seiten bereits vorab geparst …")
 else:
     st.warning("Noch kein Datenpfad gesetzt. Bitte Dateien importieren.")
 
@@ -65,20 +439,34 @@ author = st.text_input("Autor des Dramas", value="Autor")
 
 all_metadata = f"@title {title}\n@subtitle {subtitle}\n@author {author}\n"
 
+def preprocess_after_ingestion(data_dir, progress=None):
+    # erst die noch laufende Vorab-Verarbeitung abwarten, damit keine Seite doppelt geparst wird
+    ingestion.wait(progress)
+    return pipeline.run("preprocess", sources={"pages": Pages(data_dir)}, progress=progress)
+
+
 if st.button("Preprocessing starten"):
     if not st.session_state.data_dir:
         st.error("Kein Datenpfad gesetzt. Bitte zuerst XML-Dateien importieren.")
     else:
-        with st.spinner("Extrahiere und bereite Daten vor..."):
-            data_dir = st.session_state.data_dir  # persistenter Pfad
-            dramatis_personae = extract_toc_entries(data_dir)
-            speaker_list_raw, speaker_examples = extract_sentences_with_dot_and_limit(data_dir)
-            figuren = extract_figuren(dramatis_personae)
-            st.session_state.dramatis_personae = dramatis_personae
-            st.session_state.speaker_list_raw = speaker_list_raw
-            st.session_state.speaker_examples = speaker_examples
-            st.session_state.figuren = figuren
-        st.success("Preprocessing abgeschlossen.")
+        data_dir = st.session_state.data_dir  # persistenter Pfad
+        start_job("preprocess", "Preprocessing", preprocess_after_ingestion, data_dir)
+
+
+def _preprocessing_done(preprocessed):
+    st.session_state.dramatis_personae = preprocessed["dramatis_personae"]
+    st.session_state.speaker_list_raw = preprocessed["speaker_list_raw"]
+    st.session_state.speaker_examples = preprocessed["speaker_examples"]
+    st.session_state.figuren = preprocessed["figuren"]
+    # bisherige Auswahl bleibt erhalten (z. B. nach dem Hinzufügen von Seiten), neue Kandidaten sind abgewählt
+    selection = st.session_state.get("speaker_selection", {})
+    st.session_state.speaker_selection = {
+        speaker: selection.get(speaker, False) for speaker in preprocessed["speaker_list_raw"]
+    }
+    st.success("Preprocessing abgeschlossen.")
+
+
+job_status("preprocess", _preprocessing_done)
 
 if 'speaker_list_raw' in st.session_state:
     st.write(f"**Extrahierte Figuren:** {st.session_state.dramatis_personae}")
@@ -131,104 +519,39 @@ if 'speaker_list_raw' in st.session_state:
     if submitted:
         valid_speakers = [speaker for speaker, keep in st.session_state.speaker_selection.items() if keep]
         if valid_speakers:
-            output_path = page2ezdrama(
-                data_dir=st.session_state.data_dir,
-                output_dir="output",
-                output_filename="1_drama_preprocessed.txt",
-                all_metadata=all_metadata,
-                speaker_list=valid_speakers
+            start_job(
+                "ezdrama", "Gesamtausgabe", pipeline.run_many, ["ezdrama", "ezlines"],
+                sources={"pages": Pages(st.session_state.data_dir), "speakers": valid_speakers},
+                options={"metadata": all_metadata},
             )
-            st.success(f"Gesamtausgabe gespeichert unter: {output_path}")
-            st.session_state.current_edit_path = output_path
-            st.rerun() 
         else:
             st.warning("Bitte mindestens einen Sprecher auswählen, bevor die Datei erstellt wird.")
 
-st.divider()
-st.subheader("Datei direkt in der App bearbeiten")
-
-def _load_text(path: str) -> str:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        return ""
 
-edit_path = st.session_state.get("current_edit_path")
-
-if edit_path and os.path.exists(edit_path):
-    # Editor-Buffer initialisieren, falls Pfad neu ist
-    if st.session_state.get("_editor_path") != edit_path or "editor_text" not in st.session_state:
-        st.session_state.editor_text = _load_text(edit_path)
-        st.session_state._editor_path = edit_path
-
-    with st.expander(f"Datei bearbeiten: {edit_path}", expanded=True):
-        with st.form("edit_file_form", clear_on_submit=False):
-            editor_value = st.text_area(
-                "Inhalt bearbeiten",
-                value=st.session_state.editor_text,
-                height=420,
-                key="editor_textarea",
-            )
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                save_clicked = st.form_submit_button("Änderungen speichern")
-            with c2:
-                reload_clicked = st.form_submit_button("Original neu laden")
-            with c3:
-                download_clicked = st.form_submit_button("Als Datei herunterladen")
+def _ezdrama_done(results):
+    ezdrama_text = results["ezdrama"]
+    # Herkunft der Zeilen (.ezlines) neben der Gesamtausgabe; Schritt 1 ist seine eigene Zuordnung
+    atomic_write_bytes(ezlines_path(workspace.stage_path("ezdrama")), results["ezlines"])
+    buffers.line_maps.pop("ezdrama", None)
+    buffers.set("ezdrama", ezdrama_text, line_map=LineMap.identity(len(text_to_lines(ezdrama_text))))
+    st.session_state.current_edit_stage = "ezdrama"
+    st.rerun()
 
-    if save_clicked:
-        try:
-            with open(edit_path, "w", encoding="utf-8") as f:
-                f.write(editor_value)
-            st.session_state.editor_text = editor_value
-            st.success("Gespeichert.")
-        except Exception as e:
-            st.error(f"Fehler beim Speichern: {e}")
 
-    if reload_clicked:
-        st.session_state.editor_text = _load_text(edit_path)
-        st.rerun()
+job_status("ezdrama", _ezdrama_done)
 
-    if download_clicked:
-        st.download_button(
-            label="Download starten",
-            data=editor_value.encode("utf-8"),
-            file_name=Path(edit_path).name,
-            mime="text/plain",
-        )
-else:
-    st.info("Noch keine Datei zum Bearbeiten. Führe zuerst den Speicherschritt aus.")
+stage_editor("")
 
 st.markdown("---")
 
 st.header("2️⃣ Übersehene Speaker finden")
 
-file_path = "output/1_drama_preprocessed.txt"
-output_path = "output/2_drama_speaker_fixed.txt"
-
 if 'speaker_line_selection' not in st.session_state:
     st.session_state.speaker_line_selection = {}
 
 if st.button("Übersehene Speaker suchen"):
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    speaker_pattern = re.compile(r"^@(.*)\.$")
-    speakers = set()
-    for line in lines:
-        match = speaker_pattern.match(line.strip())
-        if match:
-            speakers.add(match.group(1))
-
-    found_lines = []
-    for idx, line in enumerate(lines):
-        line_stripped = line.strip()
-        for speaker in speakers:
-            if line_stripped.startswith(speaker + " ") or line_stripped == speaker:
-                found_lines.append((idx, speaker, line.rstrip("\n")))
-                break
+    stage_text("ezdrama", "Schritt 1")
+    found_lines = find_speaker_lines(buffers.lines("ezdrama"))
 
     if found_lines:
         st.session_state.found_lines = found_lines
@@ -249,123 +572,36 @@ if 'found_lines' in st.session_state:
         submitted = st.form_submit_button("Ausgewählte Zeilen umschreiben und speichern")
 
     if submitted:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        speaker_pattern = re.compile(r"^@(.*)\.$")
-        speakers = set()
-        for line in lines:
-            match = speaker_pattern.match(line.strip())
-            if match:
-                speakers.add(match.group(1))
-
-        processed_lines = []
-        i = 0
-        while i < len(lines):
-            line = lines[i].rstrip("\n")
-            line_stripped = line.strip()
-
-            matched = False
-            for speaker in speakers:
-                if (line_stripped.startswith(speaker + " ") or line_stripped == speaker) and st.session_state.speaker_line_selection.get(i, False):
-                    rest = line_stripped[len(speaker):].lstrip()
-                    processed_lines.append(f"@{speaker}.")
-                    if rest:
-                        processed_lines.append(rest)
-                    matched = True
-                    break
-
-            if not matched:
-                processed_lines.append(line)
-
-            i += 1
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            for pline in processed_lines:
-                f.write(pline + "\n")
-
-        st.success(f"Ausgewählte Zeilen wurden umgeschrieben und gespeichert unter: {output_path}")
-        st.session_state.current_edit_path = output_path
-        st.rerun()
-
-
-st.divider()
-st.subheader("Datei direkt in der App bearbeiten")
-
-def _load_text(path: str) -> str:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        return ""
-
-edit_path = st.session_state.get("current_edit_path")
-
-if edit_path and os.path.exists(edit_path):
-    form_key = f"edit_file_form__{Path(edit_path).name}"
-    ta_key   = f"editor_textarea__{Path(edit_path).name}"
-
-    # Buffer initialisieren, wenn neue Datei
-    if st.session_state.get("_editor_path") != edit_path or "editor_text" not in st.session_state:
-        st.session_state.editor_text = _load_text(edit_path)
-        st.session_state._editor_path = edit_path
+        text = stage_text("ezdrama", "Schritt 1")
 
-    with st.expander(f"Datei bearbeiten: {edit_path}", expanded=True):
-        with st.form(form_key, clear_on_submit=False):
-            editor_value = st.text_area(
-                "Inhalt bearbeiten",
-                value=st.session_state.editor_text,
-                height=420,
-                key=ta_key,  # eindeutiger Key pro Datei
-            )
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                save_clicked = st.form_submit_button("Änderungen speichern")
-            with c2:
-                reload_clicked = st.form_submit_button("Original neu laden")
-            with c3:
-                download_clicked = st.form_submit_button("Als Datei herunterladen")
+        selected = sorted(idx for idx, keep in st.session_state.speaker_line_selection.items() if keep)
+        results = pipeline.run_many(
+            ["speaker_fix", "speaker_fix_map"],
+            sources={"ezdrama": text},
+            options={"speaker_line_selection": selected},
+        )
 
-    if save_clicked:
-        try:
-            with open(edit_path, "w", encoding="utf-8") as f:
-                f.write(editor_value)
-            st.session_state.editor_text = editor_value
-            st.success("Gespeichert.")
-        except Exception as e:
-            st.error(f"Fehler beim Speichern: {e}")
+        set_stage_result("speaker_fix", "ezdrama", text, results)
 
-    if reload_clicked:
-        st.session_state.editor_text = _load_text(edit_path)
+        st.success("Ausgewählte Zeilen wurden umgeschrieben.")
+        st.session_state.current_edit_stage = "speaker_fix"
         st.rerun()
 
-    if download_clicked:
-        st.download_button(
-            label="Download starten",
-            data=editor_value.encode("utf-8"),
-            file_name=Path(edit_path).name,
-            mime="text/plain",
-        )
-else:
-    st.info("Noch keine Datei zum Bearbeiten. Führe zuerst den Speicherschritt aus.")
+
+stage_editor("sec2__")
 
 
 st.markdown("---")
 st.header("3️⃣ Klammer-Zeilen extrahieren")
 
-
-file_path = "output/2_drama_speaker_fixed.txt"
-output_path = "output/3_drama_brackets_fixed.txt"
-
 if 'editable_bracket_contents' not in st.session_state:
     st.session_state.editable_bracket_contents = []
 
 if st.button("Klammer-Inhalte extrahieren"):
-    with open(file_path, "r", encoding="utf-8") as f:
-        text = f.read()
+    text = stage_text("speaker_fix", "Schritt 2")
 
     # Klammern-Inhalte robust extrahieren (inkl. Zeilenumbrüche)
-    bracket_contents = re.findall(r"(?s)(\(.*?\))", text)
+    bracket_contents = extract_bracket_contents(text)
 
     if bracket_contents:
         st.session_state.editable_bracket_contents = bracket_contents
@@ -381,42 +617,31 @@ if st.session_state.get('editable_bracket_contents'):
         updated_contents.append(edited)
 
     if st.button("Änderungen übernehmen und speichern"):
-        with open(file_path, "r", encoding="utf-8") as f:
-            text = f.read()
+        text = stage_text("speaker_fix", "Schritt 2")
 
         # Alle alten Klammerinhalte durch die neuen ersetzen
-        def replacement_generator():
-            for new_content in updated_contents:
-                yield new_content
-        replacer = replacement_generator()
-
-        def replace_match(match):
-            return next(replacer)
-
-        new_text = re.sub(r"(?s)(\(.*?\))", replace_match, text, count=len(updated_contents))
+        results = pipeline.run_many(
+            ["brackets", "brackets_map"],
+            sources={"speaker_fix": text},
+            options={"bracket_contents": updated_contents},
+        )
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(new_text)
+        set_stage_result("brackets", "speaker_fix", text, results)
 
-        st.success(f"Alle Änderungen wurden übernommen und gespeichert unter: {output_path}")
+        st.success("Alle Änderungen wurden übernommen.")
 
 st.markdown("---")
 st.header("4️⃣ Interaktive Speaker-Normalisierung")
 
-file_path = "output/3_drama_brackets_fixed.txt"
-output_path = "output/4_normalized_speakers.txt"
-
 if st.button("Textdatei laden"):
-    with open(file_path, "r", encoding="utf-8") as f:
-        text = f.read()
+    text = stage_text("brackets", "Schritt 3")
     st.session_state.text_loaded = True
     st.session_state.text_content = text
     st.success("Datei erfolgreich geladen.")
 
 if st.session_state.get('text_loaded', False):
     text = st.session_state.text_content
-    speakers_raw = re.findall(r"^@(.*?)$", text, re.MULTILINE)
-    unique_speakers = sorted(set(speakers_raw))
+    unique_speakers = find_speakers(text)
 
     st.subheader("Gefundene Sprecher")
     st.write(f"Anzahl gefundener Sprecher: {len(unique_speakers)}")
@@ -458,79 +683,23 @@ if st.session_state.get('text_loaded', False):
                 st.success(f"{len(selected)} Sprecher zu {group_name} hinzugefügt")
 
     if st.button("Normalisieren und Datei speichern"):
-        normalized_text = text
-        for group_name, variants in st.session_state.speaker_groups.items():
-            for variant in variants:
-                pattern = r"^@" + re.escape(variant) + r"$"
-                normalized_text = re.sub(pattern, group_name, normalized_text, flags=re.MULTILINE)
-        with open(output_path, "w", encoding="utf-8") as f_out:
-            f_out.write(normalized_text)
-        st.success(f"Datei normalisiert und gespeichert nach {output_path}")
-        st.session_state.current_edit_path = output_path
+        results = pipeline.run_many(
+            ["normalized", "normalized_map"],
+            sources={"brackets": text},
+            options={"speaker_groups": dict(st.session_state.speaker_groups)},
+        )
+        set_stage_result("normalized", "brackets", text, results)
+        st.success("Datei normalisiert.")
+        st.session_state.current_edit_stage = "normalized"
         st.session_state.editor_section = "sec4"  # Abschnitt markieren
         st.rerun()
 
-SECTION_ID = "sec4"  # eindeutiger Präfix für Abschnitt 4
-
-st.divider()
-st.subheader("Datei direkt in der App bearbeiten")
-
-def _load_text(path: str) -> str:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        return ""
-
-edit_path = st.session_state.get("current_edit_path")
-
 # Editor nur rendern, wenn dieser Abschnitt aktiv ist
-if st.session_state.get("editor_section") == SECTION_ID and edit_path and os.path.exists(edit_path):
-    form_key = f"{SECTION_ID}__edit_file_form__{Path(edit_path).name}"
-    ta_key   = f"{SECTION_ID}__editor_textarea__{Path(edit_path).name}"
-
-    if st.session_state.get("_editor_path") != edit_path or "editor_text" not in st.session_state:
-        st.session_state.editor_text = _load_text(edit_path)
-        st.session_state._editor_path = edit_path
-
-    with st.expander(f"Datei bearbeiten: {edit_path}", expanded=True):
-        with st.form(form_key, clear_on_submit=False):
-            editor_value = st.text_area(
-                "Inhalt bearbeiten",
-                value=st.session_state.editor_text,
-                height=420,
-                key=ta_key,
-            )
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                save_clicked = st.form_submit_button("Änderungen speichern")
-            with c2:
-                reload_clicked = st.form_submit_button("Original neu laden")
-            with c3:
-                download_clicked = st.form_submit_button("Als Datei herunterladen")
-
-    if save_clicked:
-        try:
-            with open(edit_path, "w", encoding="utf-8") as f:
-                f.write(editor_value)
-            st.session_state.editor_text = editor_value
-            st.success("Gespeichert.")
-        except Exception as e:
-            st.error(f"Fehler beim Speichern: {e}")
-
-    if reload_clicked:
-        st.session_state.editor_text = _load_text(edit_path)
-        st.rerun()
-
-    if download_clicked:
-        st.download_button(
-            label="Download starten",
-            data=editor_value.encode("utf-8"),
-            file_name=Path(edit_path).name,
-            mime="text/plain",
-        )
-else:
-    st.info("Noch keine Datei zum Bearbeiten in diesem Abschnitt.")
+stage_editor(
+    "sec4__",
+    visible=st.session_state.get("editor_section") == "sec4",
+    empty_message="Noch keine Datei zum Bearbeiten in diesem Abschnitt.",
+)
 
 st.markdown("---")
 
@@ -538,171 +707,40 @@ st.markdown("---")
 st.header("5️⃣ Gesamttext bereinigen")
 
 keep_linebreaks = st.checkbox("Zeilenumbrüche behalten", value=False)
+dehyphenate = st.checkbox(
+    "Trennstriche mit Wortverzeichnis prüfen",
+    value=False,
+    disabled=keep_linebreaks,
+    help="Zieht getrennte Wörter nur zusammen, wenn das Wort im Drama (oder in der Wortliste) vorkommt; "
+         "Bindestriche wie in „Ost-Berlin“ oder „Sturm- und Drang“ bleiben erhalten.",
+)
+word_list_file = None
+if dehyphenate and not keep_linebreaks:
+    word_list_file = st.file_uploader(
+        "Wortliste (optional, ein Wort pro Zeile, ggf. mit Häufigkeit)", type=["txt", "tsv"]
+    )
 
 if st.button("Gesamttext bereinigen"):
-    file_path = "output/4_normalized_speakers.txt"
-    output_path = "output/5_drama_text_cleaned.txt"
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    def normalize_text(text: str) -> str:
-        replacements = {
-            "ſ": "s", "ʒ": "z", "Ʒ": "Z",
-            "aͤ": "ä", "oͤ": "ö", "uͤ": "ü",
-            "Jch": "Ich", "Jtzt": "Itzt", "Jst": "Ist",
-            "Jn": "In", "Jm": "Im", "Jhm": "Ihm",
-            "Jhn": "Ihn", "Jhr": "Ihr", "Jr": "Ir"
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        return text
-
-    # -------- Variante A: Zeilenumbrüche behalten --------
-    if keep_linebreaks:
-        cleaned_lines = []
-        i = 0
-        while i < len(lines):
-            raw = lines[i].rstrip("\n")
-            # Leerzeilen beibehalten
-            if raw.strip() == "":
-                cleaned_lines.append("")
-                i += 1
-                continue
-
-            line = raw.strip()
-
-            # Versmodus-Marker (~): nur normalisieren und übernehmen
-            if line.startswith("~"):
-                cleaned_lines.append(normalize_text(line))
-                i += 1
-                continue
-
-            # Sprecherzeile (@): NICHT mit folgender Klammerzeile mergen
-            if line.startswith("@"):
-                cleaned_lines.append(line)  # unverändert, aber unten global normalisiert
-                i += 1
-                continue
-
-            # Regie-/Blockzeilen ($): jede Zeile separat übernehmen, kein Mergen
-            if line.startswith("$"):
-                cleaned_lines.append("$" + line[1:].strip())
-                i += 1
-                continue
-
-            # Überschriften/Marker: unverändert durchreichen
-            if line.startswith(("#", "^")):
-                cleaned_lines.append(line)
-                i += 1
-                continue
-
-            # Standardzeile: keine Silbentrennungs-Merges
-            cleaned_lines.append(line)
-            i += 1
-
-        # am Ende nur Zeichennormalisierung anwenden
-        cleaned_lines = [normalize_text(l) if l else "" for l in cleaned_lines]
-
-    # -------- Variante B: deine bisherige Logik (Merges) --------
-    else:
-        cleaned_lines = []
-        buffer = ""
-        verse_mode = False
-
-        def process_line(line):
-            line = line.rstrip()
-            if line.endswith("-") and not line.endswith(" -") and not line.endswith("--"):
-                return line[:-1], True
-            return line, False
-
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line:
-                i += 1
-                continue
-
-            if line.startswith("~"):
-                verse_mode = True
-                if buffer:
-                    cleaned_lines.append(buffer.strip())
-                    buffer = ""
-                cleaned_lines.append(normalize_text(line.strip()))
-                i += 1
-                continue
-
-            if verse_mode:
-                if not line.startswith(("@", "#", "^", "$", "~", "(")):
-                    cleaned_lines.append(normalize_text(line.strip()))
-                    i += 1
-                    continue
-                else:
-                    verse_mode = False
-
-            if line.startswith("@"):
-                verse_mode = False
-                if buffer:
-                    cleaned_lines.append(buffer.strip())
-                    buffer = ""
-                speaker_line = line
-                i += 1
-                if i < len(lines):
-                    next_line = lines[i].strip()
-                    if next_line.startswith("(") and next_line.endswith(")"):
-                        speaker_line += f" {next_line}"
-                        i += 1
-                cleaned_lines.append(speaker_line)
-                continue
-
-            if line.startswith("$"):
-                verse_mode = False
-                combined_line, is_hyphenated = process_line(line[1:].strip())
-                i += 1
-                while i < len(lines) and lines[i].strip().startswith("$"):
-                    next_line_content = lines[i].strip()[1:].strip()
-                    processed_next, next_is_hyphenated = process_line(next_line_content)
-                    if is_hyphenated:
-                        combined_line += processed_next
-                    else:
-                        combined_line += " " + processed_next
-                    is_hyphenated = next_is_hyphenated
-                    i += 1
-                if buffer:
-                    cleaned_lines.append(buffer.strip())
-                    buffer = ""
-                cleaned_lines.append("$" + combined_line.strip())
-                continue
-
-            if line.startswith(("#", "^")):
-                verse_mode = False
-                if buffer:
-                    cleaned_lines.append(buffer.strip())
-                    buffer = ""
-                cleaned_lines.append(line)
-                i += 1
-                continue
-
-            processed_line, is_hyphenated = process_line(line)
-            buffer += " " + processed_line
-
-            while is_hyphenated and i + 1 < len(lines):
-                i += 1
-                next_line = lines[i].strip()
-                processed_line, is_hyphenated = process_line(next_line)
-                buffer += processed_line
-
-            i += 1
-
-        if buffer:
-            cleaned_lines.append(buffer.strip())
-
-        cleaned_lines = [normalize_text(line) for line in cleaned_lines]
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        for line in cleaned_lines:
-            f.write(line + "\n")
-
-    st.success(f"Bereinigter Text gespeichert unter: {output_path}")
+    text = stage_text("normalized", "Schritt 4")
+
+    word_list = None
+    if word_list_file is not None:
+        word_list_path = workspace.root / WORD_LIST_FILENAME
+        atomic_write_bytes(word_list_path, word_list_file.getvalue())
+        word_list = WordList(word_list_path)
+
+    results = pipeline.run_many(
+        ["cleaned", "cleaned_map"],
+        sources={"normalized": text},
+        options={"keep_linebreaks": keep_linebreaks, "dehyphenate": dehyphenate, "word_list": word_list},
+    )
+
+    set_stage_result("cleaned", "normalized", text, results)
+
+    st.success("Text bereinigt.")
+
+if "cleaned" in buffers:
+    provenance_lookup("sec5__", "cleaned")
 
 
 st.markdown("---")
@@ -717,25 +755,67 @@ dracor_id = st.text_input("Dracor ID", value="ger000000")
 dracor_lang = st.text_input("Sprache des Dramas (dracor_lang)", value="de")
 
 if st.button("EzDrama to DraCor-TEI"):
-    with st.spinner("Konvertiere EzDrama zu DraCor-TEI..."):
-        parser = Parser(
-            bracketstages=bracketstages,
-            is_prose=is_prose,
-            dracor_id=dracor_id,
-            dracor_lang=dracor_lang
-        )
-        parser.process_file("output/5_drama_text_cleaned.txt")
-        st.success(f"Konvertierung abgeschlossen: {parser.outputname}")
-
-        if os.path.exists(parser.outputname):
-            with open(parser.outputname, "rb") as f:
-                xml_bytes = f.read()
+    text = stage_text("cleaned", "Schritt 5")
+    start_job(
+        "tei", "Konvertierung", pipeline.run, "tei",
+        sources={"cleaned": text},
+        options={
+            "bracketstages": bracketstages,
+            "is_prose": is_prose,
+            "dracor_id": dracor_id,
+            "dracor_lang": dracor_lang,
+        },
+    )
+
+
+def _tei_done(tei_text):
+    # Export: TEI und alle geänderten Zwischenstände auf die Festplatte schreiben
+    buffers.set("tei", tei_text)
+    buffers.checkpoint()
+    st.session_state.run_metrics.write_report(workspace.output_dir / REPORT_FILENAME)
+    outputname = str(workspace.stage_path("tei"))
+    st.success(f"Konvertierung abgeschlossen: {outputname}")
+
+    st.download_button(
+        label="XML herunterladen",
+        data=tei_text.encode("utf-8"),
+        file_name=os.path.basename(outputname),
+        mime="application/xml",
+        key="dl_xml",
+    )
+
+
+job_status("tei", _tei_done)
+
+# Messwerte am Ende rendern, damit auch die Schritte dieses Laufs enthalten sind
+with st.sidebar:
+    with st.expander("Messwerte", expanded=False):
+        report = st.session_state.run_metrics.to_dict()
+        if report["stages"]:
+            st.write(f"Gesamte Rechenzeit: {report['total_seconds']:.2f} s")
+            st.dataframe(st.session_state.run_metrics.rows(), hide_index=True)
             st.download_button(
-                label="XML herunterladen",
-                data=xml_bytes,
-                file_name=os.path.basename(parser.outputname),
-                mime="application/xml",
-                key="dl_xml",
+                label="Bericht herunterladen (JSON)",
+                data=json.dumps(report, indent=2, ensure_ascii=False).encode("utf-8"),
+                file_name=REPORT_FILENAME,
+                mime="application/json",
+                key="dl_report",
             )
         else:
-            st.error("Ausgabedatei nicht gefunden.")
\ No newline at end of file
+            st.caption("Noch keine Schritte ausgeführt.")
+
+    if profiler and profiler.files():
+        with st.expander("Profile", expanded=False):
+            st.caption(", ".join(Path(path).name for path in profiler.files()))
+            if st.button("Profile als ZIP packen"):
+                buffer = io.BytesIO()
+                with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+                    for path in profiler.files():
+                        zf.write(path, Path(path).name)
+                st.download_button(
+                    label="Profile herunterladen",
+                    data=buffer.getvalue(),
+                    file_name="profiles.zip",
+                    mime="application/zip",
+                    key="dl_profiles",
+                )
@@ -0,0 +1,69 @@
+"""
+Kommandozeilen-Einstieg für die Batch-Konvertierung vieler Dramen.
+
+Beispiel:
+    python batch_convert.py data/dramen output/batch --workers 4
+"""
+
+import argparse
+import os
+import sys
+
+from modules.Batch import convert_plays, CORPUS_REPORT_FILENAME
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Konvertiert einen Ordner mit Dramen (je ein Unterordner mit PAGE-XML) zu DraCor-TEI."
+    )
+    parser.add_argument("input_dir", help="Ordner mit einem Unterordner pro Drama")
+    parser.add_argument("output_dir", help="Zielordner für Zwischenstände, TEI-Dateien und Logs")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Anzahl paralleler Prozesse")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Ablage der Zwischenergebnisse (Standard: <output_dir>/.cache)")
+    parser.add_argument("--keep-linebreaks", action="store_true", help="Zeilenumbrüche behalten")
+    parser.add_argument("--no-bracketstages", action="store_true",
+                        help="Klammern nicht als Bühnenanweisungen behandeln")
+    parser.add_argument("--verse", action="store_true", help="Vers- statt Prosa-Modus")
+    parser.add_argument("--dracor-id", default="ger000000", help="DraCor ID")
+    parser.add_argument("--lang", default="de", help="Sprache der Dramen (dracor_lang)")
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="Schritte mit cProfile/tracemalloc profilieren (auch über DRACOR_PROFILE=1)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="TEI-Datei fortlaufend schreiben, statt den ganzen Baum im Speicher zu halten "
+                             "(für sehr lange Dramen und Sammelbände)")
+    parser.add_argument("--dehyphenate", action="store_true",
+                        help="Trennstriche am Zeilenende nur auflösen, wenn das Wort im Drama bzw. in der "
+                             "Wortliste vorkommt (Bindestriche wie in Ost-Berlin bleiben erhalten)")
+    parser.add_argument("--word-list", default=None,
+                        help="Wortliste für --dehyphenate: ein Wort pro Zeile, optional mit Häufigkeit")
+    args = parser.parse_args(argv)
+
+    summaries = convert_plays(
+        args.input_dir,
+        args.output_dir,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        keep_linebreaks=args.keep_linebreaks,
+        bracketstages=not args.no_bracketstages,
+        is_prose=not args.verse,
+        dracor_id=args.dracor_id,
+        dracor_lang=args.lang,
+        profile=args.profile,
+        low_memory=args.low_memory,
+        dehyphenate=args.dehyphenate,
+        word_list=args.word_list,
+    )
+
+    failed = [s for s in summaries if s["status"] != "ok"]
+    for s in summaries:
+        status = "OK    " if s["status"] == "ok" else "FEHLER"
+        detail = s["output"] if s["status"] == "ok" else s["error"]
+        print(f"{status} {s['play']} ({s['seconds']} s): {detail}")
+    print(f"{len(summaries) - len(failed)} von {len(summaries)} Dramen konvertiert.")
+    print(f"Gesamtbericht: {os.path.join(args.output_dir, CORPUS_REPORT_FILENAME)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Misst die Importzeit der Module in jeweils frischen Python-Prozessen.
+
+"Kaltstart" umfasst alles, was app.py beim ersten Rendern importiert;
+die übrigen Einträge werden erst geladen, wenn ihr Schritt zum ersten Mal läuft.
+
+Aufruf (aus dem Projektordner):
+    python benchmarks/import_time.py --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Name -> Importanweisungen
+TARGETS = {
+    "Kaltstart (app.py)": (
+        "import streamlit\n"
+        "import modules.GetSpeakers, modules.PAGE2EzDrama, modules.TextStages"
+    ),
+    "modules.DraCorParser": "import modules.DraCorParser",
+    "transliterate": "import transliterate",
+    "yiddish": "import yiddish",
+}
+
+SNIPPET = """
+import time
+t = time.perf_counter()
+{imports}
+print(time.perf_counter() - t)
+"""
+
+
+def measure(imports, repeat):
+    """Importiert `imports` `repeat`-mal in einem neuen Prozess und liefert die Zeiten in Sekunden."""
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", SNIPPET.format(imports=imports)],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        )
+        times.append(float(result.stdout.strip()))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importzeiten der App-Module messen")
+    parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen pro Eintrag")
+    args = parser.parse_args(argv)
+
+    for name, imports in TARGETS.items():
+        times = measure(imports, args.repeat)
+        print(f"{name:<24} median {statistics.median(times) * 1000:8.1f} ms   "
+              f"min {min(times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
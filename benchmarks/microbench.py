@@ -0,0 +1,192 @@
+"""
+Microbenchmarks der rechenintensiven Funktionen auf einem synthetischen Korpus
+(siehe benchmarks/synthetic_page.py).
+
+Gemessen werden extract_lines (beide Module), process_file (Layout-Analyse
+bzw. ReadingOrder), extract_sentences_with_dot_and_limit, compute_similarity, Parser.parse_lines_to_xml
+und der Zeilen-Lexer des Parsers (split_bracket_stages; zum Vergleich der frühere re.findall-Aufruf).
+Jede Messung wird --repeat-mal wiederholt; ausgegeben werden Median und Minimum.
+
+Ergebnisse lassen sich als JSON speichern und mit einem früheren Lauf (z. B. eines
+anderen Commits) vergleichen:
+
+    python benchmarks/microbench.py --pages 100 --save bench_alt.json
+    git checkout <anderer-commit>
+    python benchmarks/microbench.py --pages 100 --compare bench_alt.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_page import write_corpus  # noqa: E402
+
+from modules import GetSpeakers, PAGE2EzDrama  # noqa: E402
+from modules.DraCorParser import Parser, split_bracket_stages  # noqa: E402
+from modules.TextStages import text_to_lines  # noqa: E402
+
+
+def _page_paths(corpus_dir):
+    return [os.path.join(corpus_dir, name) for name in sorted(os.listdir(corpus_dir)) if name.endswith(".xml")]
+
+
+def build_cases(corpus_dir, ordered_dir):
+    """
+    Liefert Name -> (Funktion ohne Argumente, Anzahl Einheiten, Einheit).
+    Vorbereitungen (Sprecherliste, EzDrama-Text) laufen einmal vorab und werden nicht gemessen.
+    """
+    pages = _page_paths(corpus_dir)
+    ordered_pages = _page_paths(ordered_dir)
+    toc = GetSpeakers.extract_toc_entries(corpus_dir)
+    figuren = GetSpeakers.extract_figuren(toc)
+    candidates, _ = GetSpeakers.extract_sentences_with_dot_and_limit(corpus_dir)
+    candidates = sorted(candidates)
+    speakers = sorted({c for c in candidates if GetSpeakers.compute_similarity(c, figuren)[1] > 0.5})
+    ezdrama_lines = text_to_lines(PAGE2EzDrama.build_ezdrama_text(corpus_dir, "@title Benchmark\n", speakers))
+
+    def extract_lines_speakers():
+        for path in pages:
+            GetSpeakers.extract_lines(path)
+
+    def extract_lines_ezdrama():
+        for path in pages:
+            PAGE2EzDrama.extract_lines(path)
+
+    def process_file():
+        for path in pages:
+            PAGE2EzDrama.process_file(path, speakers)
+
+    def process_file_reading_order():
+        for path in ordered_pages:
+            PAGE2EzDrama.process_file(path, speakers)
+
+    def extract_sentences():
+        GetSpeakers.extract_sentences_with_dot_and_limit(corpus_dir)
+
+    def compute_similarity():
+        for candidate in candidates:
+            GetSpeakers.compute_similarity(candidate, figuren)
+
+    def parse_lines_to_xml():
+        Parser().parse_lines_to_xml(ezdrama_lines)
+
+    def bracket_lexer():
+        for line in ezdrama_lines:
+            split_bracket_stages(line)
+
+    def bracket_regex():
+        for line in ezdrama_lines:
+            re.findall(r'([^()]*)(\(.+?\)[.,:!;]?)([^()]*)', line)
+
+    return {
+        "GetSpeakers.extract_lines": (extract_lines_speakers, len(pages), "Seiten"),
+        "PAGE2EzDrama.extract_lines": (extract_lines_ezdrama, len(pages), "Seiten"),
+        "PAGE2EzDrama.process_file": (process_file, len(pages), "Seiten"),
+        "PAGE2EzDrama.process_file[RO]": (process_file_reading_order, len(ordered_pages), "Seiten"),
+        "extract_sentences_with_dot_and_limit": (extract_sentences, len(pages), "Seiten"),
+        "compute_similarity": (compute_similarity, len(candidates), "Kandidaten"),
+        "Parser.parse_lines_to_xml": (parse_lines_to_xml, len(ezdrama_lines), "Zeilen"),
+        "split_bracket_stages": (bracket_lexer, len(ezdrama_lines), "Zeilen"),
+        "split_bracket_stages[re.findall]": (bracket_regex, len(ezdrama_lines), "Zeilen"),
+    }
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pages, seed, repeat, noise, only=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = write_corpus(os.path.join(tmp, "drama"), pages=pages, seed=seed, noise=noise)
+        ordered_dir = write_corpus(os.path.join(tmp, "drama_ro"), pages=pages, seed=seed, noise=noise,
+                                   reading_order=True)
+        results = {}
+        for name, (func, units, unit) in build_cases(corpus_dir, ordered_dir).items():
+            if only and not any(part in name for part in only):
+                continue
+            func()  # Aufwärmen (Importe, Caches)
+            times = measure(func, repeat)
+            median = statistics.median(times)
+            results[name] = {
+                "median_s": median,
+                "min_s": min(times),
+                "units": units,
+                "unit": unit,
+                "per_second": units / median if median else None,
+            }
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pages": pages,
+        "seed": seed,
+        "noise": noise,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"Revision {report['revision'] or '?'}, {report['pages']} Seiten, seed {report['seed']}, "
+          f"{report['repeat']} Wiederholungen")
+    for name, result in report["results"].items():
+        line = (f"{name:<38} median {result['median_s'] * 1000:9.2f} ms   min {result['min_s'] * 1000:9.2f} ms   "
+                f"{result['per_second']:10.1f} {result['unit']}/s")
+        if baseline and name in baseline["results"]:
+            before = baseline["results"][name]["median_s"]
+            line += f"   {(result['median_s'] / before - 1) * 100:+6.1f} % ggü. {baseline['revision'] or '?'}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks auf einem synthetischen PAGE-Korpus")
+    parser.add_argument("--pages", type=int, default=50, help="Seitenzahl des synthetischen Dramas")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert des Generators")
+    parser.add_argument("--noise", type=float, default=0.05, help="Anteil verrauschter Sprechernamen")
+    parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen pro Messung")
+    parser.add_argument("--only", nargs="*", default=None, help="nur Messungen, deren Name dies enthält")
+    parser.add_argument("--save", help="Ergebnis als JSON speichern")
+    parser.add_argument("--compare", help="mit gespeichertem JSON-Ergebnis vergleichen")
+    args = parser.parse_args(argv)
+
+    report = run(args.pages, args.seed, args.repeat, args.noise, args.only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline["pages"], baseline["seed"], baseline["noise"]) != (args.pages, args.seed, args.noise):
+            print("Achtung: Vergleichslauf mit anderem Korpus (pages/seed/noise).")
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Erzeugt synthetische PAGE-XML-Dramen (PAGE 2019-07-15) für Benchmarks.
+
+Die Seiten ähneln echten OCR-Ergebnissen: ein Personenverzeichnis (TOC-entry) auf der
+ersten Seite, danach Akt- und Szenenüberschriften, Bühnenanweisungen (caption),
+Sprecherzeilen mit Text in paragraph-Regionen, Kustoden (catch-word) und Bogensignaturen
+(signature-mark). Seitenzahl, Regionsmischung, Zeilen pro Region, Punkte pro Polygon,
+OCR-Fehler in Sprechernamen und eine ReadingOrder sind einstellbar; bei gleichem seed
+entsteht byte-genau dasselbe Korpus.
+
+Aufruf (aus dem Projektordner):
+    python benchmarks/synthetic_page.py /tmp/drama --pages 200 --noise 0.1
+    python benchmarks/synthetic_page.py /tmp/drama.zip --pages 200 --zip
+"""
+
+import argparse
+import math
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+NS = "http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15"
+
+PAGE_WIDTH = 1800
+PAGE_HEIGHT = 2800
+LINE_HEIGHT = 48
+LEFT_MARGIN = 180
+
+# Anteil der Regionstypen auf den Textseiten (paragraph kommt auf jeder Seite vor)
+DEFAULT_REGION_MIX = {
+    "paragraph": 6,
+    "caption": 2,
+    "heading": 1,
+    "header": 0.3,
+    "catch-word": 1,
+    "signature-mark": 0.5,
+}
+
+MARGIN_REGIONS = ("header", "catch-word", "signature-mark")
+
+SPEAKERS = [
+    ("Karl", "ſein Sohn"), ("Amalia", "von Edelreich"), ("Franz", "ſein Bruder"),
+    ("Hermann", "Baſtard eines Edelmanns"), ("Daniel", "ein alter Diener"),
+    ("Spiegelberg", "Libertiner"), ("Schweizer", "Libertiner"), ("Roller", "Libertiner"),
+    ("Koſinsky", "ein junger Edelmann"), ("Paſtor Moſer", "Geiſtlicher"),
+]
+
+WORDS = (
+    "und der die das iſt nicht ich du er ſie es mein dein ſein Vater Bruder Herz Gott "
+    "Himmel Welt Nacht Tod Leben Liebe Blut Schwert Freiheit Rache Ehre Schande ewig "
+    "heilig ſchrecklich fürchterlich verloren gefunden zurück hinaus herein warum wie "
+    "wo wann niemals immer vielleicht Gewiſſen Verzweiflung Hoffnung Thränen Schloß "
+    "Wald Räuber Geſetz Natur Menſch Teufel Engel ſprechen ſchweigen kommen gehen"
+).split()
+
+STAGE_DIRECTIONS = [
+    "tritt auf", "geht ab", "leiſe", "laut", "für ſich", "zu Franz", "fällt auf die Knie",
+    "nach einer Pauſe", "mit Heftigkeit", "lacht", "weint", "ab",
+]
+
+# typische OCR-Verwechslungen
+OCR_CONFUSIONS = [("ſ", "f"), ("s", "ſ"), ("m", "rn"), ("n", "u"), ("l", "1"), ("e", "c"), ("i", "l")]
+
+
+def noisy_name(name, rng, noise):
+    """Baut mit Wahrscheinlichkeit noise OCR-Fehler in einen Sprechernamen ein."""
+    if rng.random() >= noise:
+        return name
+    kind = rng.randrange(3)
+    if kind == 0:
+        for wrong, right in rng.sample(OCR_CONFUSIONS, len(OCR_CONFUSIONS)):
+            if wrong in name:
+                return name.replace(wrong, right, 1)
+    if kind == 1 and len(name) > 3:
+        pos = rng.randrange(1, len(name) - 1)
+        return name[:pos] + name[pos + 1:]
+    return name.upper() if kind == 2 else name + ","
+
+
+def sentence(rng, min_words=4, max_words=12):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    words[0] = words[0].capitalize()
+    text = " ".join(words) + rng.choice([".", ".", "!", "?", " —"])
+    if rng.random() < 0.25:
+        text += f" ({rng.choice(STAGE_DIRECTIONS)})"
+    return text
+
+
+def polygon(x, y, width, height, points, rng):
+    """
+    Umriss einer Zeile mit `points` Punkten: oben von links nach rechts, unten zurück,
+    mit leichtem Zittern wie bei echten Baseline-Polygonen.
+    """
+    per_side = max(2, points // 2)
+    top = [(x + round(width * i / (per_side - 1)), y - height // 2 + rng.randint(-3, 3)) for i in range(per_side)]
+    bottom = [(px, y + height // 2 + rng.randint(-3, 3)) for px, _ in reversed(top)]
+    return " ".join(f"{px},{py}" for px, py in top + bottom)
+
+
+class PageWriter:
+    """Baut eine PAGE-Seite aus Regionen und Zeilen zusammen."""
+
+    def __init__(self, rng, polygon_points, reading_order=False):
+        self.rng = rng
+        self.polygon_points = polygon_points
+        self.reading_order = reading_order
+        self.regions = []
+        self.y = 200
+        self._line_id = 0
+
+    def region(self, region_type, texts, x=LEFT_MARGIN, width=1400):
+        lines = []
+        top = self.y
+        for text in texts:
+            self._line_id += 1
+            coords = polygon(x, self.y, width, LINE_HEIGHT - 8, self.polygon_points, self.rng)
+            lines.append(
+                f'<TextLine id="l{self._line_id}"><Coords points="{coords}"/>'
+                f'<TextEquiv index="1"><Unicode>{escape(text.lower())}</Unicode></TextEquiv>'
+                f'<TextEquiv index="0"><Unicode>{escape(text)}</Unicode></TextEquiv></TextLine>'
+            )
+            self.y += LINE_HEIGHT
+        region_coords = f"{x},{top - LINE_HEIGHT // 2} {x + width},{top - LINE_HEIGHT // 2} " \
+                        f"{x + width},{self.y} {x},{self.y}"
+        self.regions.append(
+            f'<TextRegion id="r{len(self.regions)}" type="{region_type}">'
+            f'<Coords points="{region_coords}"/>{"".join(lines)}</TextRegion>'
+        )
+        self.y += LINE_HEIGHT // 2
+
+    def to_xml(self, image_name):
+        reading_order = ""
+        if self.reading_order:
+            refs = "".join(f'<RegionRefIndexed index="{i}" regionRef="r{i}"/>' for i in range(len(self.regions)))
+            reading_order = f'<ReadingOrder><OrderedGroup id="ro1">{refs}</OrderedGroup></ReadingOrder>'
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<PcGts xmlns="{NS}"><Metadata><Creator>synthetic_page.py</Creator></Metadata>'
+            f'<Page imageFilename="{image_name}" imageWidth="{PAGE_WIDTH}" imageHeight="{PAGE_HEIGHT}">'
+            f'{reading_order}{"".join(self.regions)}</Page></PcGts>\n'
+        )
+
+
+def toc_page(rng, polygon_points, speakers, reading_order=False):
+    page = PageWriter(rng, polygon_points, reading_order)
+    page.region("heading", ["Die Räuber."])
+    page.region("TOC-entry", ["Perſonen:"] + [f"{name}, {role}." for name, role in speakers])
+    return page
+
+
+def text_page(rng, number, polygon_points, speakers, region_mix, lines_per_region, noise, state,
+              reading_order=False):
+    """Eine Textseite; state trägt Akt, Szene und eine angefangene Trennung über Seiten hinweg."""
+    page = PageWriter(rng, polygon_points, reading_order)
+    # header, catch-word und signature-mark stehen am Seitenanfang bzw. -ende
+    body_types = [t for t in region_mix if t not in MARGIN_REGIONS] or ["paragraph"]
+    body_weights = [region_mix.get(t, 1) for t in body_types]
+
+    if region_mix.get("header") and rng.random() < region_mix["header"] / sum(region_mix.values()):
+        state["act"] += 1
+        page.region("header", [f"{state['act']}. Akt."])
+
+    while page.y < PAGE_HEIGHT - 300:
+        region_type = rng.choices(body_types, body_weights)[0]
+        if region_type == "heading":
+            state["scene"] += 1
+            page.region("heading", [f"{state['scene']}. Scene."])
+        elif region_type == "caption":
+            page.region("caption", [sentence(rng, 3, 8) for _ in range(rng.randint(1, 2))], x=LEFT_MARGIN + 200, width=1000)
+        elif region_type != "paragraph":
+            page.region(region_type, [sentence(rng, 2, 6)])
+        else:
+            texts = []
+            for _ in range(rng.randint(*lines_per_region)):
+                text = sentence(rng)
+                if state.pop("hyphen", None):
+                    text = "ſchaft " + text
+                elif rng.random() < 0.35:
+                    name = noisy_name(rng.choice(speakers)[0], rng, noise)
+                    text = f"{name}. {text}"
+                if rng.random() < 0.15:
+                    text += " Bru-"
+                    state["hyphen"] = True
+                texts.append(text)
+            page.region("paragraph", texts)
+
+    if region_mix.get("catch-word"):
+        page.y = PAGE_HEIGHT - 200
+        page.region("catch-word", [rng.choice(speakers)[0] + "."], x=PAGE_WIDTH - 400, width=200)
+    if region_mix.get("signature-mark") and number % 8 == 1:
+        page.y = PAGE_HEIGHT - 200
+        page.region("signature-mark", [f"B {number // 8 + 1}"], x=PAGE_WIDTH // 2 - 50, width=100)
+    return page
+
+
+def generate_pages(pages=50, seed=1, region_mix=None, lines_per_region=(3, 10), polygon_points=4, noise=0.05,
+                   speaker_count=6, reading_order=False):
+    """
+    Liefert (Dateiname, XML-Text) für ein synthetisches Drama.
+
+    Parameter:
+        pages (int): Seitenzahl einschließlich Personenverzeichnis
+        seed (int): Startwert des Zufallsgenerators
+        region_mix (Dict[str, float]): relative Häufigkeit der Regionstypen (siehe DEFAULT_REGION_MIX)
+        lines_per_region (Tuple[int, int]): minimale und maximale Zeilenzahl einer paragraph-Region
+        polygon_points (int): Punkte pro Zeilenpolygon (gerade Zahl >= 4)
+        noise (float): Wahrscheinlichkeit eines OCR-Fehlers in einem Sprechernamen
+        speaker_count (int): Anzahl der Figuren
+        reading_order (bool): jede Seite erhält eine ReadingOrder in Dokumentreihenfolge
+    """
+    rng = random.Random(seed)
+    region_mix = dict(DEFAULT_REGION_MIX if region_mix is None else region_mix)
+    speakers = SPEAKERS[:max(1, min(speaker_count, len(SPEAKERS)))]
+    digits = max(3, int(math.log10(max(pages, 1))) + 1)
+    state = {"act": 0, "scene": 0}
+
+    yield f"p{0:0{digits}d}.xml", toc_page(rng, polygon_points, speakers, reading_order).to_xml(f"p{0:0{digits}d}.jpg")
+    for number in range(1, pages):
+        page = text_page(rng, number, polygon_points, speakers, region_mix, lines_per_region, noise, state,
+                         reading_order)
+        yield f"p{number:0{digits}d}.xml", page.to_xml(f"p{number:0{digits}d}.jpg")
+
+
+def write_corpus(target, as_zip=False, **options):
+    """
+    Schreibt ein synthetisches Drama in den Ordner target bzw. als ZIP-Archiv nach target.
+    options wie bei generate_pages. Rückgabe: target
+    """
+    if as_zip:
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+            for filename, xml in generate_pages(**options):
+                zf.writestr(filename, xml)
+    else:
+        os.makedirs(target, exist_ok=True)
+        for filename, xml in generate_pages(**options):
+            with open(os.path.join(target, filename), "w", encoding="utf-8") as f:
+                f.write(xml)
+    return target
+
+
+def parse_region_mix(value):
+    """'paragraph=6,caption=2' -> {'paragraph': 6.0, 'caption': 2.0}"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetisches PAGE-XML-Drama erzeugen")
+    parser.add_argument("target", help="Zielordner (bzw. ZIP-Datei mit --zip)")
+    parser.add_argument("--pages", type=int, default=50, help="Seitenzahl")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--regions", type=parse_region_mix, default=None,
+                        help="Regionsmischung, z. B. paragraph=6,caption=2,heading=1,catch-word=1")
+    parser.add_argument("--lines", type=int, nargs=2, default=(3, 10), metavar=("MIN", "MAX"),
+                        help="Zeilen pro paragraph-Region")
+    parser.add_argument("--polygon-points", type=int, default=4, help="Punkte pro Zeilenpolygon")
+    parser.add_argument("--noise", type=float, default=0.05, help="Anteil verrauschter Sprechernamen")
+    parser.add_argument("--speakers", type=int, default=6, help="Anzahl der Figuren")
+    parser.add_argument("--reading-order", action="store_true", help="ReadingOrder auf jeder Seite")
+    parser.add_argument("--zip", action="store_true", help="als ZIP-Archiv schreiben")
+    args = parser.parse_args(argv)
+
+    write_corpus(
+        args.target,
+        as_zip=args.zip,
+        pages=args.pages,
+        seed=args.seed,
+        region_mix=args.regions,
+        lines_per_region=tuple(args.lines),
+        polygon_points=args.polygon_points,
+        noise=args.noise,
+        speaker_count=args.speakers,
+        reading_order=args.reading_order,
+    )
+    print(f"{args.pages} Seiten geschrieben nach {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Nicht-interaktive Gesamtkonvertierung PAGE → EzDrama → DraCor-TEI für viele Dramen.
+
+Jedes Drama liegt als eigener Unterordner (oder ZIP-Archiv) mit PAGE-XML-Dateien im Eingabeordner.
+Pro Drama werden über die Pipeline (modules/Pipeline.py) Preprocessing, automatische
+Sprecherübernahme (filter_valid_speakers mit interactive=False), Textbereinigung
+und die Konvertierung mit dem Parser ausgeführt. Die interaktiven Schritte 2–4 der
+App entfallen. Jedes Drama erhält einen eigenen Ausgabeordner mit Log-Datei und
+Messwerten je Schritt (run_report.json, siehe modules/Metrics.py).
+
+Mehrere Dramen laufen parallel in einem Prozess-Pool (Korpus-Modus). Die Dramen werden
+nach Seitenzahl absteigend verteilt (längste zuerst), damit am Ende nicht ein einzelnes
+langes Drama allein weiterläuft. Jeder Worker lädt den Parser und sein Speaker-ID-Memo
+einmal und nutzt beides für alle seine Dramen. Über alle Dramen entsteht ein
+Gesamtbericht mit Durchsatz und Fehlern (corpus_report.json).
+"""
+
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from modules.Dehyphenation import WordList
+from modules.EzLines import EzLines, ezlines_path, encode_ezlines
+from modules.Metrics import RunMetrics, REPORT_FILENAME
+from modules.PageSource import is_zip_source, count_pages
+from modules.PageCache import PageCache
+from modules.Pipeline import build_pipeline, Pages, DiskStore
+from modules.Profiling import StageProfiler, profiling_enabled_from_env, PROFILE_DIRNAME
+from modules.Provenance import chain, first_line_sources
+from modules.Workspace import STAGE_FILES, atomic_write_text, atomic_write_bytes
+
+METADATA_FILENAME = "metadata.txt"
+LOG_FILENAME = "convert.log"
+CACHE_DIRNAME = ".cache"
+CORPUS_REPORT_FILENAME = "corpus_report.json"
+
+# LineMaps von Schritt 5 zurück bis Schritt 1 (spätester zuerst, siehe modules/Provenance.py)
+LINE_MAP_STAGES = ("cleaned_map", "normalized_map", "brackets_map", "speaker_fix_map")
+
+# Speaker-ID-Memo, das alle Dramen eines (Worker-)Prozesses gemeinsam nutzen
+_speaker_id_cache = None
+
+
+def _get_speaker_id_cache():
+    global _speaker_id_cache
+    if _speaker_id_cache is None:
+        from modules.DraCorParser import SpeakerIdCache
+        _speaker_id_cache = SpeakerIdCache()
+    return _speaker_id_cache
+
+
+def _init_worker():
+    """
+    Vorbereitung eines Worker-Prozesses: importiert das Parser-Modul und legt das
+    Speaker-ID-Memo an, das alle Dramen des Workers teilen. Weitere Zustände werden
+    nicht vorgeladen. Läuft auch im Hauptprozess, damit per fork gestartete Worker
+    das Memo schon erben.
+    """
+    _get_speaker_id_cache()
+
+
+def find_plays(input_dir):
+    """
+    Liefert alle Dramen im Eingabeordner als sortierte Liste von (Name, Pfad).
+    Ein Drama ist ein Unterordner, der mindestens eine XML-Datei enthält, oder ein
+    ZIP-Archiv mit PAGE-XML; dessen Seiten werden direkt aus dem Archiv gelesen.
+    Der Name bestimmt den Ausgabeordner. Gibt es ihn schon (Ordner "X" und Archiv
+    "X.zip"), erhält das spätere Drama einen eigenen Namen ("X_zip", sonst "X_2" ...).
+    """
+    plays = []
+    names = set()
+    for entry in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, entry)
+        if os.path.isdir(path) and any(f.endswith(".xml") for f in os.listdir(path)):
+            name = entry
+        elif is_zip_source(path) and count_pages(path):
+            name = os.path.splitext(entry)[0]
+            if name in names:
+                name += "_zip"
+        else:
+            continue
+        unique_name = name
+        suffix = 2
+        while unique_name in names:
+            unique_name = f"{name}_{suffix}"
+            suffix += 1
+        if unique_name != os.path.splitext(entry)[0]:
+            logging.getLogger("batch").warning(f"{entry}: Name schon vergeben, Ausgabe unter {unique_name}")
+        names.add(unique_name)
+        plays.append((unique_name, path))
+    return plays
+
+
+def schedule_plays(plays):
+    """
+    Reihenfolge für die parallele Konvertierung: Dramen mit den meisten Seiten zuerst
+    (Longest Processing Time first). Der Pool verteilt in dieser Reihenfolge an den
+    jeweils frei werdenden Worker, die kurzen Dramen füllen am Ende die Lücken.
+
+    Rückgabe:
+        List[tuple]: (Name, Pfad, Seitenzahl), absteigend nach Seitenzahl
+    """
+    sized = [(name, path, count_pages(path)) for name, path in plays]
+    return sorted(sized, key=lambda play: play[2], reverse=True)
+
+
+def read_metadata(play_dir, play_name):
+    """
+    Liest den Metadatenblock (@title/@subtitle/@author) aus metadata.txt im
+    Dramenordner. Fehlt die Datei, wird der Ordnername als Titel verwendet.
+    """
+    metadata_path = os.path.join(play_dir, METADATA_FILENAME)
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            return f.read()
+    return f"@title {play_name}\n"
+
+
+def convert_play(play_name, play_dir, output_dir, cache_dir=None, keep_linebreaks=False,
+                 bracketstages=True, is_prose=True, dracor_id="ger000000", dracor_lang="de", profile=None,
+                 low_memory=False, dehyphenate=False, word_list=None):
+    """
+    Konvertiert ein einzelnes Drama vollständig und ohne Rückfragen.
+    Zwischenergebnisse werden in cache_dir (Standard: output_dir/.cache) nach Inhalts-Hash
+    abgelegt, sodass bei einem erneuten Lauf nur geänderte Schritte neu berechnet werden;
+    kommen Seiten hinzu oder werden ersetzt, werden nur diese neu geparst (modules/PageCache.py).
+    Mit profile=True (Standard: Umgebungsvariable DRACOR_PROFILE) landen Profile der
+    Schritte im Unterordner profiles/ (siehe modules/Profiling.py).
+    Mit low_memory=True schreibt der Parser die TEI-Datei direkt aus dem gespeicherten
+    bereinigten Text, ohne den ganzen Baum im Speicher zu halten (Parser.stream_lines_to_file);
+    der TEI-Schritt wird dann nicht zwischengespeichert.
+    Mit dehyphenate=True werden Trennstriche am Zeilenende gegen die Wörter des Dramas und
+    die Wortliste word_list (Pfad, optional) geprüft (siehe modules/Dehyphenation.py).
+
+    Rückgabe:
+        dict: Zusammenfassung mit Status, Ausgabedatei, Laufzeit und ggf. Fehlermeldung
+    """
+    play_output_dir = os.path.join(output_dir, play_name)
+    os.makedirs(play_output_dir, exist_ok=True)
+
+    logger = logging.getLogger(f"batch.{play_name}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.FileHandler(os.path.join(play_output_dir, LOG_FILENAME), mode="w", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+
+    summary = {"play": play_name, "status": "ok", "output": None, "error": None, "pages": 0}
+    metrics = RunMetrics()
+    start = time.perf_counter()
+    try:
+        logger.info(f"Starte Konvertierung: {play_dir}")
+        # Seitenzahl direkt aus der Quelle: aus dem Cache geladene Schritte zählen keine Seiten
+        summary["pages"] = count_pages(play_dir)
+
+        if profile is None:
+            profile = profiling_enabled_from_env()
+        store = DiskStore(cache_dir or os.path.join(output_dir, CACHE_DIRNAME))
+        pipeline = build_pipeline(
+            store=store,
+            speaker_id_cache=_get_speaker_id_cache(),
+            profiler=StageProfiler(os.path.join(play_output_dir, PROFILE_DIRNAME)) if profile else None,
+            page_cache=PageCache(store),
+        )
+        parser_options = {
+            "bracketstages": bracketstages,
+            "is_prose": is_prose,
+            "dracor_id": dracor_id,
+            "dracor_lang": dracor_lang,
+        }
+        text_stages = ("ezdrama", "cleaned") if low_memory else ("ezdrama", "cleaned", "tei")
+        results = pipeline.run_many(
+            ["preprocess", "speakers", "ezlines", *LINE_MAP_STAGES, *text_stages],
+            sources={"pages": Pages(play_dir)},
+            options={
+                "metadata": read_metadata(play_dir, play_name),
+                "keep_linebreaks": keep_linebreaks,
+                "dehyphenate": dehyphenate,
+                "word_list": WordList(word_list) if word_list else None,
+                **parser_options,
+            },
+            metrics=metrics,
+        )
+        for stage_name, state in pipeline.last_run.items():
+            seconds = metrics.stages[stage_name]["seconds"]
+            logger.info(f"Schritt {stage_name}: {'neu berechnet' if state == 'computed' else 'aus Cache'} ({seconds} s)")
+
+        preprocessed = results["preprocess"]
+        logger.info(f"{len(preprocessed['speaker_list_raw'])} Sprecherkandidaten, "
+                    f"{len(preprocessed['figuren'])} Figuren aus TOC")
+        # Sprecher automatisch übernommen (Score > 0.5)
+        logger.info(f"{len(results['speakers'])} Sprecher übernommen: {', '.join(results['speakers'])}")
+
+        for stage_name in text_stages:
+            atomic_write_text(os.path.join(play_output_dir, STAGE_FILES[stage_name]), results[stage_name])
+        # Herkunft der EzDrama-Zeilen (Seite, Region, Koordinaten) neben der Gesamtausgabe
+        atomic_write_bytes(ezlines_path(os.path.join(play_output_dir, STAGE_FILES["ezdrama"])), results["ezlines"])
+        cleaned_path = os.path.join(play_output_dir, STAGE_FILES["cleaned"])
+        # dasselbe für den bereinigten Text: je Zeile die erste PAGE-Zeile, aus der sie entstanden ist
+        cleaned_map = chain(*(results[stage_name] for stage_name in LINE_MAP_STAGES))
+        atomic_write_bytes(
+            ezlines_path(cleaned_path),
+            encode_ezlines(first_line_sources(cleaned_map, EzLines(results["ezlines"]))),
+        )
+        logger.info(f"Bereinigter Text gespeichert unter: {cleaned_path}")
+
+        tei_path = os.path.join(play_output_dir, STAGE_FILES["tei"])
+        if low_memory:
+            _stream_tei(cleaned_path, tei_path, parser_options, metrics)
+            logger.info(f"Schritt tei: speichersparend neu berechnet ({metrics.stages['tei']['seconds']} s)")
+        summary["output"] = tei_path
+        logger.info(f"Konvertierung abgeschlossen: {tei_path}")
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = f"{type(e).__name__}: {e}"
+        logger.error(traceback.format_exc())
+    finally:
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Dauer: {summary['seconds']} s")
+        metrics.write_report(os.path.join(play_output_dir, REPORT_FILENAME))
+        report = metrics.to_dict()
+        summary["stage_seconds"] = {name: entry["seconds"] for name, entry in report["stages"].items()}
+        logger.removeHandler(handler)
+        handler.close()
+
+    return summary
+
+
+def _stream_tei(cleaned_path, tei_path, parser_options, metrics):
+    """Schritt 6 im speichersparenden Modus: liest den bereinigten Text zeilenweise."""
+    from modules.DraCorParser import Parser
+    with metrics.stage("tei"):
+        parser = Parser(speaker_id_cache=_get_speaker_id_cache(), **parser_options)
+        # newline="\n": Zeilen wie bei text_to_lines nur an \n trennen
+        with open(cleaned_path, "r", encoding="utf-8", newline="\n") as f:
+            parser.stream_lines_to_file(f, tei_path, encoding="utf-8")
+
+
+def convert_plays(input_dir, output_dir, workers=1, **options):
+    """
+    Konvertiert alle Dramen aus input_dir nach output_dir und schreibt den Gesamtbericht
+    output_dir/corpus_report.json (siehe corpus_report).
+
+    Parameter:
+        input_dir (str): Ordner mit einem Unterordner pro Drama
+        output_dir (str): Zielordner, pro Drama wird ein Unterordner angelegt
+        workers (int): Anzahl paralleler Prozesse (1 = sequenziell)
+        options: weitere Argumente für convert_play (Parser- und Bereinigungsoptionen)
+
+    Rückgabe:
+        List[dict]: Zusammenfassungen in der Reihenfolge der Dramen
+    """
+    plays = find_plays(input_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    if workers <= 1:
+        summaries = [convert_play(name, path, output_dir, **options) for name, path in plays]
+    else:
+        _init_worker()
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            # z. B. BrokenProcessPool nach einem abgestürzten Worker: betroffene Dramen gelten
+            # als fehlgeschlagen, die übrigen Ergebnisse werden weiter eingesammelt
+            futures = {}
+            for name, path, pages in schedule_plays(plays):
+                try:
+                    futures[executor.submit(convert_play, name, path, output_dir, **options)] = (name, pages)
+                except Exception as e:
+                    results[name] = _failed_summary(name, pages, e)
+            for future in as_completed(futures):
+                name, pages = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = _failed_summary(name, pages, e)
+        summaries = [results[name] for name, _ in plays]
+
+    report = corpus_report(summaries, time.perf_counter() - start, workers)
+    atomic_write_text(os.path.join(output_dir, CORPUS_REPORT_FILENAME),
+                      json.dumps(report, indent=2, ensure_ascii=False))
+    return summaries
+
+
+def _failed_summary(play_name, pages, error):
+    """Zusammenfassung für ein Drama, dessen Worker kein Ergebnis geliefert hat."""
+    return {
+        "play": play_name,
+        "status": "error",
+        "output": None,
+        "error": f"{type(error).__name__}: {error}",
+        "pages": pages,
+        "seconds": 0.0,
+        "stage_seconds": {},
+    }
+
+
+def corpus_report(summaries, wall_seconds, workers):
+    """
+    Gesamtbericht über einen Korpus-Lauf: Durchsatz (Seiten pro Sekunde über die
+    Gesamtlaufzeit), aufsummierte Laufzeit je Schritt, Fehler und eine Zeile pro Drama.
+    """
+    converted = [s for s in summaries if s["status"] == "ok"]
+    pages = sum(s["pages"] for s in converted)
+    stage_seconds = {}
+    for summary in summaries:
+        for stage_name, seconds in summary.get("stage_seconds", {}).items():
+            stage_seconds[stage_name] = round(stage_seconds.get(stage_name, 0.0) + seconds, 4)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "plays": len(summaries),
+        "converted": len(converted),
+        "failed": len(summaries) - len(converted),
+        "pages": pages,
+        "wall_seconds": round(wall_seconds, 3),
+        "play_seconds": round(sum(s["seconds"] for s in summaries), 3),
+        "pages_per_second": round(pages / wall_seconds, 2) if wall_seconds else None,
+        "stage_seconds": stage_seconds,
+        "failures": [{"play": s["play"], "error": s["error"]} for s in summaries if s["status"] != "ok"],
+        "per_play": [
+            {
+                "play": s["play"],
+                "status": s["status"],
+                "pages": s["pages"],
+                "seconds": s["seconds"],
+                "pages_per_second": round(s["pages"] / s["seconds"], 2) if s["status"] == "ok" and s["seconds"] else None,
+            }
+            for s in summaries
+        ],
+    }
@@ -0,0 +1,178 @@
+"""
+Auflösen von Trennstrichen am Zeilenende mit Hilfe eines Wortverzeichnisses (Schritt 5).
+
+Ohne Verzeichnis zieht Schritt 5 jede Zeile, die auf "-" endet, mit der folgenden
+zusammen und entfernt den Strich (process_line). Echte Bindestriche gehen dabei
+verloren: "Sturm-" + "und Drang" wird zu "Sturmund Drang", "Ost-" + "Berlin" zu "OstBerlin".
+
+Ein Lexicon zählt, wie oft jedes Wort (klein geschrieben) im Drama selbst vorkommt,
+und nimmt optional eine Wortliste (WordList) hinzu. Für jede Trennung vergleicht
+Lexicon.join die zusammengezogene Form mit der Form mit Bindestrich:
+
+    Thea- / ter          "theater" bekannt                         → Theater
+    Ost- / Berlin        "ost-berlin" häufiger als "ostberlin"     → Ost-Berlin
+    Sturm- / und Drang   Ergänzungsstrich vor "und", "oder" ...    → Sturm- und Drang
+
+Ist keine der Formen bekannt, wird wie bisher zusammengezogen; nur vor einem groß
+geschriebenen Wort bleibt der Bindestrich stehen. Jede Entscheidung sind wenige
+Nachschlagungen in einem dict. Eine Wortliste wird pro Prozess nur einmal geladen
+und unter dem Hash ihres Inhalts wiederverwendet (höchstens WORD_LIST_CACHE_SIZE Listen).
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from modules.Metrics import count
+from modules.Workspace import COPY_BUFFER_SIZE
+
+# Wörter und Komposita mit Bindestrich ("Ost-Berlin")
+WORD_PATTERN = re.compile(r"\w+(?:-\w+)*")
+FIRST_WORD_PATTERN = re.compile(r"\w+")
+
+# Konjunktionen, vor denen ein Trennstrich am Zeilenende immer ein Ergänzungsstrich ist ("Sturm- und Drang")
+SUSPENSION_WORDS = frozenset({"und", "oder", "sowie", "u", "bzw", "beziehungsweise"})
+# mehrdeutige Wörter ("bis", "wie" ...): Ergänzungsstrich nur, wenn der Wortanfang als Wort bekannt ist
+AMBIGUOUS_SUSPENSION_WORDS = frozenset({"bis", "wie", "noch", "als"})
+
+# geladene Wortlisten pro Prozess: Inhalts-Hash -> Häufigkeiten; gleiche Listen (z. B. in
+# mehreren Sitzungen hochgeladen) teilen sich einen Eintrag, die am längsten nicht
+# benutzten fallen zuerst heraus
+WORD_LIST_CACHE_SIZE = 4
+_word_lists = OrderedDict()
+_word_lists_lock = threading.Lock()
+
+
+def _is_hyphenated(line):
+    # dieselbe Regel wie TextStages.process_line
+    line = line.rstrip()
+    return line.endswith("-") and not line.endswith(" -") and not line.endswith("--")
+
+
+def _last_word_start(text):
+    # rückwärts statt per Regex: der Puffer eines Absatzes kann sehr lang werden
+    start = len(text)
+    while start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+        start -= 1
+    return start
+
+
+class WordList:
+    """
+    Wortliste als Datei: ein Wort pro Zeile, optional gefolgt von seiner Häufigkeit
+    (durch Leerzeichen oder Tabulator getrennt). Zeilen mit "#" am Anfang werden übergangen.
+    Der Hash der Datei geht in den Schlüssel des Pipeline-Schritts ein.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._signature = None
+        self._digest = None
+
+    def fingerprint(self):
+        """Hash des Dateiinhalts; neu berechnet nur, wenn sich mtime oder Größe ändern."""
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            digest = hashlib.sha256()
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+                    digest.update(chunk)
+            self._signature, self._digest = signature, digest.hexdigest()
+        return self._digest
+
+    def counts(self):
+        """Häufigkeit je Wort (klein geschrieben)."""
+        digest = self.fingerprint()
+        with _word_lists_lock:
+            counts = _word_lists.get(digest)
+            if counts is not None:
+                _word_lists.move_to_end(digest)
+                return counts
+
+            counts = {}
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if not parts or parts[0].startswith("#"):
+                        continue
+                    frequency = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+                    word = parts[0].lower()
+                    counts[word] = counts.get(word, 0) + frequency
+
+            _word_lists[digest] = counts
+            while len(_word_lists) > WORD_LIST_CACHE_SIZE:
+                _word_lists.popitem(last=False)
+            return counts
+
+
+class Lexicon:
+    """
+    Worthäufigkeiten aus dem Drama (counts) und einer optionalen Wortliste.
+    Beide dicts bleiben getrennt, damit eine große Wortliste nicht für jedes Drama kopiert wird.
+    """
+
+    def __init__(self, counts=None, word_list=None):
+        self.counts = counts or {}
+        self.word_list_counts = word_list.counts() if word_list is not None else {}
+
+    @classmethod
+    def from_lines(cls, lines, word_list=None):
+        """
+        Zählt die Wörter der Zeilen. Die Bruchstücke an getrennten Zeilenenden ("Thea-" / "ter")
+        zählen nicht mit, sonst wäre jeder Wortanfang schon als Wort bekannt.
+        """
+        counts = {}
+        previous_hyphenated = False
+        for line in lines:
+            words = WORD_PATTERN.findall(line)
+            hyphenated = _is_hyphenated(line)
+            if previous_hyphenated and words:
+                words = words[1:]
+            if hyphenated and words:
+                words = words[:-1]
+            for word in words:
+                word = word.lower()
+                counts[word] = counts.get(word, 0) + 1
+                if "-" in word:
+                    for part in word.split("-"):
+                        counts[part] = counts.get(part, 0) + 1
+            previous_hyphenated = hyphenated
+        return cls(counts, word_list)
+
+    def frequency(self, word):
+        word = word.lower()
+        return self.counts.get(word, 0) + self.word_list_counts.get(word, 0)
+
+    def join(self, left, right):
+        """
+        Setzt eine Zeile, deren Trennstrich am Ende schon entfernt ist (left), mit der
+        folgenden Zeile (right) zusammen: ohne Strich, mit Bindestrich oder mit
+        Ergänzungsstrich und Leerzeichen.
+        """
+        start = _last_word_start(left)
+        tail_match = FIRST_WORD_PATTERN.match(right)
+        if start == len(left) or tail_match is None:
+            return left + right
+        head = left[start:]
+        tail = tail_match.group()
+
+        joined = self.frequency(head + tail)
+        hyphenated = self.frequency(f"{head}-{tail}")
+        if joined and joined >= hyphenated:
+            count("hyphens_removed")
+            return left + right
+        if hyphenated:
+            count("hyphens_kept")
+            return f"{left}-{right}"
+        tail_lower = tail.lower()
+        if tail_lower in SUSPENSION_WORDS or (tail_lower in AMBIGUOUS_SUSPENSION_WORDS and self.frequency(head)):
+            count("hyphens_suspended")
+            return f"{left}- {right}"
+        if tail[0].isupper():
+            count("hyphens_kept")
+            return f"{left}-{right}"
+        count("hyphens_removed")
+        return left + right
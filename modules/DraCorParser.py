@@ -12,11 +12,172 @@ https://github.com/dracor-org/ezdrama/blob/main/ezdramaparser.ipynb
 # Import statements
 # =================================
 
+import os
 import re
+import shutil
+import tempfile
 from datetime import datetime
-from transliterate import translit
-import yiddish
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from modules.GenderGazetteer import gazetteer_sex
+
+# transliterate and yiddish are only needed for ukrainian/yiddish speaker IDs,
+# they are imported on first use (yiddish alone takes ~0.5 s to import)
+
+# =================================
+# Precompiled patterns and tables
+# =================================
+
+UKRAINIAN_CHARS = re.compile(r'[йцукенгшщзхъфывапролджэячсмитью]')
+YIDDISH_CHARS = re.compile('[אאַאָבבֿגדהוװוּױזחטייִײײַככּךלמםנןסעפּפֿףצץקרששׂתּת]')
+HEBREW_POINTS = re.compile(r'[\u0591-\u05BD\u05C1\u05C2\\u05C7]')
+STARTING_WITH_NUMBER = re.compile(r'(\d+.*?)(_)(.+)')
+
+# all replacements after transliteration are single characters,
+# so they can be done in one str.translate call
+CLEAN_AFTER_TRANSLIT_TABLE = str.maketrans({
+    'і': 'i',
+    'ї': 'i',
+    'є': 'e',
+    'ы': 'y',
+    "'": None,
+    "’": None,
+    "«": None,
+    "»": None,
+    "′": None,
+    " ": "_",
+})
+
+FEMALE_SUFFIXES = ('a', 'e', 'ine', 'ene', 'ette', 'ett', 'elle', 'ia', 'ie', 'ea', 'traud', 'gard', 'ique', 'ise')
+
+# how often parse_lines_to_xml reports progress
+PROGRESS_EVERY_LINES = 1000
+
+# auxiliary element names of the low-memory mode, they never reach the output:
+# the sentinel keeps the neighbours of a rendered part from being joined with it,
+# the marker stands for a <div> whose opening tag has already been written,
+# the body placeholder marks where the streamed body goes into the final file
+STREAM_SENTINEL = 'dracorStreamSentinel'
+STREAM_MARKER = 'dracorStreamMarker'
+STREAM_BODY = 'dracorStreamBody'
+
+# punctuation right after a bracket stage belongs to the stage
+STAGE_PUNCTUATION = '.,:!;'
+
+
+# =================================
+# Line lexer
+# =================================
+# Hand-written scanners for the inline markup of a line. Each one does
+# a single left-to-right pass with str.find and gives exactly the same
+# result as the regular expression quoted in its docstring (including
+# the quirks of that expression), without running the regex engine on
+# every line of the play.
+
+def _next_bracket(line, start):
+    '''index of the next ( or ) at or after start, len(line) if there is none'''
+    opening = line.find('(', start)
+    closing = line.find(')', start)
+    if opening < 0:
+        return closing if closing >= 0 else len(line)
+    if closing < 0:
+        return opening
+    return min(opening, closing)
+
+
+def _stage_end(line, opening):
+    r'''index of the bracket closing the stage opened at opening, or -1;
+    like the lazy \(.+?\) it needs at least one character inside, takes
+    the first closing bracket after it and does not cross a line break'''
+    closing = line.find(')', opening + 2)
+    if closing < 0 or line.find('\n', opening + 1, closing) >= 0:
+        return -1
+    return closing
+
+
+def split_bracket_stages(line):
+    r'''splits a speech line into (text before, stage, text after) triplets;
+    same result as re.findall(r'([^()]*)(\(.+?\)[.,:!;]?)([^()]*)', line),
+    which also means that text findall does not match (e.g. in front
+    of a stray closing bracket) is dropped'''
+    triplets = []
+    position = 0
+    while True:
+        opening = line.find('(', position)
+        if opening < 0:
+            return triplets
+        closing = _stage_end(line, opening)
+        if closing < 0:
+            position = opening + 1
+            continue
+        # the text before the stage starts after the last closing bracket
+        last_closing = line.rfind(')', position, opening)
+        start = last_closing + 1 if last_closing >= 0 else position
+        end = closing + 1
+        if end < len(line) and line[end] in STAGE_PUNCTUATION:
+            end += 1
+        after = _next_bracket(line, end)
+        triplets.append((line[start:opening], line[opening:end], line[end:after]))
+        position = after
+
+
+def split_speaker_stage(line):
+    r'''finds the first bracket stage with text in front of it in a speaker line;
+    returns (text before, stage, punctuation or None) like the groups of
+    re.search(r'([^()]+)(\(.+?\))([.,:!;])?', line), None if there is none'''
+    position = 0
+    while True:
+        opening = line.find('(', position)
+        if opening < 0:
+            return None
+        last_closing = line.rfind(')', position, opening)
+        start = last_closing + 1 if last_closing >= 0 else position
+        closing = _stage_end(line, opening) if start < opening else -1
+        if closing < 0:
+            position = opening + 1
+            continue
+        end = closing + 1
+        punctuation = line[end] if end < len(line) and line[end] in STAGE_PUNCTUATION else None
+        return line[start:opening], line[opening:end], punctuation
+
+
+def ends_comment(line):
+    r'''same as re.search(r'-->\s*$', line)'''
+    return line.rstrip().endswith('-->')
+
+
+def strip_comment_marks(line, marks=('<!--', '-->')):
+    r'''removes the comment marks; where two marks start at the same
+    position the earlier one in marks wins, like the alternation in
+    re.sub(r'(\<\!--|--\>)', '', line)'''
+    parts = []
+    position = 0
+    while True:
+        found = -1
+        found_mark = None
+        for mark in marks:
+            index = line.find(mark, position)
+            if index >= 0 and (found < 0 or index < found):
+                found = index
+                found_mark = mark
+        if found < 0:
+            parts.append(line[position:])
+            return ''.join(parts)
+        parts.append(line[position:found])
+        position = found + len(found_mark)
+
+
+class SpeakerIdCache():
+    '''Memo for the derived speaker IDs (keyed by speaker text)
+    and the gender guesses (keyed by ID).
+    A play has only a few dozen distinct speakers, so every
+    derivation is done once; one cache can be shared by several
+    Parser instances, e.g. when converting many plays in batch mode'''
+
+    def __init__(self):
+        self.ids = {}
+        self.genders = {}
+
 
 # =================================
 # Parser engine
@@ -35,7 +196,8 @@ class Parser():
                  bracketstages = True,
                  is_prose = True,
                  dracor_id = 'insert_id',
-                 dracor_lang = 'insert_lang'):
+                 dracor_lang = 'insert_lang',
+                 speaker_id_cache = None):
         ## initializing a new TEI/XML bs-tree that will be populated from ezdrama text:
         self.tree_root = Tag(name='TEI')
         self.tree_root['xmlns'] = "http://www.tei-c.org/ns/1.0"
@@ -59,10 +221,30 @@ class Parser():
         self.current_lowest_tag = body
         self.current_lowest_div = body
         self.current_lowest_div['level'] = 0
+        self.divs = [] # all created <div>s, typed in post-processing
+        self.body = body
+
+        # low-memory mode (stream_lines_to_file): finished body elements
+        # are written to body_sink and removed from the tree
+        self.body_sink = None
+        self.opened = [] # <div>s whose opening tag is already in body_sink
+        self.body_flushed = False
+        self.stream_formatter = None
+        self.body_lead = 0 # number of strings at the start of <body>, they are never streamed
+
+        # state of the <sp> that is currently being filled line by line
+        self.current_sp = None
+        self.sp_buffer = '' # text of the current sp line not terminated by a newline yet
+        self.sp_has_speaker = False
+        self.sp_is_prose = is_prose
+        self.set_of_char_pairs = set() # set of ID + charname pairs for particDesc
 
         # defining the set of EzDrama special symbols
         self.special_symb_list = '@$^#<'
         self.bracketstages = bracketstages
+
+        # memo for speaker IDs and gender guesses, may be shared between parsers
+        self.speaker_id_cache = speaker_id_cache if speaker_id_cache is not None else SpeakerIdCache()
         
     ### Auxiliary methods for building TEI metadata structure (header/standoff) stub:
     
@@ -156,11 +338,13 @@ class Parser():
         
     ### Main parsing methods:
         
-    def __parse_lines(self, ezdramalines):
+    def __parse_lines(self, ezdramalines, progress=None):
                     
         self.lasting_comment = False # for multiline comment parsing
         
-        for line in ezdramalines:
+        for line_number, line in enumerate(ezdramalines, start=1):
+            if progress and line_number % PROGRESS_EVERY_LINES == 0:
+                progress(line_number, len(ezdramalines) if hasattr(ezdramalines, '__len__') else None)
             if line.startswith('@author'):
                 self.__add_author_to_header(self.tree_root.teiHeader, line.strip())
             elif line.startswith('@title'):
@@ -172,32 +356,74 @@ class Parser():
                 rest_of_line = line[1:] # taking the rest of the line
                 if first_character in self.special_symb_list:
                     self.__handle_line_with_markup(first_character, rest_of_line)
+                    if self.body_sink is not None:
+                        self.__flush_finished()
                 else:
-                    if self.lasting_comment and re.search(r'-->\s*$', line):
-                        line = re.sub(r'(\<\!--|--\>)', '',line)
-                        self.current_lowest_tag.append(line)
-                        self.current_lowest_tag = self.current_lowest_div
+                    if self.lasting_comment and ends_comment(line):
+                        line = strip_comment_marks(line)
+                        self.__append_to_current_tag(line)
+                        self.__set_current_tag(self.current_lowest_div)
                         self.lasting_comment = False
                     else:
-                        self.current_lowest_tag.append(line)
-        
-        
-    def process_file(self, path_to_file):
+                        self.__append_to_current_tag(line)
+        self.__close_sp()
+        
+    def process_file(self, path_to_file, low_memory=False):
+        '''low_memory: read the file line by line and write the body
+        as it is parsed (see stream_lines_to_file)'''
+        if low_memory:
+            with open(path_to_file) as openfile:
+                self.stream_lines_to_file(openfile, path_to_file.replace('.txt', '.xml'))
+            return
         with open(path_to_file) as openfile:
             file_lines = openfile.readlines()
         self.parse_lines_to_xml(file_lines)
         self.output_to_file(path_to_file.replace('.txt', '.xml'))
 
 
-    def parse_lines_to_xml(self, ezdramalines):
+    def parse_lines_to_xml(self, ezdramalines, progress=None):
         '''this method takes list of lines 
         containing a whole play 
         in ezdrama format (see sample 
-        in the README: https://github.com/dracor-org/ezdrama)'''
-        self.__parse_lines(ezdramalines)
+        in the README: https://github.com/dracor-org/ezdrama);
+        progress, if given, is called as progress(lines_done, lines_total)
+        every PROGRESS_EVERY_LINES lines'''
+        self.__parse_lines(ezdramalines, progress)
         self.__post_process()
         pretty_tree = self.__indent_dracor_style()
         self.tree_to_write = self.__add_spaces_inline_stages(pretty_tree)
+
+    def stream_lines_to_file(self, ezdramalines, newfilepath, progress=None, encoding=None):
+        '''low-memory variant of parse_lines_to_xml + output_to_file
+        for very long plays: ezdramalines can be any iterable of lines
+        (e.g. an open file); every finished element of <body> is
+        written to a temporary file as soon as the parser has moved on,
+        so only the open <div>s and their last children stay in memory;
+        header, particDesc and castList are rendered at the end and the
+        body is spliced in; the file is the same as in the normal mode,
+        but tree_to_write is not set'''
+        with tempfile.TemporaryFile('w+', encoding=encoding) as body_sink:
+            self.body_sink = body_sink
+            try:
+                self.__parse_lines(ezdramalines, progress)
+                self.__flush_finished(final=True)
+            finally:
+                self.body_sink = None
+            self.__post_process()
+            pretty_tree = self.__add_spaces_inline_stages(self.__indent_dracor_style())
+
+            part_path = newfilepath + '.part'
+            with open(part_path, 'w', encoding=encoding) as outfile:
+                if self.body_flushed:
+                    head, tail = self.__split_at_body_placeholder(pretty_tree)
+                    outfile.write(head)
+                    body_sink.seek(0)
+                    shutil.copyfileobj(body_sink, outfile)
+                    outfile.write(tail)
+                else:
+                    outfile.write(pretty_tree)
+            os.replace(part_path, newfilepath)
+        self.outputname = newfilepath
         
           
         
@@ -209,7 +435,7 @@ class Parser():
             new_stage = Tag(name='stage')
             new_stage.append(rest_of_line.strip())
             self.current_lowest_div.append(new_stage)
-            self.current_lowest_tag = new_stage # if you comment this out, 
+            self.__set_current_tag(new_stage) # if you comment this out, 
             #your $-<stage>s will stop being multiline,
             # they will just capture one $-marked line and all the next lines will go to previous lowest tag
         #elif first_character == '(': DELETE
@@ -221,25 +447,25 @@ class Parser():
          #   self.current_lowest_div.append(new_stage)
         elif first_character == '@':
             new_sp = Tag(name='sp')
-            new_sp.append(rest_of_line)
             self.current_lowest_div.append(new_sp)
-            self.current_lowest_tag = new_sp
+            self.__open_sp(new_sp)
+            self.__append_to_current_tag(rest_of_line)
         elif first_character == '^':
             new_cl = Tag(name='castList')
             new_cl.append(rest_of_line)
             self.tree_root.front.append(new_cl)
-            self.current_lowest_tag = new_cl
+            self.__set_current_tag(new_cl)
         elif first_character == '<':
             #handle_comment(first_chara) REWRITE AS DEDICATED METHOD/FUNCTION
             if rest_of_line.startswith('!--'):
                 new_comment = Tag(name='comment')
                 self.current_lowest_div.append(new_comment)
-                if not re.search(r'-->\s*$', rest_of_line):
+                if not ends_comment(rest_of_line):
                     self.lasting_comment=True
-                    self.current_lowest_tag = new_comment
-                new_comment.append(re.sub(r'(\<?\!--|--\>)', '', rest_of_line))
+                    self.__set_current_tag(new_comment)
+                new_comment.append(strip_comment_marks(rest_of_line, ('<!--', '!--', '-->')))
             else:
-                self.current_lowest_tag.append(rest_of_line)
+                self.__append_to_current_tag(rest_of_line)
 
 
         elif first_character == '#':
@@ -249,6 +475,8 @@ class Parser():
             new_div_level = self.__get_div_level(rest_of_line)
             new_div['level'] = new_div_level
             new_div.append(head)
+            if self.body_sink is None: # streamed divs are typed when written
+                self.divs.append(new_div)
 
             current_level = int(self.current_lowest_div.attrs.get('level', 0))
 
@@ -265,7 +493,59 @@ class Parser():
                     temp_div.append(new_div)
 
             self.current_lowest_div = new_div
-            self.current_lowest_tag = new_div
+            self.__set_current_tag(new_div)
+
+    def __set_current_tag(self, tag):
+        '''makes tag the current lowest tag;
+        an <sp> that stops being the current tag can never
+        receive text again, so it gets closed here'''
+        if self.current_sp is not None and tag is not self.current_sp:
+            self.__close_sp()
+        self.current_lowest_tag = tag
+
+    def __append_to_current_tag(self, text):
+        '''text going into an <sp> is split into lines
+        and turned into speaker/speech elements right away,
+        everything else is appended as is'''
+        if self.current_sp is not None and self.current_lowest_tag is self.current_sp:
+            if '\n' in text:
+                sp_lines = (self.sp_buffer + text).split('\n')
+                for sp_line in sp_lines[:-1]:
+                    self.__handle_sp_line(sp_line)
+                self.sp_buffer = sp_lines[-1]
+            else:
+                self.sp_buffer += text
+        else:
+            self.current_lowest_tag.append(text)
+
+    ## Speech (<sp>) building methods
+
+    def __open_sp(self, sp):
+        self.__set_current_tag(sp)
+        self.current_sp = sp
+        self.sp_buffer = ''
+        self.sp_has_speaker = False
+        self.sp_is_prose = self.is_prose # memorising the global prose or verse mode
+
+    def __close_sp(self):
+        '''handles the unterminated rest of the current sp (if any)'''
+        if self.current_sp is None:
+            return
+        self.__handle_sp_line(self.sp_buffer)
+        self.sp_buffer = ''
+        self.current_sp = None
+
+    def __handle_sp_line(self, line):
+        '''first line of an sp is the speaker line,
+        all the following ones are speech'''
+        sp = self.current_sp
+        if not self.sp_has_speaker:
+            self.sp_has_speaker = True
+            self.__handle_speaker_in_sp(sp, line)
+            if 'who' in sp.attrs:
+                self.set_of_char_pairs.add((sp['who'], sp.speaker.text.strip('.,:!; ')))
+        else:
+            self.__handle_speech_line(sp, line)
 
     
     
@@ -292,31 +572,28 @@ class Parser():
     ### Post-processing functions 
     
     def __post_process(self):
-        set_of_char_pairs = set() # set of ID + charname pairs for particDesc
-        
         self.__add_cast_items()
         
         del self.tree_root.find('body')['level']
         
-        for sp in self.tree_root.find_all('sp'):
-            self.__post_process_sp(sp)
-            if 'who' in sp.attrs:
-                set_of_char_pairs.add((sp['who'], sp.speaker.text.strip('.,:!; '))) 
-        for div in self.tree_root.find_all('div'):
-            level = int(div.attrs.get('level', -1))
-            div.attrs = {}  # löscht "level" und mögliche Reste
-
-            if level == 1:
-                div['type'] = 'act'
-            elif level == 2:
-                div['type'] = 'scene'
-            elif level == 3:
-                div['type'] = 'subscene'
-
-        self.__add_particdesc_to_header(set_of_char_pairs)
+        for div in self.divs:
+            div.attrs = self.__div_attrs(div)  # löscht "level" und mögliche Reste
+
+        self.__add_particdesc_to_header(self.set_of_char_pairs)
         self.__add_rev_desc()    
         
     
+    def __div_attrs(self, div):
+        '''final attributes of a <div>: its type instead of the level'''
+        level = int(div.attrs.get('level', -1))
+        if level == 1:
+            return {'type': 'act'}
+        elif level == 2:
+            return {'type': 'scene'}
+        elif level == 3:
+            return {'type': 'subscene'}
+        return {}
+
     def __add_cast_items(self):
         castList = self.tree_root.find('castList')
         if castList:
@@ -356,7 +633,7 @@ class Parser():
         for pair in set_of_char_pairs:
             person = Tag(name = 'person')
             person['xml:id'] = pair[0].strip('#')
-            person['sex'] = self.__guess_gender(person['xml:id'])
+            person['sex'] = self.__cached_gender(person['xml:id'])
             persName = Tag(name = 'persName')
             person.append(persName)
             #print(pair[1])
@@ -369,14 +646,14 @@ class Parser():
     def __handle_speaker_in_sp(self, sp, first_line):
         speaker = Tag(name='speaker')
         sp.append(speaker)
-        check_stage = re.search(r'([^()]+)(\(.+?\))([.,:!;])?', first_line)
-        if check_stage and self.bracketstages:
-            speaker.append(check_stage.group(1).strip())
+        check_stage = split_speaker_stage(first_line) if self.bracketstages else None
+        if check_stage:
+            speaker_text, stage_text, ending_punct = check_stage
+            speaker.append(speaker_text.strip())
             inside_stage = Tag(name='stage')
-            inside_stage.append(check_stage.group(2).strip())
+            inside_stage.append(stage_text.strip())
             sp.append(inside_stage)
 
-            ending_punct = check_stage.group(3)
             if ending_punct is not None:
                 speaker.append(ending_punct.strip())
         else:
@@ -387,47 +664,46 @@ class Parser():
         
             
     def __transliterate_speaker_ids(self, sp, speaker):
+        speaker_text = speaker.text
+        who = self.speaker_id_cache.ids.get(speaker_text)
+        if who is None:
+            who = self.__derive_speaker_id(speaker_text)
+            self.speaker_id_cache.ids[speaker_text] = who
+        sp['who'] = who
+        
+        
+    def __derive_speaker_id(self, speaker_text):
         
         ## ukrainian ids transliterated
-        if re.search(r'[йцукенгшщзхъфывапролджэячсмитью]', speaker.text.lower()):
-            clean_who = self.__clean_after_translit(translit(speaker.text.strip('. '), 'uk', 
+        if UKRAINIAN_CHARS.search(speaker_text.lower()):
+            from transliterate import translit
+            clean_who = self.__clean_after_translit(translit(speaker_text.strip('. '), 'uk', 
                                                       reversed=True)).lower()
             clean_who = clean_who.strip('.,:!; ')
 
         ## yiddish ids transliterated
-        elif re.search('[אאַאָבבֿגדהוװוּױזחטייִײײַככּךלמםנןסעפּפֿףצץקרששׂתּת]', speaker.text.lower()):
-            clean_who = yiddish.transliterate(speaker.text.strip('.,:!; '))
-            clean_who = re.sub(r'[\u0591-\u05BD\u05C1\u05C2\\u05C7]', ' ', clean_who)
+        elif YIDDISH_CHARS.search(speaker_text.lower()):
+            import yiddish
+            clean_who = yiddish.transliterate(speaker_text.strip('.,:!; '))
+            clean_who = HEBREW_POINTS.sub(' ', clean_who)
         else:
-            clean_who = speaker.text.strip('.,:!; ').lower()
+            clean_who = speaker_text.strip('.,:!; ').lower()
             clean_who = self.__clean_after_translit(clean_who)
             
             
         clean_who = self.__fix_starting_w_number(clean_who)
         
-        sp['who'] = f'#{clean_who}'
+        return f'#{clean_who}'
         
         
     def __fix_starting_w_number(self, clean_who): ##  1-ja_divchyna etc.
-        match = re.match(r'(\d+.*?)(_)(.+)', clean_who)
+        match = STARTING_WITH_NUMBER.match(clean_who)
         if match is not None:
             clean_who = f'{match.group(3)}{match.group(2)}{match.group(1)}'
         return clean_who
         
     def __clean_after_translit(self, line):
-        line = line.replace('і', 'i')
-        line = line.replace('ї', 'i')
-        line = line.replace('і', 'i')
-        line = line.replace('є', 'e')
-        line = line.replace('є', 'e')
-        line = line.replace('ы', 'y')
-        line = line.replace("'", "")
-        line = line.replace("’", "")
-        line = line.replace("«", "")
-        line = line.replace("»", "")
-        line = line.replace("′", "")
-        line = line.replace(" ", "_")
-        return line
+        return line.translate(CLEAN_AFTER_TRANSLIT_TABLE)
         
         
     def __handle_line_with_brackets(self, speechtext, check_inline_brackets):        
@@ -442,12 +718,23 @@ class Parser():
                 speechtext.append(triplet[2])
 
         
+    def __cached_gender(self, someid):
+        gender = self.speaker_id_cache.genders.get(someid)
+        if gender is None:
+            gender = self.__guess_gender(someid)
+            self.speaker_id_cache.genders[someid] = gender
+        return gender
+
     def __guess_gender(self, someid):
-        female_suffixes = ('a', 'e', 'ine', 'ene', 'ette', 'ett', 'elle', 'ia', 'ie', 'ea', 'traud', 'gard', 'ique', 'ise')
+        '''frau anywhere in the ID, then the first name or role
+        in the ID found in the gazetteer, then the suffix rules'''
         lowered = someid.lower()
         if 'frau' in lowered:
             return 'FEMALE'
-        if lowered.endswith(female_suffixes):
+        sex = gazetteer_sex(lowered)
+        if sex is not None:
+            return sex
+        if lowered.endswith(FEMALE_SUFFIXES):
             return 'FEMALE'
         return 'MALE'
 
@@ -458,40 +745,25 @@ class Parser():
         else:
             speechtext = Tag(name='l')
         if len(line) > 0:
-            check_inline_brackets  = re.findall(r'([^()]*)(\(.+?\)[.,:!;]?)([^()]*)', line)
-            if check_inline_brackets and self.bracketstages:
+            check_inline_brackets = split_bracket_stages(line) if self.bracketstages else None
+            if check_inline_brackets:
                 self.__handle_line_with_brackets(speechtext, check_inline_brackets)
             else:
                 speechtext.append(line)
             sp.append(speechtext)
             
             
-    def __handle_speech_in_sp(self, sp, text_split_in_lines):
-        current_speech_is_prose = self.is_prose # memorising the global prose or verse mode
-        for line in text_split_in_lines[1:]:
-            if line.startswith('%'):
-                inlinestage = Tag(name='stage')
-                inlinestage.append(line.strip('%'))
-                sp.append(inlinestage)
-            elif line.startswith('~'): # switch from main mode (prose or verse) to the opposite
-                current_speech_is_prose = not current_speech_is_prose 
-                line = line.strip('~') # removing the special switch symbol
-                self.__add_line_to_speech(line, sp, current_speech_is_prose)
-            else:
-                self.__add_line_to_speech(line, sp, current_speech_is_prose)
-        
-        
-    def __post_process_sp(self, sp):
-        text_of_sp = sp.text
-        sp.clear()
-        text_split_in_lines = text_of_sp.split('\n')
-        first_line = text_split_in_lines[0]
-        
-        # handle speaker line
-        self.__handle_speaker_in_sp(sp, first_line)
-        
-        # handle the rest of the sp
-        self.__handle_speech_in_sp(sp, text_split_in_lines)
+    def __handle_speech_line(self, sp, line):
+        if line.startswith('%'):
+            inlinestage = Tag(name='stage')
+            inlinestage.append(line.strip('%'))
+            sp.append(inlinestage)
+        elif line.startswith('~'): # switch from main mode (prose or verse) to the opposite
+            self.sp_is_prose = not self.sp_is_prose
+            line = line.strip('~') # removing the special switch symbol
+            self.__add_line_to_speech(line, sp, self.sp_is_prose)
+        else:
+            self.__add_line_to_speech(line, sp, self.sp_is_prose)
         
         
         
@@ -499,7 +771,19 @@ class Parser():
         
     def __indent_dracor_style(self):
         
-        output = self.tree_root.prettify()
+        output = self.__dracor_style(self.tree_root.prettify())
+        
+        ## checking if it's still valid xml after all the indentation work
+        BeautifulSoup(output, 'xml') 
+            
+        #returning
+        return output
+
+    def __dracor_style(self, output):
+        '''turns prettify() output into DraCor indentation;
+        all the substitutions only look at one element and its
+        neighbouring lines, so they can be applied to parts
+        of the tree as well (see __render_children)'''
         
         output = re.sub(r'(<[^/]+?>)\n\s+([^<>\s])', '\\1\\2', output) ## removing linebreak after the opening tag
         output = re.sub(r'([^<>\s])\n\s+(</.+?>)', '\\1\\2', output) ## removing linebreak before the closing tag
@@ -520,15 +804,135 @@ class Parser():
             newline = re.sub('^( +)', '\\1'*2, line) 
             output_lines.append(newline) 
             
-        output = '\n'.join(output_lines)
-        
-        ## checking if it's still valid xml after all the indentation work
-        BeautifulSoup(output, 'xml') 
-            
-        #returning
-        return output
+        return '\n'.join(output_lines)
     
         
+    def __flush_finished(self, final=False):
+        '''low-memory mode: writes the finished children of <body> and of
+        the open <div>s (the path down to current_lowest_div) to body_sink
+        and removes them from the tree; the last child of the lowest div
+        and everything from the current tag on may still grow and stays;
+        text at the very start of <body> stays too, it is joined with the
+        <body> tag and rendered with the header at the end;
+        with final=True the whole body is written'''
+        chain = [self.current_lowest_div]
+        while chain[-1] is not self.body:
+            chain.append(chain[-1].parent)
+        chain.reverse()
+        if final:
+            chain = chain[:1]
+
+        for depth, container in enumerate(chain):
+            contents = container.contents
+            start = 0
+            if container is self.body:
+                start = self.body_lead
+                if not self.body_flushed:
+                    while start < len(contents) and isinstance(contents[start], NavigableString):
+                        start += 1
+
+            if final:
+                # text at the end of <body> is joined with </body>
+                stop = len(contents)
+                if stop > start and isinstance(contents[-1], NavigableString):
+                    stop -= 1
+            elif depth + 1 < len(chain):
+                stop = self.__child_index(container, chain[depth + 1])
+            else:
+                stop = len(contents) - 1
+                if self.current_lowest_tag.parent is container:
+                    stop = min(stop, self.__child_index(container, self.current_lowest_tag))
+            if stop <= start:
+                continue
+
+            for opened_depth, div in enumerate(chain[1:depth + 1], start=1):
+                if not any(div is opened for opened in self.opened):
+                    self.body_sink.write(self.__render_opening(div, 2 + opened_depth))
+                    self.opened.append(div)
+            rendered = self.__render_children(contents[start:stop], 3 + depth)
+            self.body_sink.write(self.__add_spaces_inline_stages(rendered))
+            if container is self.body:
+                self.body_flushed = True
+                self.body_lead = start
+
+        if final and self.body_flushed:
+            self.body.insert(self.body_lead, Tag(name=STREAM_BODY))
+
+    def __stream_formatter(self):
+        '''the formatter prettify() uses for the whole tree; looking it up
+        for every detached part again is surprisingly expensive'''
+        if self.stream_formatter is None:
+            self.stream_formatter = self.tree_root.formatter_for_name('minimal')
+        return self.stream_formatter
+
+    def __child_index(self, container, child):
+        for index, candidate in enumerate(container.contents):
+            if candidate is child:
+                return index
+        return len(container.contents)
+
+    def __render_opening(self, div, indent_level):
+        '''the opening tag line of a <div> whose children are written one by one'''
+        wrapper = Tag(name=div.name, attrs=self.__div_attrs(div))
+        wrapper.append(Tag(name=STREAM_SENTINEL))
+        rendered = wrapper.decode(indent_level=indent_level, formatter=self.__stream_formatter())
+        lines = self.__dracor_style(rendered).split('\n')
+        sentinel = '<%s>' % STREAM_SENTINEL
+        return '\n'.join(lines[:self.__line_index(lines, sentinel)]) + '\n'
+
+    def __render_children(self, children, indent_level, closing=None):
+        '''renders children (removing them from the tree) the way they
+        look inside the whole prettified tree at indent_level;
+        with closing (an opened <div>) its closing tag is rendered too;
+        opened <div>s among children are rendered recursively'''
+        if closing is not None:
+            wrapper = Tag(name=closing.name, attrs=self.__div_attrs(closing))
+        else:
+            wrapper = Tag(name=STREAM_SENTINEL)
+        wrapper.append(Tag(name=STREAM_SENTINEL))
+        opened_children = []
+        for child in list(children):
+            if any(child is opened for opened in self.opened):
+                opened_children.append(child)
+                child = Tag(name=STREAM_MARKER)
+            elif isinstance(child, Tag) and child.name == 'div': # only <div>s contain <div>s
+                for div in [child] + child.find_all('div'):
+                    div.attrs = self.__div_attrs(div)
+            wrapper.append(child)
+        if closing is None:
+            wrapper.append(Tag(name=STREAM_SENTINEL))
+
+        rendered = wrapper.decode(indent_level=indent_level - 1, formatter=self.__stream_formatter())
+        lines = self.__dracor_style(rendered).split('\n')
+        lines = lines[self.__line_index(lines, '</%s>' % STREAM_SENTINEL) + 1:]
+        if closing is None:
+            lines = lines[:self.__line_index(lines, '<%s>' % STREAM_SENTINEL, last=True)]
+        elif lines[-1] == '':
+            lines.pop()
+
+        output = []
+        marker = '<%s>' % STREAM_MARKER
+        line_iter = iter(lines)
+        for line in line_iter:
+            if line.strip() == marker:
+                next(line_iter) # closing marker tag
+                opened = opened_children.pop(0)
+                self.opened = [div for div in self.opened if div is not opened]
+                output.append(self.__render_children(opened.contents, indent_level + 1, closing=opened))
+                opened.extract()
+            else:
+                output.append(line + '\n')
+        return ''.join(output)
+
+    def __line_index(self, lines, stripped_line, last=False):
+        indices = [index for index, line in enumerate(lines) if line.strip() == stripped_line]
+        return indices[-1] if last else indices[0]
+
+    def __split_at_body_placeholder(self, pretty_tree):
+        lines = pretty_tree.split('\n')
+        index = self.__line_index(lines, '<%s>' % STREAM_BODY)
+        return '\n'.join(lines[:index]) + '\n', '\n'.join(lines[index + 2:])
+
     def output_to_file(self, newfilepath):
         with open(newfilepath, 'w') as outfile:
             outfile.write(self.tree_to_write)
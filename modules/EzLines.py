@@ -0,0 +1,194 @@
+"""
+Binäres Begleitformat (.ezlines) zur EzDrama-Gesamtausgabe: Herkunft jeder Zeile.
+
+Die EzDrama-Datei ist reiner Text; Seite, Region, Zeilen-ID und Koordinaten der
+PAGE-Vorlage gehen darin verloren. Die .ezlines-Datei daneben hält sie pro Zeile
+der Gesamtausgabe fest, sodass spätere Schritte, Prüfwerkzeuge und Editoren sie
+nachschlagen können, ohne die PAGE-Dateien erneut zu parsen.
+
+Aufbau (alle Zahlen int32/uint32, little-endian, 4-Byte-ausgerichtet):
+
+    Kopf        b"EZLN", Version, Zeilenzahl n, Anzahl Zeichenketten k
+    Spalten     8 Spalten zu je n int32: page, region_id, region_type, line_id
+                (Index in die Zeichenkettentabelle, -1 = keine Herkunft, z. B. Metadaten)
+                und x0, y0, x1, y1 (umschließendes Rechteck der Zeile)
+    Tabelle     k + 1 Endpositionen (uint32) und die UTF-8-Bytes aller Zeichenketten
+
+Die Spalten lassen sich direkt aus einer per mmap eingeblendeten Datei lesen
+(EzLines.open): Nachschlagen einer Zeile kostet einen Indexzugriff je Spalte, die
+Datei wird dabei nicht vollständig gelesen.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+from modules.Workspace import atomic_write_bytes
+
+MAGIC = b"EZLN"
+VERSION = 1
+SUFFIX = ".ezlines"
+
+HEADER = struct.Struct("<4sIII")
+COLUMNS = ("page", "region_id", "region_type", "line_id", "x0", "y0", "x1", "y1")
+NO_SOURCE = -1
+
+# die Spalten werden ohne Kopie als int32 gelesen, wenn die Maschine little-endian ist
+_NATIVE = sys.byteorder == "little"
+
+
+def ezlines_path(text_path):
+    """Pfad der .ezlines-Datei zu einer EzDrama-Textdatei."""
+    text_path = str(text_path)
+    stem = text_path[:-4] if text_path.endswith(".txt") else text_path
+    return stem + SUFFIX
+
+
+def encode_ezlines(line_sources):
+    """
+    Kodiert die Herkunft aller Zeilen.
+
+    Parameter:
+        line_sources: Liste mit einem Eintrag pro Zeile der EzDrama-Datei, entweder None
+            oder (Seite, Regions-ID, Regionstyp, Zeilen-ID, (x0, y0, x1, y1))
+    """
+    strings = {}
+
+    def string_index(value):
+        if value is None:
+            return NO_SOURCE
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    columns = [array("i") for _ in COLUMNS]
+    for source in line_sources:
+        if source is None:
+            values = (NO_SOURCE, NO_SOURCE, NO_SOURCE, NO_SOURCE, 0, 0, 0, 0)
+        else:
+            page, region_id, region_type, line_id, box = source
+            values = (string_index(page), string_index(region_id), string_index(region_type),
+                      string_index(line_id), *box)
+        for column, value in zip(columns, values):
+            column.append(value)
+
+    blob = bytearray()
+    ends = array("I")
+    for value in strings:  # dict behält die Einfügereihenfolge = Index
+        blob += value.encode("utf-8")
+        ends.append(len(blob))
+    if not _NATIVE:
+        for column in (*columns, ends):
+            column.byteswap()
+
+    parts = [HEADER.pack(MAGIC, VERSION, len(line_sources), len(strings))]
+    parts.extend(column.tobytes() for column in columns)
+    parts.append(array("I", [0]).tobytes())
+    parts.append(ends.tobytes())
+    parts.append(bytes(blob))
+    return b"".join(parts)
+
+
+def write_ezlines(path, line_sources):
+    atomic_write_bytes(path, encode_ezlines(line_sources))
+    return path
+
+
+class EzLines:
+    """
+    Lesezugriff auf kodierte Herkunftsdaten (bytes oder per mmap eingeblendete Datei).
+
+        with EzLines.open("1_drama_text.ezlines") as ezlines:
+            ezlines.source(120)   # Herkunft der Zeile 121 oder None
+    """
+
+    def __init__(self, buffer):
+        self._mmap = None
+        self._view = memoryview(buffer)
+        magic, version, self.line_count, string_count = HEADER.unpack_from(self._view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Keine .ezlines-Daten dieser Version")
+        offset = HEADER.size
+        size = 4 * self.line_count
+        self._columns = {}
+        for name in COLUMNS:
+            self._columns[name] = self._ints(offset, size, "i")
+            offset += size
+        self._ends = self._ints(offset, 4 * (string_count + 1), "I")
+        self._blob_offset = offset + 4 * (string_count + 1)
+        self._strings = {}
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        ezlines = cls(mapped)
+        ezlines._mmap = mapped
+        return ezlines
+
+    def close(self):
+        # erst die Sichten freigeben, sonst lässt sich das mmap nicht schließen
+        self._columns = {}
+        self._ends = None
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.line_count
+
+    def _ints(self, offset, size, typecode):
+        view = self._view[offset:offset + size]
+        if _NATIVE:
+            return view.cast(typecode)
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
+
+    def _string(self, index):
+        if index == NO_SOURCE:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            start = self._blob_offset + self._ends[index]
+            end = self._blob_offset + self._ends[index + 1]
+            value = self._strings[index] = bytes(self._view[start:end]).decode("utf-8")
+        return value
+
+    def source(self, line_index):
+        """
+        Herkunft der Zeile line_index (0-basiert) als dict mit page, region_id,
+        region_type, line_id und box, oder None (z. B. für den Metadatenblock).
+        """
+        columns = self._columns
+        page = columns["page"][line_index]
+        if page == NO_SOURCE:
+            return None
+        return {
+            "page": self._string(page),
+            "region_id": self._string(columns["region_id"][line_index]),
+            "region_type": self._string(columns["region_type"][line_index]),
+            "line_id": self._string(columns["line_id"][line_index]),
+            "box": tuple(columns[name][line_index] for name in ("x0", "y0", "x1", "y1")),
+        }
+
+    def sources(self):
+        """Herkunft aller Zeilen in der Form von encode_ezlines."""
+        result = []
+        for line_index in range(self.line_count):
+            source = self.source(line_index)
+            if source is None:
+                result.append(None)
+            else:
+                result.append((source["page"], source["region_id"], source["region_type"],
+                               source["line_id"], source["box"]))
+        return result
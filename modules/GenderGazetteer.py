@@ -0,0 +1,50 @@
+"""
+Geschlecht einer Figur für die sex-Angabe in particDesc aus einem Namensverzeichnis.
+
+resources/gender_gazetteer.tsv enthält Vornamen und Rollenbezeichnungen ("gräfin",
+"knecht", "lady" ...) mit f oder m. Die Datei wird beim ersten Aufruf einmal in ein
+dict geladen; danach kostet eine Abfrage nur das Zerlegen der Figuren-ID in Wörter
+und je Wort einen Zugriff auf das dict.
+"""
+
+import os
+import re
+import threading
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "gender_gazetteer.tsv")
+
+SEX_VALUES = {"f": "FEMALE", "m": "MALE"}
+
+# Wörter einer Figuren-ID ("karl_moor", "gräfin_orsina", "1-ja_divchyna")
+ID_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _load_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = {}
+            with open(GAZETTEER_PATH, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    name, sex = line.rstrip("\n").split("\t")
+                    index[name] = SEX_VALUES[sex]
+            _index = index
+    return _index
+
+
+def gazetteer_sex(speaker_id):
+    """
+    "FEMALE" bzw. "MALE" für das erste Wort der ID, das im Verzeichnis steht,
+    sonst None ("sohn_der_gräfin" → MALE, "lady_milford" → FEMALE).
+    """
+    index = _index if _index is not None else _load_index()
+    for word in ID_WORD_PATTERN.findall(speaker_id.lower()):
+        sex = index.get(word)
+        if sex is not None:
+            return sex
+    return None
@@ -1,8 +1,9 @@
-import os
 import xml.etree.ElementTree as ET
 import re
 import difflib
 from collections import defaultdict
+from modules.Metrics import count
+from modules.PageSource import iter_pages
 
 ns = {'pc': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15'}
 
@@ -11,8 +12,11 @@ type_prefix = {
 }
 
 def extract_lines(filepath):
-    tree = ET.parse(filepath)
-    root = tree.getroot()
+    return extract_root_lines(ET.parse(filepath).getroot())
+
+
+def extract_root_lines(root):
+    """Zeilen (y-Mitte, x-Minimum, Text) der paragraph-Regionen einer geparsten Seite."""
     lines_data = []
 
     for region in root.findall('.//pc:TextRegion', ns):
@@ -47,38 +51,49 @@ def extract_lines(filepath):
                     formatted_text = f"{prefix}{text.text}" if prefix else text.text
                     lines_data.append((y_center, x_min, formatted_text))
 
+    count("lines_extracted", len(lines_data))
     return lines_data
 
-def extract_sentences_with_dot_and_limit(directory):
+def extract_sentences_with_dot_and_limit(directory, progress=None):
+    """
+    directory kann ein Ordner mit PAGE-XML oder ein ZIP-Archiv sein.
+    progress (optional) wird nach jeder Seite mit (erledigt, gesamt) aufgerufen.
+    """
     extracted_sentences = set()
     speaker_examples = {}
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".xml"):
-            filepath = os.path.join(directory, filename)
-            lines = extract_lines(filepath)
+    for filename, open_page in iter_pages(directory, progress):
+        with open_page() as page:
+            lines = extract_lines(page)
+        collect_sentences(lines, extracted_sentences, speaker_examples)
 
-            for _, _, text in lines:
-                clean_text = text.lstrip("#@$^").strip()
-                if not clean_text or not (clean_text[0].isupper() or re.match(r'^[vV](\.|\s|,|;)\s*', clean_text)):
-                    continue
+    return extracted_sentences, speaker_examples
 
-                # Indizes aller Punkte in den ersten 13 Zeichen sammeln
-                dot_indices = [m.start() for m in re.finditer(r'\.', clean_text) if m.start() <= 13]
 
-                if dot_indices:
-                    # Bis zu drei Punkte berücksichtigen
-                    for i in range(min(3, len(dot_indices))):
-                        end_pos = dot_indices[i]
-                        sentence = clean_text[:end_pos + 1].strip()
-                        extracted_sentences.add(sentence)
+def collect_sentences(lines, extracted_sentences, speaker_examples):
+    """
+    Sammelt die Sprecherkandidaten einer Seite in extracted_sentences und je Kandidat die
+    erste Beispielzeile in speaker_examples (frühere Einträge bleiben erhalten).
+    """
+    for _, _, text in lines:
+        clean_text = text.lstrip("#@$^").strip()
+        if not clean_text or not (clean_text[0].isupper() or re.match(r'^[vV](\.|\s|,|;)\s*', clean_text)):
+            continue
 
-                        # Speichere den *gesamten* clean_text als Beispiel
-                        cleaned_sentence = re.sub(r'[^\w\s]', '', sentence).strip().lower()
-                        if cleaned_sentence not in speaker_examples:
-                            speaker_examples[cleaned_sentence] = clean_text
+        # Indizes aller Punkte in den ersten 13 Zeichen sammeln
+        dot_indices = [m.start() for m in re.finditer(r'\.', clean_text) if m.start() <= 13]
 
-    return extracted_sentences, speaker_examples
+        if dot_indices:
+            # Bis zu drei Punkte berücksichtigen
+            for i in range(min(3, len(dot_indices))):
+                end_pos = dot_indices[i]
+                sentence = clean_text[:end_pos + 1].strip()
+                extracted_sentences.add(sentence)
+
+                # Speichere den *gesamten* clean_text als Beispiel
+                cleaned_sentence = re.sub(r'[^\w\s]', '', sentence).strip().lower()
+                if cleaned_sentence not in speaker_examples:
+                    speaker_examples[cleaned_sentence] = clean_text
 
 
 
@@ -130,11 +145,14 @@ def compute_similarity(word, figuren):
     best_score = 0.0
     word_clean = re.sub(r'[^\w\s]', '', word).strip().lower()
     tokens = word_clean.split()
+    comparisons = 0
 
     for token in tokens:
         for figur in figuren:
+            comparisons += 1
             score = difflib.SequenceMatcher(None, token, figur).ratio()
             if token == figur:
+                count("similarity_comparisons", comparisons)
                 return figur, 1.0
             if score > best_score or (
                 score == best_score and abs(len(token) - len(figur)) < abs(len(token) - len(best_match) if best_match else 100)
@@ -142,6 +160,7 @@ def compute_similarity(word, figuren):
                 best_score = score
                 best_match = figur
 
+    count("similarity_comparisons", comparisons)
     return best_match, best_score
 
 
@@ -206,39 +225,46 @@ def filter_valid_speakers(speaker_list, figuren, speaker_examples=None, interact
 
     return valid_speakers
 
-def extract_toc_entries(folder_path):
+def extract_toc_entries(folder_path, progress=None):
     """
     Extrahiert den Text aller <TextLine>-Elemente innerhalb von <TextRegion type="TOC-entry">
-    aus allen PAGE XML-Dateien im angegebenen Ordner.
+    aus allen PAGE XML-Dateien im angegebenen Ordner (oder ZIP-Archiv).
+    progress (optional) wird nach jeder Seite mit (erledigt, gesamt) aufgerufen.
 
     Rückgabe:
         str: Alle extrahierten Zeilen, durch Zeilenumbrüche getrennt, als ein einziger String.
     """
-    ns = {'pc': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15'}
     lines_text = []
 
-    for filename in os.listdir(folder_path):
-        if filename.lower().endswith('.xml'):
-            filepath = os.path.join(folder_path, filename)
-            tree = ET.parse(filepath)
-            root = tree.getroot()
-
-            for region in root.findall('.//pc:TextRegion[@type="TOC-entry"]', ns):
-                for line in region.findall('pc:TextLine', ns):
-                    text_equivs = line.findall('pc:TextEquiv', ns)
-                    text_equiv = None
-
-                    # Bevorzugt index="0", sonst den letzten vorhandenen
-                    for te in text_equivs:
-                        if te.attrib.get('index') == '0':
-                            text_equiv = te
-                            break
-                    if text_equiv is None and text_equivs:
-                        text_equiv = text_equivs[-1]
-
-                    if text_equiv is not None:
-                        text_el = text_equiv.find('pc:Unicode', ns)
-                        if text_el is not None and text_el.text:
-                            lines_text.append(text_el.text.strip())
+    for filename, open_page in iter_pages(folder_path, progress):
+        with open_page() as page:
+            tree = ET.parse(page)
+        lines_text.extend(toc_lines(tree.getroot()))
 
     return "\n".join(lines_text)
+
+
+def toc_lines(root):
+    """Die gestrippten Zeilen der TOC-entry-Regionen einer geparsten Seite."""
+    ns = {'pc': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15'}
+    lines_text = []
+
+    for region in root.findall('.//pc:TextRegion[@type="TOC-entry"]', ns):
+        for line in region.findall('pc:TextLine', ns):
+            text_equivs = line.findall('pc:TextEquiv', ns)
+            text_equiv = None
+
+            # Bevorzugt index="0", sonst den letzten vorhandenen
+            for te in text_equivs:
+                if te.attrib.get('index') == '0':
+                    text_equiv = te
+                    break
+            if text_equiv is None and text_equivs:
+                text_equiv = text_equivs[-1]
+
+            if text_equiv is not None:
+                text_el = text_equiv.find('pc:Unicode', ns)
+                if text_el is not None and text_el.text:
+                    lines_text.append(text_el.text.strip())
+
+    return lines_text
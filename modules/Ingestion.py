@@ -0,0 +1,85 @@
+"""
+Parsen hochgeladener Seiten parallel zum Import.
+
+Ohne Ingestion werden die Seiten beim Import nur in den Arbeitsbereich geschrieben;
+geparst wird erst, wenn "Preprocessing starten" geklickt wird. Eine Ingestion übergibt
+jede Seite, sobald sie geschrieben ist, einem Thread-Pool, der ihr Preprocessing-Ergebnis
+im PageCache ablegt (PageCache.preprocess_page). Während weitere Seiten geschrieben und
+die Metadaten ausgefüllt werden, läuft das Parsen bereits; das Preprocessing findet
+danach die meisten Seiten im Cache.
+
+Am Ergebnis ändert sich nichts: Es entstehen nur die Einträge im PageCache, die das
+Preprocessing sonst selbst angelegt hätte. Fehler einer Seite (z. B. kein gültiges XML)
+werden hier nur protokolliert und wie bisher vom Preprocessing gemeldet.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import as_completed
+
+logger = logging.getLogger(__name__)
+
+# Schrittname für den Fortschritts-Callback während wait()
+INGEST_STAGE = "ingest"
+
+
+class Ingestion:
+    """
+    Seiten einer Sitzung, die im Hintergrund vorab geparst werden.
+    executor ist ein (vom Server-Prozess geteilter) ThreadPoolExecutor.
+
+    Attribute:
+        added (int): Anzahl übergebener Seiten
+        finished (int): Anzahl bereits verarbeiteter Seiten
+    """
+
+    def __init__(self, page_cache, executor):
+        self.page_cache = page_cache
+        self.executor = executor
+        self.added = 0
+        self.finished = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def add(self, path, data=None):
+        """
+        Startet das Preprocessing der bereits geschriebenen Seite path. Liegt ihr
+        Inhalt schon im Speicher (data), wird die Datei nicht erneut gelesen.
+        """
+        future = self.executor.submit(self._ingest, os.fspath(path), data)
+        with self._lock:
+            self._pending.add(future)
+            self.added += 1
+        future.add_done_callback(self._done)
+
+    def _ingest(self, path, data):
+        try:
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            self.page_cache.preprocess_page(data)
+        except Exception:
+            logger.warning("Seite %s konnte nicht vorab geparst werden", path, exc_info=True)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+            self.finished += 1
+
+    @property
+    def is_idle(self):
+        return not self._pending
+
+    def wait(self, progress=None):
+        """
+        Wartet, bis alle übergebenen Seiten verarbeitet sind, und meldet dabei
+        progress(INGEST_STAGE, erledigt, gesamt).
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if progress is not None:
+            progress(INGEST_STAGE, self.finished, self.added)
+        for _ in as_completed(pending):
+            if progress is not None:
+                progress(INGEST_STAGE, self.finished, self.added)
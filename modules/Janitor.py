@@ -0,0 +1,157 @@
+"""
+Aufräumen alter Sitzungs-Arbeitsbereiche (uploads/<uuid>).
+
+Jede Sitzung markiert bei jedem Rerun ihren Arbeitsbereich als benutzt (Workspace.touch).
+Der Janitor löscht im Hintergrund
+    1. alle Arbeitsbereiche, die länger als die TTL nicht benutzt wurden, und
+    2. danach die am längsten unbenutzten Arbeitsbereiche (LRU), solange die
+       Gesamtgröße über der Obergrenze liegt. Arbeitsbereiche, die innerhalb der
+       Mindest-Ruhezeit (Standard: ein Aufräumintervall) benutzt wurden, bleiben dabei
+       immer erhalten; lässt sich die Obergrenze so nicht einhalten, wird das protokolliert.
+
+Laufende Hintergrund-Jobs der App markieren ihren Arbeitsbereich regelmäßig als benutzt
+(heartbeat in modules/Jobs.py), solange sie laufen, auch ohne Rerun der Seite.
+
+Konfiguration über Umgebungsvariablen:
+    DRACOR_WORKSPACE_TTL_HOURS    (Standard 24)
+    DRACOR_WORKSPACE_MAX_MB       (Standard 2048)
+    DRACOR_JANITOR_INTERVAL_S     (Standard 600)
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+
+from modules.Workspace import ACTIVITY_FILE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_TOTAL_BYTES = 2048 * 1024 * 1024
+DEFAULT_INTERVAL_SECONDS = 600
+
+
+def directory_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.stat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass  # Datei wurde inzwischen gelöscht
+    return total
+
+
+def last_access(path):
+    """
+    Zeitpunkt der letzten Benutzung: mtime der Aktivitätsdatei, sonst des Ordners.
+    """
+    try:
+        return os.stat(os.path.join(path, ACTIVITY_FILE)).st_mtime
+    except OSError:
+        return os.stat(path).st_mtime
+
+
+def collect_garbage(root, ttl_seconds=DEFAULT_TTL_SECONDS, max_total_bytes=DEFAULT_MAX_TOTAL_BYTES, now=None,
+                    min_idle_seconds=DEFAULT_INTERVAL_SECONDS):
+    """
+    Löscht abgelaufene bzw. überzählige Arbeitsbereiche unter root. Wegen der
+    Obergrenze werden nur Arbeitsbereiche gelöscht, die länger als min_idle_seconds
+    nicht benutzt wurden; eine laufende Sitzung verliert so nie ihre Dateien.
+
+    Rückgabe:
+        dict: removed (Liste gelöschter Ordner), reclaimed_bytes, remaining_bytes,
+            over_limit (True, wenn die Obergrenze nicht eingehalten werden konnte)
+    """
+    now = time.time() if now is None else now
+    report = {"removed": [], "reclaimed_bytes": 0, "remaining_bytes": 0, "over_limit": False}
+    if not os.path.isdir(root):
+        return report
+
+    workspaces = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            try:
+                workspaces.append((last_access(path), directory_size(path), path))
+            except OSError:
+                continue  # parallel gelöscht
+
+    # am längsten unbenutzte zuerst
+    workspaces.sort()
+    total = sum(size for _, size, _ in workspaces)
+
+    for accessed, size, path in workspaces:
+        idle = now - accessed
+        if idle <= ttl_seconds and (total <= max_total_bytes or idle <= min_idle_seconds):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        report["removed"].append(path)
+        report["reclaimed_bytes"] += size
+
+    report["remaining_bytes"] = total
+    report["over_limit"] = total > max_total_bytes
+    return report
+
+
+class Janitor(threading.Thread):
+    """
+    Hintergrund-Thread, der collect_garbage periodisch ausführt.
+    Der letzte Bericht steht in last_report.
+    """
+
+    def __init__(self, root, ttl_seconds=DEFAULT_TTL_SECONDS, max_total_bytes=DEFAULT_MAX_TOTAL_BYTES,
+                 interval_seconds=DEFAULT_INTERVAL_SECONDS):
+        super().__init__(name="workspace-janitor", daemon=True)
+        self.root = str(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.interval_seconds = interval_seconds
+        self.last_report = None
+        self._stop_event = threading.Event()
+
+    def run_once(self):
+        report = collect_garbage(self.root, self.ttl_seconds, self.max_total_bytes,
+                                 min_idle_seconds=self.interval_seconds)
+        if report["removed"]:
+            logger.info(
+                f"{len(report['removed'])} Arbeitsbereich(e) gelöscht, "
+                f"{report['reclaimed_bytes'] / 1024 / 1024:.1f} MB freigegeben, "
+                f"{report['remaining_bytes'] / 1024 / 1024:.1f} MB belegt"
+            )
+        if report["over_limit"]:
+            logger.warning(
+                f"Obergrenze von {self.max_total_bytes / 1024 / 1024:.1f} MB nicht eingehalten: "
+                f"{report['remaining_bytes'] / 1024 / 1024:.1f} MB in gerade benutzten Arbeitsbereichen"
+            )
+        self.last_report = report
+        return report
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Aufräumen der Arbeitsbereiche fehlgeschlagen")
+            self._stop_event.wait(self.interval_seconds)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def janitor_from_env(root):
+    """
+    Erzeugt und startet einen Janitor mit der Konfiguration aus den Umgebungsvariablen.
+    """
+    janitor = Janitor(
+        root,
+        ttl_seconds=float(os.environ.get("DRACOR_WORKSPACE_TTL_HOURS", DEFAULT_TTL_SECONDS / 3600)) * 3600,
+        max_total_bytes=int(float(os.environ.get("DRACOR_WORKSPACE_MAX_MB",
+                                                 DEFAULT_MAX_TOTAL_BYTES / 1024 / 1024)) * 1024 * 1024),
+        interval_seconds=float(os.environ.get("DRACOR_JANITOR_INTERVAL_S", DEFAULT_INTERVAL_SECONDS)),
+    )
+    janitor.start()
+    return janitor
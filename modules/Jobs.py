@@ -0,0 +1,196 @@
+"""
+Hintergrund-Jobs für lange Verarbeitungsschritte.
+
+Ein JobRunner führt Aufgaben in einem Thread-Pool aus und verwaltet sie in einer
+Registry (Job-ID -> Job). Die Aufgabe erhält einen Fortschritts-Callback
+progress(schritt, erledigt, gesamt), über den sie meldet, welcher Schritt gerade
+läuft und wie viele Seiten bzw. Zeilen erledigt sind. Derselbe Callback prüft, ob
+der Job abgebrochen wurde, und beendet die Aufgabe dann mit JobCancelled.
+
+Die App fragt den Zustand des Jobs regelmäßig ab (st.fragment mit run_every) und
+übernimmt das Ergebnis, sobald der Job fertig ist. Da der Runner zum Server-Prozess
+gehört, läuft ein Job auch dann weiter, wenn die Verbindung zum Browser kurz abreißt.
+
+Ein Job kann einen heartbeat erhalten, den der Runner beim Start und danach alle
+heartbeat_seconds aufruft, solange der Job läuft. Die App markiert damit ihren
+Arbeitsbereich als benutzt, damit der Janitor ihn während eines langen Jobs nicht löscht.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Wird im Job-Thread ausgelöst, wenn der Job abgebrochen wurde."""
+
+
+class Job:
+    """
+    Zustand eines Hintergrund-Jobs. Wird vom Job-Thread geschrieben und von der App gelesen.
+
+    Attribute:
+        status (str): queued, running, done, failed oder cancelled
+        stage (str): zuletzt gemeldeter Schritt
+        done, total (int): Fortschritt innerhalb des Schritts (total ist None, solange unbekannt)
+        result: Rückgabewert der Aufgabe (bei done)
+        error (str): Fehlermeldung (bei failed)
+        heartbeat (callable): optional, wird regelmäßig aufgerufen, solange der Job läuft
+    """
+
+    def __init__(self, name, heartbeat=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.heartbeat = heartbeat
+        self.status = QUEUED
+        self.stage = None
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel_event = threading.Event()
+        self._finished_event = threading.Event()
+
+    def report(self, stage, done=0, total=None):
+        """Fortschritts-Callback für die Aufgabe; löst JobCancelled aus, wenn abgebrochen wurde."""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+        self.stage = stage
+        self.done = done
+        self.total = total
+
+    def cancel(self):
+        """Fordert den Abbruch an; die Aufgabe endet beim nächsten Fortschritts-Aufruf."""
+        self._cancel_event.set()
+        if self.status == QUEUED:
+            self._finish(CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def is_finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def fraction(self):
+        """Fortschritt innerhalb des aktuellen Schritts zwischen 0 und 1."""
+        if not self.total:
+            return 0.0
+        return min(self.done / self.total, 1.0)
+
+    def wait(self, timeout=None):
+        """Wartet höchstens timeout Sekunden auf das Ende des Jobs; True, wenn er beendet ist."""
+        return self._finished_event.wait(timeout)
+
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished = time.time()
+        self._finished_event.set()
+
+
+class JobRunner:
+    """
+    Thread-Pool mit Job-Registry.
+
+    Parameter:
+        max_workers (int): Anzahl gleichzeitig laufender Jobs
+        keep_seconds (float): wie lange beendete Jobs in der Registry bleiben
+        heartbeat_seconds (float): Abstand der heartbeat-Aufrufe laufender Jobs
+    """
+
+    def __init__(self, max_workers=2, keep_seconds=3600, heartbeat_seconds=60):
+        self.keep_seconds = keep_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def submit(self, name, func, *args, heartbeat=None, **kwargs):
+        """
+        Startet func(*args, progress=job.report, **kwargs) im Hintergrund. heartbeat
+        (optional) wird beim Start und danach regelmäßig aufgerufen, solange der Job läuft.
+
+        Rückgabe:
+            Job
+        """
+        job = Job(name, heartbeat)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            for job in self.jobs():
+                job.cancel()
+        self._executor.shutdown(wait=True)
+        self._stop_event.set()
+
+    def _run(self, job, func, args, kwargs):
+        if job.is_finished:  # schon vor dem Start abgebrochen
+            return
+        job.status = RUNNING
+        self._beat(job)
+        try:
+            result = func(*args, progress=job.report, **kwargs)
+        except JobCancelled:
+            job._finish(CANCELLED)
+            logger.info(f"Job {job.name} ({job.id}) abgebrochen")
+        except Exception as e:
+            job._finish(FAILED, error=f"{type(e).__name__}: {e}")
+            logger.exception(f"Job {job.name} ({job.id}) fehlgeschlagen")
+        else:
+            job._finish(DONE, result=result)
+
+    def _beat(self, job):
+        if job.heartbeat is None:
+            return
+        try:
+            job.heartbeat()
+        except Exception:
+            logger.warning(f"Heartbeat für Job {job.name} ({job.id}) fehlgeschlagen", exc_info=True)
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            for job in self.jobs():
+                if job.status == RUNNING:
+                    self._beat(job)
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and now - job.finished > self.keep_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
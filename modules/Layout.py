@@ -0,0 +1,191 @@
+"""
+Lesereihenfolge einer PAGE-Seite aus der Lage der Zeilen (für Seiten ohne ReadingOrder).
+
+Die Zeilen werden als Rechtecke (x0, y0, x1, y1) aus ihren Coords behandelt. Statt nur
+nach y zu gruppieren, zerlegt order_lines die Seite rekursiv:
+
+1. Spaltenzwischenräume: Lücken in der x-Projektion der schmalen Zeilen (schmaler als
+   NARROW_FRACTION der Breite des Ausschnitts). Die Projektion entsteht durch Sortieren
+   und Zusammenfassen der x-Intervalle, die Lücken bilden einen sortierten Intervall-Index,
+   in dem per Bisektion geprüft wird, ob eine Zeile eine Lücke überspannt.
+2. Zeilen, die eine Lücke überspannen (Überschriften über beide Spalten, Fließtextzeilen
+   einer einspaltigen Seite), trennen den Ausschnitt in waagerechte Bänder; jedes Band
+   wird für sich weiter zerlegt.
+3. Ohne überspannende Zeilen entstehen Spalten, die nacheinander gelesen werden.
+   Sehr schmale Spalten (Marginalien, Sprechernamen am Rand, Kustoden) werden der
+   benachbarten breiteren Spalte zugeschlagen und dort nach ihrer Höhe eingeordnet.
+4. Innerhalb einer Spalte bilden Zeilen, die sich in der Höhe überwiegend überdecken,
+   eine Reihe, die von links nach rechts gelesen wird.
+
+Jede Ebene sortiert einmal, die Ausschnitte werden dabei kleiner; auf üblichen und
+dichten Seiten bleibt der Aufwand nahe O(n log n).
+"""
+
+import statistics
+from bisect import bisect_left, bisect_right
+
+# Anteil an der Breite des Ausschnitts, unter dem eine Zeile als schmal gilt
+NARROW_FRACTION = 0.55
+# Spalten schmaler als dieser Anteil gelten als Randspalte (Marginalien, Kustoden)
+MARGINAL_FRACTION = 0.2
+# Mindestbreite eines Spaltenzwischenraums in Zeilenhöhen
+MIN_GUTTER_LINE_HEIGHTS = 0.5
+# Anteil der kleineren Zeilenhöhe, den sich zwei Zeilen einer Reihe überdecken müssen
+ROW_OVERLAP = 0.5
+# Schutz vor entarteten Seiten: tiefer wird nur noch nach Reihen sortiert
+MAX_DEPTH = 12
+
+
+def line_box(points):
+    """Umschließendes Rechteck (x0, y0, x1, y1) zu einem Coords-points-String."""
+    xs = []
+    ys = []
+    for point in points.split():
+        x, y = point.split(",")
+        xs.append(int(x))
+        ys.append(int(y))
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def order_lines(lines):
+    """
+    Ordnet Zeilen nach der Lage auf der Seite.
+
+    Parameter:
+        lines: Folge von (box, Wert) mit box = (x0, y0, x1, y1)
+
+    Rückgabe:
+        Liste der Werte in Lesereihenfolge
+    """
+    lines = list(lines)
+    if not lines:
+        return []
+    heights = [box[3] - box[1] for box, _ in lines]
+    min_gutter = max(statistics.median(heights) * MIN_GUTTER_LINE_HEIGHTS, 1)
+    return [value for _, value in _order(lines, min_gutter, 0)]
+
+
+def _order(lines, min_gutter, depth):
+    if len(lines) < 2 or depth >= MAX_DEPTH:
+        return _rows(lines)
+
+    left = min(box[0] for box, _ in lines)
+    right = max(box[2] for box, _ in lines)
+    narrow_width = (right - left) * NARROW_FRACTION
+    gutters = _gaps(
+        [(box[0], box[2]) for box, _ in lines if box[2] - box[0] < narrow_width],
+        min_gutter,
+    )
+    if not gutters:
+        return _rows(lines)
+
+    gutter_starts = [start for start, _ in gutters]
+    gutter_ends = [end for _, end in gutters]
+    bridging = []
+    inside = []
+    for line in lines:
+        x0, _, x1, _ = line[0]
+        # erste Lücke, die rechts von x0 endet; die Zeile überspannt sie, wenn sie vor x1 beginnt
+        index = bisect_right(gutter_ends, x0)
+        if index < len(gutters) and gutter_starts[index] < x1:
+            bridging.append(line)
+        else:
+            inside.append(line)
+
+    if bridging:
+        return _bands(bridging, inside, min_gutter, depth)
+    return _columns(inside, gutter_starts, right - left, min_gutter, depth)
+
+
+def _gaps(intervals, min_gap):
+    """Lücken (Anfang, Ende) zwischen den zusammengefassten Intervallen, mindestens min_gap breit."""
+    gaps = []
+    intervals.sort()
+    covered_until = None
+    for start, end in intervals:
+        if covered_until is not None and start - covered_until >= min_gap:
+            gaps.append((covered_until, start))
+        if covered_until is None or end > covered_until:
+            covered_until = end
+    return gaps
+
+
+def _bands(separators, others, min_gutter, depth):
+    """
+    Die überspannenden Zeilen teilen den Ausschnitt in Bänder. Zeilen, die sich mit einer
+    überspannenden Zeile in der Höhe überdecken, gehören zu deren Reihe.
+    """
+    separators.sort(key=lambda line: (line[0][1], line[0][0]))
+    separator_tops = [box[1] for box, _ in separators]
+    rows = [[separator] for separator in separators]
+    bands = [[] for _ in range(len(separators) + 1)]
+    for line in others:
+        box = line[0]
+        center = (box[1] + box[3]) / 2
+        index = bisect_right(separator_tops, center)
+        # nur die Trennzeile direkt darüber kann mit der Zeile überlappen (Trennzeilen liegen untereinander)
+        if index > 0 and _same_row(separators[index - 1][0], box):
+            rows[index - 1].append(line)
+        else:
+            bands[index].append(line)
+
+    ordered = _order(bands[0], min_gutter, depth + 1)
+    for row, band in zip(rows, bands[1:]):
+        ordered.extend(sorted(row, key=lambda line: line[0][0]))
+        ordered.extend(_order(band, min_gutter, depth + 1))
+    return ordered
+
+
+def _columns(lines, gutter_starts, width, min_gutter, depth):
+    """Spalten zwischen den Lücken; Randspalten werden der breitesten Nachbarspalte zugeschlagen."""
+    columns = [[] for _ in range(len(gutter_starts) + 1)]
+    for line in lines:
+        box = line[0]
+        columns[bisect_left(gutter_starts, box[0])].append(line)
+    columns = [column for column in columns if column]
+
+    def column_width(column):
+        return max(box[2] for box, _ in column) - min(box[0] for box, _ in column)
+
+    wide = [column_width(column) >= width * MARGINAL_FRACTION for column in columns]
+    if not any(wide):
+        return [line for column in columns for line in _order(column, min_gutter, depth + 1)]
+
+    merged = [False] * len(columns)
+    for index, column in enumerate(columns):
+        if wide[index]:
+            continue
+        neighbours = [i for i in (index - 1, index + 1) if 0 <= i < len(columns) and wide[i]]
+        if not neighbours:
+            # nächste breite Spalte weiter entfernt
+            neighbours = [min((i for i in range(len(columns)) if wide[i]), key=lambda i: abs(i - index))]
+        target = max(neighbours, key=lambda i: len(columns[i]))
+        columns[target].extend(column)
+        merged[target] = True
+
+    ordered = []
+    for index, column in enumerate(columns):
+        if not wide[index]:
+            continue
+        # eine Spalte mit zugeschlagenen Randzeilen wird nur noch nach Reihen gelesen
+        ordered.extend(_rows(column) if merged[index] else _order(column, min_gutter, depth + 1))
+    return ordered
+
+
+def _same_row(a, b):
+    overlap = min(a[3], b[3]) - max(a[1], b[1])
+    return overlap > 0 and overlap >= ROW_OVERLAP * min(a[3] - a[1], b[3] - b[1])
+
+
+def _rows(lines):
+    """Reihen von oben nach unten, innerhalb einer Reihe von links nach rechts."""
+    lines = sorted(lines, key=lambda line: (line[0][1] + line[0][3], line[0][0]))
+    ordered = []
+    row = []
+    for line in lines:
+        if row and not _same_row(row[0][0], line[0]):
+            ordered.extend(sorted(row, key=lambda item: item[0][0]))
+            row = []
+        row.append(line)
+    ordered.extend(sorted(row, key=lambda item: item[0][0]))
+    return ordered
@@ -0,0 +1,121 @@
+"""
+Messwerte der Pipeline-Schritte: Laufzeit, Seiten pro Sekunde und Zähler.
+
+Ein RunMetrics-Objekt sammelt je Schritt die Laufzeit, ob das Ergebnis neu berechnet
+oder aus der Ablage geladen wurde, und beliebige Zähler (Seiten, extrahierte Zeilen,
+Sprecherkandidaten, Ähnlichkeitsvergleiche, TEI-Elemente ...). Die Pipeline misst
+einen Schritt, wenn ihr ein RunMetrics übergeben wird (Pipeline.run(..., metrics=...)).
+
+Tiefer liegender Code zählt über count()/record(), ohne das RunMetrics-Objekt zu
+kennen: Die Werte landen beim gerade gemessenen Schritt des aktuellen Threads.
+Außerhalb einer Messung tun beide Funktionen nichts.
+"""
+
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules.Workspace import atomic_write_text
+
+# Dateiname des JSON-Berichts neben den Ausgabedateien
+REPORT_FILENAME = "run_report.json"
+
+# (RunMetrics, Schrittname) der laufenden Messung
+_current = contextvars.ContextVar("current_metrics", default=None)
+
+
+def count(key, n=1):
+    """Erhöht den Zähler key des gerade gemessenen Schritts um n."""
+    current = _current.get()
+    if current is not None:
+        metrics, stage_name = current
+        metrics.add(stage_name, key, n)
+
+
+def record(key, value):
+    """Setzt den Wert key des gerade gemessenen Schritts."""
+    current = _current.get()
+    if current is not None:
+        metrics, stage_name = current
+        metrics.set(stage_name, key, value)
+
+
+class RunMetrics:
+    """
+    Messwerte je Schritt. Ein erneuter Lauf eines Schritts ersetzt seine Messwerte.
+    Wird von Hintergrund-Jobs und dem Skript-Thread gleichzeitig benutzt.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.created = datetime.now().isoformat(timespec="seconds")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Misst die Laufzeit des Blocks als neu berechneten Schritt stage_name."""
+        with self._lock:
+            self.stages[stage_name] = {"status": "computed", "seconds": 0.0, "counts": {}}
+        token = _current.set((self, stage_name))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _current.reset(token)
+            with self._lock:
+                self.stages[stage_name]["seconds"] = round(seconds, 4)
+                self.stages[stage_name]["finished"] = datetime.now().isoformat(timespec="seconds")
+
+    def cached(self, stage_name):
+        """Vermerkt, dass stage_name aus der Ablage geladen wurde."""
+        with self._lock:
+            self.stages[stage_name] = {
+                "status": "cached",
+                "seconds": 0.0,
+                "counts": {},
+                "finished": datetime.now().isoformat(timespec="seconds"),
+            }
+
+    def add(self, stage_name, key, n=1):
+        with self._lock:
+            counts = self.stages[stage_name]["counts"]
+            counts[key] = counts.get(key, 0) + n
+
+    def set(self, stage_name, key, value):
+        with self._lock:
+            self.stages[stage_name]["counts"][key] = value
+
+    def to_dict(self):
+        """Bericht als dict; pages_per_second wird aus Seitenzahl und Laufzeit berechnet."""
+        with self._lock:
+            stages = {}
+            for stage_name, entry in self.stages.items():
+                entry = dict(entry, counts=dict(entry["counts"]))
+                pages = entry["counts"].get("pages")
+                if pages and entry["seconds"]:
+                    entry["pages_per_second"] = round(pages / entry["seconds"], 2)
+                stages[stage_name] = entry
+        return {
+            "created": self.created,
+            "total_seconds": round(sum(entry["seconds"] for entry in stages.values()), 4),
+            "stages": stages,
+        }
+
+    def rows(self):
+        """Eine Zeile pro Schritt, z. B. für eine Tabelle in der App."""
+        rows = []
+        for stage_name, entry in self.to_dict()["stages"].items():
+            row = {"Schritt": stage_name, "Status": entry["status"], "Sekunden": entry["seconds"]}
+            if "pages_per_second" in entry:
+                row["Seiten/s"] = entry["pages_per_second"]
+            row.update(entry["counts"])
+            rows.append(row)
+        return rows
+
+    def write_report(self, path):
+        atomic_write_text(path, json.dumps(self.to_dict(), indent=2, ensure_ascii=False))
+        return path
@@ -1,7 +1,9 @@
 import xml.etree.ElementTree as ET
-import statistics
 import os
-from collections import defaultdict
+from modules.EzLines import ezlines_path, write_ezlines
+from modules.Layout import line_box, order_lines
+from modules.Metrics import count
+from modules.PageSource import iter_pages
 
 # Namespace definieren
 ns = {'pc': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15'}
@@ -17,14 +19,30 @@ type_prefix = {
     "catch-word": "^"
 }
 
+# Elemente einer ReadingOrder
+REGION_REF_TAG = f"{{{ns['pc']}}}RegionRefIndexed"
+ORDERED_GROUP_TAG = f"{{{ns['pc']}}}OrderedGroupIndexed"
+
+
 def extract_lines(filepath):
-    tree = ET.parse(filepath)
-    root = tree.getroot()
+    root = ET.parse(filepath).getroot()
+    return extract_region_lines(root.findall('.//pc:TextRegion', ns))
+
+
+def extract_region_lines(regions, positions=True, sources=False):
+    """
+    Liefert (Rechteck, formatierter Text) für alle Zeilen der Regionen, in der Reihenfolge
+    der Regionen und innerhalb einer Region in Dokumentreihenfolge. Das Rechteck ist
+    (x0, y0, x1, y1) aus den Coords der Zeile; mit positions=False wird es nicht
+    berechnet (None). Mit sources=True steht statt des Texts (Text, Herkunft) in der
+    Liste, Herkunft = (Regions-ID, Regionstyp, Zeilen-ID, Rechteck).
+    """
     lines_data = []
     first_toc_done = False
 
-    for region in root.findall('.//pc:TextRegion', ns):
+    for region in regions:
         region_type = region.attrib.get("type", "")
+        region_id = region.attrib.get("id", "")
         prefix = type_prefix.get(region_type, "")
 
         region_lines = region.findall('pc:TextLine', ns)
@@ -34,12 +52,7 @@ def extract_lines(filepath):
             coords_el = line.find('pc:Coords', ns)
             if coords_el is None:
                 continue
-            points = coords_el.attrib['points']
-            coords = [tuple(map(int, pt.split(','))) for pt in points.strip().split()]
-            xs = [x for x, y in coords]
-            ys = [y for x, y in coords]
-            x_min = min(xs)
-            y_center = sum(ys) / len(ys)
+            box = line_box(coords_el.attrib['points']) if positions or sources else None
 
             text_equivs = line.findall('pc:TextEquiv', ns)
             text_equiv = None
@@ -77,52 +90,157 @@ def extract_lines(filepath):
             else:
                 formatted_text = f"{prefix}{base}" if prefix else base
 
-            lines_data.append((y_center, x_min, formatted_text))
+            if sources:
+                lines_data.append((box, (formatted_text, (region_id, region_type, line.attrib.get("id", ""), box))))
+            else:
+                lines_data.append((box, formatted_text))
 
+    count("lines_extracted", len(lines_data))
     return lines_data
 
 
-def process_file(filepath, speaker_list):
-    lines_data = extract_lines(filepath)
+def reading_order_regions(root, regions):
+    """
+    Die TextRegionen in der Reihenfolge der ReadingOrder der Seite (OrderedGroup mit
+    RegionRefIndexed, auch verschachtelt). Verweise auf andere Regionen (Bilder,
+    Trennlinien ...) werden übergangen.
 
-    ys_sorted = sorted(set(y for y, x, t in lines_data))
-    line_gaps = [ys_sorted[i+1] - ys_sorted[i] for i in range(len(ys_sorted)-1)]
-    avg_gap = statistics.median(line_gaps) if line_gaps else 0
-    threshold = avg_gap * 0.5
+    Rückgabe:
+        Liste der Regionen oder None, wenn die Seite keine brauchbare ReadingOrder hat:
+        keine OrderedGroup, ungeordnete Untergruppen, fehlende oder doppelte Indizes
+        bzw. Verweise oder eine TextRegion mit Zeilen, die nicht eingeordnet ist.
+    """
+    group = root.find('pc:Page/pc:ReadingOrder/pc:OrderedGroup', ns)
+    if group is None:
+        return None
+    regions_by_id = {region.attrib.get("id"): region for region in regions}
+    ordered = []
+    if not _collect_region_refs(group, regions_by_id, ordered, set()):
+        return None
+    referenced = set(id(region) for region in ordered)
+    for region in regions:
+        if id(region) not in referenced and region.find('pc:TextLine', ns) is not None:
+            return None
+    return ordered
 
-    line_groups = defaultdict(list)
-    group_keys = []
 
-    lines_data.sort(key=lambda tup: (round(tup[0] / 5) * 5, tup[1]))
+def _collect_region_refs(group, regions_by_id, ordered, seen):
+    """Hängt die Regionen der Gruppe nach index sortiert an ordered an; False, wenn die Gruppe unbrauchbar ist."""
+    children = []
+    for child in group:
+        if child.tag not in (REGION_REF_TAG, ORDERED_GROUP_TAG):
+            if child.tag.endswith("Indexed"):  # UnorderedGroupIndexed: keine Reihenfolge
+                return False
+            continue
+        try:
+            children.append((int(child.attrib["index"]), child))
+        except (KeyError, ValueError):
+            return False
+    children.sort(key=lambda item: item[0])
+    for position in range(1, len(children)):
+        if children[position][0] == children[position - 1][0]:
+            return False
 
-    for y, x, text in lines_data:
-        candidates = [gy for gy in group_keys if abs(y - gy) <= threshold]
+    for _, child in children:
+        ref = child.attrib.get("regionRef")
+        if ref is not None:
+            if ref in seen:
+                return False
+            seen.add(ref)
+            if ref in regions_by_id:
+                ordered.append(regions_by_id[ref])
+        elif child.tag == REGION_REF_TAG:
+            return False
+        if child.tag == ORDERED_GROUP_TAG and not _collect_region_refs(child, regions_by_id, ordered, seen):
+            return False
+    return True
 
-        if candidates:
-            closest_gy = min(candidates, key=lambda gy: abs(y - gy))
-            line_groups[closest_gy].append((x, text))
-        else:
-            line_groups[y].append((x, text))
-            group_keys.append(y)
+
+def process_file(filepath, speaker_list, sources=False):
+    """
+    EzDrama-Zeilen einer Seite; mit sources=True als (Zeile, Herkunft), siehe extract_region_lines.
+    """
+    root = ET.parse(filepath).getroot()
+    regions = root.findall('.//pc:TextRegion', ns)
+
+    # Schneller Weg: Regionen nach der ReadingOrder der Seite, sonst nach dem Layout (Spalten, Reihen)
+    ordered_regions = reading_order_regions(root, regions)
+    if ordered_regions is not None:
+        count("reading_order_pages")
+        ordered_lines = [value for _, value in extract_region_lines(ordered_regions, positions=False, sources=sources)]
+    else:
+        ordered_lines = order_lines(extract_region_lines(regions, sources=sources))
 
     output_lines = []
-    for gy in sorted(line_groups):
-        paragraph_lines = [text for _, text in sorted(line_groups[gy])]
-
-        for line in paragraph_lines:
-            for name in speaker_list:
-                if line.strip().startswith(name):
-                    idx = line.find(name) + len(name)
-                    line = f"@{line[:idx]}\n{line[idx:].lstrip()}"
-                    break
-            output_lines.append(line)
+    for value in ordered_lines:
+        line, source = value if sources else (value, None)
+        for name in speaker_list:
+            if line.strip().startswith(name):
+                idx = line.find(name) + len(name)
+                line = f"@{line[:idx]}\n{line[idx:].lstrip()}"
+                break
+        output_lines.append((line, source) if sources else line)
 
     return output_lines
 
+
+def build_ezdrama_text(data_dir, all_metadata, speaker_list, progress=None):
+    """
+    Erzeugt die ezdrama-Gesamtausgabe aus den PAGE-XML-Dateien in data_dir als String.
+
+    Parameter:
+        data_dir (str): Ordner mit PAGE XML oder ZIP-Archiv
+        all_metadata (str): Metadatenblock als String
+        speaker_list (List[str]): Liste von Sprechern
+        progress (callable): optional, wird nach jeder Seite mit (erledigt, gesamt) aufgerufen
+    """
+    gesamt_output = []
+
+    for filename, open_page in iter_pages(data_dir, progress):
+        with open_page() as page:
+            gesamt_output.extend(process_file(page, speaker_list))
+
+    return join_ezdrama_text(all_metadata, gesamt_output)
+
+
+def join_ezdrama_text(all_metadata, lines):
+    """Setzt Metadatenblock und die Zeilen aller Seiten zur ezdrama-Gesamtausgabe zusammen."""
+    return f"{all_metadata.strip()}\n\n" + "".join(line + "\n" for line in lines)
+
+
+def join_line_sources(all_metadata, lines):
+    """
+    Herkunft jeder Zeile der Gesamtausgabe aus join_ezdrama_text (siehe modules/EzLines.py).
+    lines enthält (Zeile, Seite, Herkunft); eine Sprecherzeile "@Name\nText" ergibt zwei
+    Zeilen derselben Herkunft, Metadatenblock und Leerzeile haben keine (None).
+    """
+    line_sources = [None] * (all_metadata.strip().count("\n") + 2)
+    for line, page, (region_id, region_type, line_id, box) in lines:
+        line_sources.extend([(page, region_id, region_type, line_id, box)] * (line.count("\n") + 1))
+    return line_sources
+
+
+def build_ezdrama_with_sources(data_dir, all_metadata, speaker_list, progress=None):
+    """
+    Wie build_ezdrama_text, liefert zusätzlich die Herkunft jeder Zeile.
+
+    Rückgabe:
+        (Text, Herkunft je Zeile) für write_ezlines
+    """
+    lines = []
+
+    for filename, open_page in iter_pages(data_dir, progress):
+        with open_page() as page:
+            lines.extend((line, filename, source) for line, source in process_file(page, speaker_list, sources=True))
+
+    text = join_ezdrama_text(all_metadata, [line for line, _, _ in lines])
+    return text, join_line_sources(all_metadata, lines)
+
+
 def page2ezdrama(data_dir, output_dir, output_filename, all_metadata, speaker_list):
     """
     Konvertiert PAGE-XML-Dateien aus data_dir zu ezdrama-Gesamtausgabe.
-    Speichert in output_dir/output_filename.
+    Speichert in output_dir/output_filename, die Herkunft der Zeilen daneben als .ezlines.
     
     Parameter:
         data_dir (str): Ordner mit PAGE XML
@@ -134,17 +252,11 @@ def page2ezdrama(data_dir, output_dir, output_filename, all_metadata, speaker_li
     os.makedirs(output_dir, exist_ok=True)
     gesamttext_path = os.path.join(output_dir, output_filename)
 
-    gesamt_output = []
-
-    for filename in sorted(os.listdir(data_dir)):
-        if filename.endswith(".xml"):
-            filepath = os.path.join(data_dir, filename)
-            gesamt_output.extend(process_file(filepath, speaker_list))
-
+    text, line_sources = build_ezdrama_with_sources(data_dir, all_metadata, speaker_list)
     with open(gesamttext_path, "w", encoding="utf-8") as f:
-        f.write(f"{all_metadata.strip()}\n\n")
-        for line in gesamt_output:
-            f.write(line + "\n")
+        f.write(text)
+    # Herkunft der Zeilen (Seite, Region, Zeilen-ID, Koordinaten) daneben
+    write_ezlines(ezlines_path(gesamttext_path), line_sources)
 
     print(f"Fertig. Gesamtausgabe gespeichert in: {gesamttext_path}")
     return gesamttext_path
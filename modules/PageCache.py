@@ -0,0 +1,118 @@
+"""
+Ergebnisse pro Seite für schrittweise Importe.
+
+Die Pipeline speichert ihre Schritte nach dem Hash aller Seiten: Kommt eine Seite hinzu
+oder wird eine ersetzt, ändert sich der Hash und Preprocessing sowie Gesamtausgabe
+würden alle Seiten neu parsen. Ein PageCache hält deshalb die Zwischenergebnisse jeder
+einzelnen Seite unter dem Hash ihres Inhalts:
+
+    page_preprocess   TOC-Zeilen, Sprecherkandidaten und Beispielzeilen der Seite
+    page_ezdrama      EzDrama-Zeilen der Seite und ihre Herkunft (Schlüssel zusätzlich mit der Sprecherliste)
+
+Ein erneuter Lauf liest alle Seiten nur noch ein, um ihren Hash zu bilden; geparst
+werden allein neue oder geänderte Seiten. Die Ergebnisse werden in Seitenreihenfolge
+genau so zusammengeführt wie bei einem vollständigen Lauf (extract_toc_entries,
+extract_sentences_with_dot_and_limit bzw. build_ezdrama_with_sources).
+
+Abgelegt wird in einer Ablage der Pipeline (DiskStore oder MemoryStore). Ändern sich
+die Regeln der Seitenverarbeitung, muss VERSION erhöht werden.
+"""
+
+import hashlib
+import io
+import json
+import xml.etree.ElementTree as ET
+
+from modules.GetSpeakers import extract_root_lines, collect_sentences, toc_lines
+from modules.Metrics import count
+from modules.PAGE2EzDrama import process_file, join_ezdrama_text, join_line_sources
+from modules.PageSource import iter_pages
+
+VERSION = 2
+
+
+class PageCache:
+    """
+    Zwischenergebnisse pro Seite in store (Schnittstelle get/put wie DiskStore).
+    Im gemessenen Schritt zählen pages_cached und pages_computed, wie viele Seiten
+    geladen bzw. neu berechnet wurden.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _key(self, data, *extra):
+        description = json.dumps([VERSION, hashlib.sha256(data).hexdigest(), *extra], ensure_ascii=False)
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def _page_result(self, kind, key, compute):
+        stored = self.store.get(kind, key)
+        if stored is not None:
+            count("pages_cached")
+            return json.loads(stored)
+        result = compute()
+        self.store.put(kind, key, json.dumps(result, ensure_ascii=False))
+        count("pages_computed")
+        return result
+
+    def preprocess(self, source, progress=None):
+        """
+        TOC-Text, Sprecherkandidaten und Beispielzeilen aller Seiten aus source
+        (Ordner oder ZIP), wie extract_toc_entries und extract_sentences_with_dot_and_limit.
+
+        Rückgabe:
+            (dramatis_personae, speaker_list_raw, speaker_examples)
+        """
+        toc = []
+        sentences = set()
+        examples = {}
+        for filename, open_page in iter_pages(source, progress):
+            with open_page() as page:
+                data = page.read()
+            result = self.preprocess_page(data)
+            toc.extend(result["toc"])
+            sentences.update(result["sentences"])
+            # die erste Beispielzeile in Seitenreihenfolge gewinnt
+            for sentence, example in result["examples"].items():
+                examples.setdefault(sentence, example)
+        return "\n".join(toc), sentences, examples
+
+    def preprocess_page(self, data):
+        """Preprocessing-Ergebnis einer einzelnen Seite (Inhalt als bytes), aus der Ablage oder neu berechnet."""
+        return self._page_result("page_preprocess", self._key(data), lambda: _preprocess_page(data))
+
+    def _ezdrama_pages(self, source, speaker_list, progress):
+        speaker_list = list(speaker_list)
+        for filename, open_page in iter_pages(source, progress):
+            with open_page() as page:
+                data = page.read()
+            yield filename, self._page_result(
+                "page_ezdrama",
+                self._key(data, speaker_list),
+                lambda: _ezdrama_page(data, speaker_list),
+            )
+
+    def ezdrama_with_sources(self, source, all_metadata, speaker_list, progress=None):
+        """
+        EzDrama-Gesamtausgabe wie build_ezdrama_with_sources, mit den gespeicherten Zeilen
+        unveränderter Seiten: (Text, Herkunft je Zeile).
+        """
+        lines = []
+        for filename, result in self._ezdrama_pages(source, speaker_list, progress):
+            for line, (region_id, region_type, line_id, box) in zip(result["lines"], result["sources"]):
+                lines.append((line, filename, (region_id, region_type, line_id, tuple(box))))
+        text = join_ezdrama_text(all_metadata, [line for line, _, _ in lines])
+        return text, join_line_sources(all_metadata, lines)
+
+
+def _ezdrama_page(data, speaker_list):
+    lines = process_file(io.BytesIO(data), speaker_list, sources=True)
+    return {"lines": [line for line, _ in lines], "sources": [source for _, source in lines]}
+
+
+def _preprocess_page(data):
+    root = ET.parse(io.BytesIO(data)).getroot()
+    sentences = set()
+    examples = {}
+    collect_sentences(extract_root_lines(root), sentences, examples)
+    return {"toc": toc_lines(root), "sentences": sorted(sentences), "examples": examples}
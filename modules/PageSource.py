@@ -0,0 +1,61 @@
+"""
+Zugriff auf die PAGE-XML-Seiten eines Dramas, egal ob sie entpackt in einem Ordner
+oder noch in einem ZIP-Archiv liegen.
+
+Aus einem ZIP werden die Seiten direkt gestreamt (zipfile.ZipFile.open), ohne sie
+vorher zu entpacken oder das ganze Archiv in den Speicher zu laden.
+"""
+
+import os
+import zipfile
+
+from modules.Metrics import record
+
+
+def is_zip_source(source):
+    return os.path.isfile(source) and zipfile.is_zipfile(source)
+
+
+def _is_page_name(name):
+    return name.lower().endswith(".xml") and not name.endswith("/")
+
+
+def iter_pages(source, progress=None):
+    """
+    Liefert (Dateiname, öffnen) für alle PAGE-XML-Seiten aus source, sortiert nach Dateiname.
+    öffnen() gibt ein binäres Dateiobjekt zurück, das z. B. direkt an ElementTree.parse
+    übergeben werden kann.
+
+    Parameter:
+        source (str): Ordner mit PAGE-XML oder Pfad zu einem ZIP-Archiv
+        progress (callable): optional, wird nach jeder verarbeiteten Seite mit
+            (erledigt, gesamt) aufgerufen
+    """
+    source = os.fspath(source)
+    if is_zip_source(source):
+        with zipfile.ZipFile(source) as zf:
+            members = [info for info in zf.infolist() if _is_page_name(info.filename)]
+            # Unterordner im Archiv werden wie beim Entpacken flach behandelt
+            members.sort(key=lambda info: os.path.basename(info.filename))
+            pages = [(os.path.basename(info.filename), (lambda info=info: zf.open(info))) for info in members]
+            yield from _with_progress(pages, progress)
+    else:
+        pages = []
+        for filename in sorted(os.listdir(source)):
+            if _is_page_name(filename):
+                path = os.path.join(source, filename)
+                pages.append((filename, (lambda path=path: open(path, "rb"))))
+        yield from _with_progress(pages, progress)
+
+
+def _with_progress(pages, progress):
+    record("pages", len(pages))
+    for done, page in enumerate(pages, start=1):
+        yield page
+        # erst hier, wenn der Aufrufer die Seite verarbeitet hat und die nächste anfordert
+        if progress:
+            progress(done, len(pages))
+
+
+def count_pages(source):
+    return sum(1 for _ in iter_pages(source))
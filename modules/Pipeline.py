@@ -0,0 +1,508 @@
+"""
+Pipeline der Verarbeitungsschritte PAGE → EzDrama → DraCor-TEI als Abhängigkeitsgraph.
+
+Jeder Schritt (Stage) deklariert seine Eingaben (vorherige Schritte oder Quellen)
+und die Optionen, die sein Ergebnis beeinflussen. Das Ergebnis wird unter einem
+Schlüssel aus Schrittname, Version, den Inhalts-Hashes der Eingaben und den
+Optionswerten gespeichert. Ein erneuter Lauf berechnet deshalb nur die Schritte neu,
+deren Eingaben oder Optionen sich tatsächlich geändert haben.
+
+Quellen überschreiben gleichnamige Schritte: Die App übergibt z. B. den (ggf. von Hand
+bearbeiteten) Text von Schritt 1 als Quelle "ezdrama" und startet dann "speaker_fix".
+
+Ändern sich die Regeln eines Schritts im Code, muss seine Version erhöht werden,
+damit gespeicherte Ergebnisse nicht wiederverwendet werden.
+
+Über den optionalen Callback progress(schritt, erledigt, gesamt) meldet ein Lauf, welcher
+Schritt gerade berechnet wird; Schritte mit reports_progress=True melden zusätzlich
+ihren Fortschritt pro Seite bzw. Zeile (siehe modules/Jobs.py). Mit metrics=RunMetrics()
+werden Laufzeit und Zähler jedes Schritts erfasst (siehe modules/Metrics.py), mit
+einem StageProfiler zusätzlich cProfile- und tracemalloc-Profile (siehe modules/Profiling.py).
+"""
+
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from modules.Dehyphenation import Lexicon
+from modules.GetSpeakers import (
+    extract_toc_entries,
+    extract_sentences_with_dot_and_limit,
+    extract_figuren,
+    filter_valid_speakers,
+)
+from modules.Metrics import record
+from modules.EzLines import encode_ezlines
+from modules.PAGE2EzDrama import build_ezdrama_with_sources
+from modules.TextStages import (
+    text_to_lines,
+    lines_to_text,
+    fix_speaker_lines,
+    replace_bracket_contents,
+    normalize_speakers,
+    clean_text_lines,
+)
+from modules.PageSource import iter_pages
+from modules.Provenance import LineMap
+from modules.Workspace import atomic_write_text, COPY_BUFFER_SIZE
+
+
+def _sha256(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, "fingerprint"):
+        return value.fingerprint()
+    raise TypeError(f"Nicht serialisierbar: {type(value).__name__}")
+
+
+def fingerprint(value):
+    """
+    Inhalts-Hash eines Quellwerts. Objekte mit eigener fingerprint()-Methode
+    (z. B. Pages) bestimmen ihn selbst.
+    """
+    if hasattr(value, "fingerprint"):
+        return value.fingerprint()
+    if isinstance(value, (str, bytes)):
+        return _sha256(value)
+    return _sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, default=_json_default))
+
+
+class Pages:
+    """
+    PAGE-XML-Seiten eines Dramas als Pipeline-Quelle: Ordner oder ZIP-Archiv (siehe modules/PageSource.py).
+    Der Hash umfasst Namen und Inhalt aller Seiten.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for filename, open_page in iter_pages(self.path):
+            page_digest = hashlib.sha256()
+            with open_page() as page:
+                for chunk in iter(lambda: page.read(COPY_BUFFER_SIZE), b""):
+                    page_digest.update(chunk)
+            digest.update(filename.encode("utf-8") + b"\0" + page_digest.digest())
+        return digest.hexdigest()
+
+
+class DiskStore:
+    """
+    Ablage der Schritt-Ergebnisse als Textdateien unter root/<schritt>/<schlüssel>.txt.
+    Geschrieben wird atomar, damit parallele Prozesse denselben Speicher nutzen können.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def _path(self, stage_name, key):
+        return os.path.join(self.root, stage_name, f"{key}.txt")
+
+    def get(self, stage_name, key):
+        try:
+            with open(self._path(stage_name, key), "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, stage_name, key, data):
+        atomic_write_text(self._path(stage_name, key), data)
+
+
+class MemoryStore:
+    """
+    Ablage der Schritt-Ergebnisse im Speicher (z. B. im Session State der App).
+    Es werden höchstens max_entries Ergebnisse gehalten; die am längsten nicht
+    benutzten fallen zuerst heraus.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # Hintergrund-Jobs und Skript-Thread greifen gleichzeitig zu
+        self._lock = threading.Lock()
+
+    def get(self, stage_name, key):
+        with self._lock:
+            data = self.entries.get((stage_name, key))
+            if data is not None:
+                self.entries.move_to_end((stage_name, key))
+            return data
+
+    def put(self, stage_name, key, data):
+        with self._lock:
+            self.entries[(stage_name, key)] = data
+            self.entries.move_to_end((stage_name, key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class Stage:
+    """
+    Ein Verarbeitungsschritt.
+
+    Parameter:
+        name (str): eindeutiger Name des Schritts
+        func (callable): func(*eingaben, **optionen) -> Ergebnis
+        inputs (Tuple[str]): Namen der vorherigen Schritte oder Quellen, in Aufrufreihenfolge
+        options (Dict[str, Any]): vom Schritt verwendete Optionen mit Standardwerten;
+            aufrufbare Standardwerte werden bei jedem Lauf ausgewertet
+        version (int): bei geänderten Regeln erhöhen
+        encode/decode (callable): Ergebnis <-> Text für die Ablage (Standard: Ergebnis ist Text)
+        reports_progress (bool): func akzeptiert progress=callable(erledigt, gesamt)
+        companions (Dict[str, Tuple[callable, callable]]): weitere Ergebnisse, die func im
+            selben Durchlauf mitliefert, mit ihrem (encode, decode); func gibt dann
+            (Ergebnis, {Name: Wert}) zurück. Sie werden unter demselben Schlüssel abgelegt
+            und lassen sich wie eigene Schritte anfordern.
+    """
+
+    def __init__(self, name, func, inputs=(), options=None, version=1, encode=None, decode=None,
+                 reports_progress=False, companions=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.options = dict(options or {})
+        self.version = version
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda data: data)
+        self.reports_progress = reports_progress
+        self.companions = dict(companions or {})
+
+    def resolve_options(self, options):
+        stage_options = {}
+        for name, default in self.options.items():
+            if name in options:
+                stage_options[name] = options[name]
+            else:
+                stage_options[name] = default() if callable(default) else default
+        return stage_options
+
+    def key(self, input_fingerprints, stage_options):
+        description = json.dumps(
+            [self.name, self.version, input_fingerprints, stage_options],
+            sort_keys=True, ensure_ascii=False, default=_json_default,
+        )
+        return _sha256(description)
+
+
+class Pipeline:
+    """
+    Führt Schritte samt ihrer Abhängigkeiten aus und speichert jedes Ergebnis unter seinem Inhalts-Schlüssel.
+    Nach jedem Lauf steht in last_run, welcher Schritt neu berechnet ("computed") oder
+    aus dem Speicher geladen ("cached") wurde. metrics ist das RunMetrics-Objekt, das
+    Läufe ohne eigenes metrics verwenden; profiler (StageProfiler) profiliert jeden neu
+    berechneten Schritt.
+    """
+
+    def __init__(self, stages, store, metrics=None, profiler=None):
+        self.stages = {stage.name: stage for stage in stages}
+        # Name eines mitgelieferten Ergebnisses -> Schritt, der es liefert
+        self.companions = {name: stage for stage in stages for name in stage.companions}
+        self.store = store
+        self.metrics = metrics
+        self.profiler = profiler
+        self.last_run = {}
+
+    def run(self, target, sources=None, options=None, progress=None, metrics=None):
+        """
+        Liefert das Ergebnis des Schritts target.
+
+        Parameter:
+            target (str): Name des gewünschten Schritts
+            sources (Dict[str, Any]): Quellwerte; überschreiben gleichnamige Schritte
+            options (Dict[str, Any]): Optionswerte für alle Schritte
+            progress (callable): optional, progress(schritt, erledigt, gesamt)
+            metrics (RunMetrics): optional, erfasst Laufzeit und Zähler je Schritt
+        """
+        return self.run_many([target], sources, options, progress, metrics)[target]
+
+    def run_many(self, targets, sources=None, options=None, progress=None, metrics=None):
+        """
+        Wie run(), aber für mehrere Schritte in einem Lauf; gemeinsame Vorgänger werden nur einmal
+        aufgelöst. Rückgabe: Dict Schrittname -> Ergebnis.
+        """
+        self.last_run = {}
+        run = _Run(sources or {}, options or {}, progress, metrics or self.metrics)
+        return {target: self._resolve(target, run)[0] for target in targets}
+
+    def _resolve(self, name, run):
+        if name in run.resolved:
+            return run.resolved[name]
+        if name in run.sources:
+            value = run.sources[name]
+            result = (value, fingerprint(value))
+        elif name in self.stages:
+            result = self._compute(self.stages[name], run)
+        elif name in self.companions:
+            stage = self.companions[name]
+            self._resolve(stage.name, run)
+            if name not in run.resolved:
+                raise KeyError(f"{name} fehlt: {stage.name} wurde als Quelle übergeben")
+            return run.resolved[name]
+        else:
+            raise KeyError(f"Unbekannter Schritt oder fehlende Quelle: {name}")
+        run.resolved[name] = result
+        return result
+
+    def _compute(self, stage, run):
+        inputs = [self._resolve(name, run) for name in stage.inputs]
+        stage_options = stage.resolve_options(run.options)
+        key = stage.key([fp for _, fp in inputs], stage_options)
+
+        data = self.store.get(stage.name, key)
+        companion_data = {name: self.store.get(name, key) for name in stage.companions}
+        if data is None or None in companion_data.values():
+            progress = run.progress
+            if progress:
+                progress(stage.name, 0, None)
+            call_options = dict(stage_options)
+            if progress and stage.reports_progress:
+                call_options["progress"] = lambda done, total: progress(stage.name, done, total)
+            with run.metrics.stage(stage.name) if run.metrics else contextlib.nullcontext(), \
+                    self.profiler.profile(stage.name) if self.profiler else contextlib.nullcontext():
+                value = stage.func(*[value for value, _ in inputs], **call_options)
+            if stage.companions:
+                value, companion_values = value
+                for name, (encode, _) in stage.companions.items():
+                    companion_data[name] = encode(companion_values[name])
+                    self.store.put(name, key, companion_data[name])
+            data = stage.encode(value)
+            self.store.put(stage.name, key, data)
+            self.last_run[stage.name] = "computed"
+        else:
+            if run.metrics:
+                run.metrics.cached(stage.name)
+            self.last_run[stage.name] = "cached"
+        for name, (_, decode) in stage.companions.items():
+            run.resolved[name] = (decode(companion_data[name]), _sha256(companion_data[name]))
+        return stage.decode(data), _sha256(data)
+
+
+class _Run:
+    """Zustand eines Pipeline-Laufs: Quellen, Optionen, aufgelöste Ergebnisse und Beobachter."""
+
+    def __init__(self, sources, options, progress=None, metrics=None):
+        self.sources = sources
+        self.options = options
+        self.progress = progress
+        self.metrics = metrics
+        self.resolved = {}
+
+
+# -------- Standard-Schritte der Anwendung --------
+
+def _preprocess(pages, progress=None, page_cache=None):
+    if page_cache is not None:
+        # ein Durchlauf; geparst werden nur Seiten, die noch nicht im PageCache liegen
+        dramatis_personae, speaker_list_raw, speaker_examples = page_cache.preprocess(pages.path, progress)
+        record("speaker_candidates", len(speaker_list_raw))
+        return {
+            "dramatis_personae": dramatis_personae,
+            "speaker_list_raw": speaker_list_raw,
+            "speaker_examples": speaker_examples,
+            "figuren": extract_figuren(dramatis_personae),
+        }
+
+    # zwei Durchläufe über alle Seiten: Fortschritt läuft von 0 bis 2 * Seitenzahl
+    def first_pass(done, total):
+        progress(done, 2 * total)
+
+    def second_pass(done, total):
+        progress(total + done, 2 * total)
+
+    dramatis_personae = extract_toc_entries(pages.path, first_pass if progress else None)
+    speaker_list_raw, speaker_examples = extract_sentences_with_dot_and_limit(
+        pages.path, second_pass if progress else None
+    )
+    record("speaker_candidates", len(speaker_list_raw))
+    return {
+        "dramatis_personae": dramatis_personae,
+        "speaker_list_raw": speaker_list_raw,
+        "speaker_examples": speaker_examples,
+        "figuren": extract_figuren(dramatis_personae),
+    }
+
+
+def _encode_preprocess(result):
+    return json.dumps(result, sort_keys=True, ensure_ascii=False, default=_json_default)
+
+
+def _decode_preprocess(data):
+    result = json.loads(data)
+    result["speaker_list_raw"] = set(result["speaker_list_raw"])
+    result["figuren"] = set(result["figuren"])
+    return result
+
+
+def _accept_speakers(preprocessed):
+    # nicht-interaktive Übernahme (Score > 0.5); Ausgaben von filter_valid_speakers verwerfen
+    with contextlib.redirect_stdout(io.StringIO()):
+        speakers = filter_valid_speakers(
+            sorted(preprocessed["speaker_list_raw"]),
+            preprocessed["figuren"],
+            preprocessed["speaker_examples"],
+            interactive=False,
+        )
+    record("speakers_accepted", len(speakers))
+    return speakers
+
+
+def _ezdrama(pages, speakers, metadata="", progress=None, page_cache=None):
+    # Text und Herkunft jeder Zeile (.ezlines, modules/EzLines.py) in einem Durchlauf über die Seiten
+    if page_cache is not None:
+        text, line_sources = page_cache.ezdrama_with_sources(pages.path, metadata, speakers, progress)
+    else:
+        text, line_sources = build_ezdrama_with_sources(pages.path, metadata, speakers, progress)
+    record("ezdrama_lines", text.count("\n"))
+    return text, {"ezlines": encode_ezlines(line_sources)}
+
+
+# Die Schritte 2–5 liefern zu ihrem Text eine LineMap seiner Zeilen auf die Zeilen der
+# Eingabe mit ("<schritt>_map", siehe modules/Provenance.py), im selben Durchlauf.
+
+LINE_MAP_CODEC = (LineMap.to_json, LineMap.from_json)
+EZLINES_CODEC = (lambda data: base64.b64encode(data).decode("ascii"), base64.b64decode)
+
+
+def _speaker_fix(text, speaker_line_selection=()):
+    lines = text_to_lines(text)
+    origins = []
+    fixed = lines_to_text(fix_speaker_lines(lines, speaker_line_selection, origins))
+    return fixed, {"speaker_fix_map": LineMap.from_origins(origins, len(lines))}
+
+
+def _brackets(text, bracket_contents=None):
+    size = len(text_to_lines(text))
+    if bracket_contents is None:
+        return text, {"brackets_map": LineMap.identity(size)}
+    origins = []
+    replaced = replace_bracket_contents(text, bracket_contents, origins)
+    return replaced, {"brackets_map": LineMap.from_origins(origins, size)}
+
+
+def _normalized(text, speaker_groups=None):
+    # ersetzt werden nur ganze Sprecherzeilen, die Zeilen bleiben dieselben
+    return normalize_speakers(text, speaker_groups or {}), {"normalized_map": LineMap.identity(len(text_to_lines(text)))}
+
+
+def _cleaned(text, keep_linebreaks=False, dehyphenate=False, word_list=None):
+    lines = text_to_lines(text)
+    # Trennstriche am Zeilenende gegen die Wörter des Dramas (und ggf. eine Wortliste) prüfen
+    lexicon = Lexicon.from_lines(lines, word_list) if dehyphenate and not keep_linebreaks else None
+    origins = []
+    cleaned = lines_to_text(clean_text_lines(lines, keep_linebreaks=keep_linebreaks, lexicon=lexicon, origins=origins))
+    return cleaned, {"cleaned_map": LineMap.from_origins(origins, len(lines))}
+
+
+# TEI-Elemente, deren Anzahl im Bericht erscheint
+TEI_COUNTED_ELEMENTS = ("div", "sp", "speaker", "stage", "p", "l", "castItem", "person")
+
+
+def _today():
+    return datetime.today().strftime("%Y-%m-%d")
+
+
+def _tei(text, bracketstages=True, is_prose=True, dracor_id="ger000000", dracor_lang="de",
+         today=None, speaker_id_cache=None, progress=None):
+    # today fließt nur in den Schlüssel ein: der Parser schreibt das aktuelle Datum in den Header
+    from modules.DraCorParser import Parser
+    parser = Parser(
+        bracketstages=bracketstages,
+        is_prose=is_prose,
+        dracor_id=dracor_id,
+        dracor_lang=dracor_lang,
+        speaker_id_cache=speaker_id_cache,
+    )
+    lines = text_to_lines(text)
+    parser.parse_lines_to_xml(lines, progress)
+    record("input_lines", len(lines))
+    # ein Durchlauf über den fertigen Baum für alle Zähler
+    element_counts = Counter(tag.name for tag in parser.tree_root.find_all(True))
+    for element in TEI_COUNTED_ELEMENTS:
+        record(f"tei_{element}", element_counts[element])
+    return parser.tree_to_write
+
+
+def default_stages(speaker_id_cache=None, page_cache=None):
+    """
+    Die Schritte 1–6 der App als Graph:
+
+        pages ─┬─ preprocess ── speakers ─┐
+               └──────────────────────────┴─ ezdrama ── speaker_fix ── brackets
+                                                  ── normalized ── cleaned ── tei
+
+    "ezdrama" liefert im selben Durchlauf "ezlines" mit, die Herkunft seiner Zeilen.
+    Die Schritte 2–5 liefern zusätzlich "<schritt>_map", die Zuordnung der Zeilen ihres
+    Ergebnisses zu ihren Eingabezeilen (LineMap), im selben Durchlauf mit.
+
+    "speakers" übernimmt die Sprecherkandidaten automatisch; die App übergibt
+    stattdessen die von Hand gewählten Sprecher als Quelle "speakers".
+
+    Mit einem PageCache (modules/PageCache.py) verarbeiten "preprocess" und "ezdrama"
+    nur neue oder geänderte Seiten neu; die Ergebnisse sind dieselben.
+    """
+
+    def preprocess(pages, **options):
+        return _preprocess(pages, page_cache=page_cache, **options)
+
+    def ezdrama(pages, speakers, **options):
+        return _ezdrama(pages, speakers, page_cache=page_cache, **options)
+
+    def tei(text, **options):
+        return _tei(text, speaker_id_cache=speaker_id_cache, **options)
+
+    return [
+        Stage("preprocess", preprocess, inputs=("pages",),
+              encode=_encode_preprocess, decode=_decode_preprocess, reports_progress=True),
+        Stage("speakers", _accept_speakers, inputs=("preprocess",),
+              encode=lambda speakers: json.dumps(speakers, ensure_ascii=False), decode=json.loads),
+        # "ezlines": Herkunft jeder Zeile im .ezlines-Format, für die Ablage als Base64
+        Stage("ezdrama", ezdrama, inputs=("pages", "speakers"), options={"metadata": ""},
+              reports_progress=True, companions={"ezlines": EZLINES_CODEC}),
+        Stage("speaker_fix", _speaker_fix, inputs=("ezdrama",), options={"speaker_line_selection": []},
+              companions={"speaker_fix_map": LINE_MAP_CODEC}),
+        Stage("brackets", _brackets, inputs=("speaker_fix",), options={"bracket_contents": None},
+              companions={"brackets_map": LINE_MAP_CODEC}),
+        Stage("normalized", _normalized, inputs=("brackets",), options={"speaker_groups": {}},
+              companions={"normalized_map": LINE_MAP_CODEC}),
+        Stage("cleaned", _cleaned, inputs=("normalized",), options={
+            "keep_linebreaks": False,
+            "dehyphenate": False,
+            "word_list": None,
+        }, companions={"cleaned_map": LINE_MAP_CODEC}),
+        Stage("tei", tei, inputs=("cleaned",), options={
+            "bracketstages": True,
+            "is_prose": True,
+            "dracor_id": "ger000000",
+            "dracor_lang": "de",
+            "today": _today,
+        }, reports_progress=True),
+    ]
+
+
+def build_pipeline(cache_dir=None, speaker_id_cache=None, store=None, metrics=None, profiler=None,
+                   page_cache=None):
+    """
+    Pipeline mit den Standard-Schritten und Ablage in cache_dir (DiskStore)
+    bzw. in der übergebenen Ablage store (z. B. MemoryStore). page_cache (PageCache)
+    hält zusätzlich die Ergebnisse pro Seite für schrittweise Importe.
+    """
+    return Pipeline(
+        default_stages(speaker_id_cache, page_cache),
+        store if store is not None else DiskStore(cache_dir),
+        metrics=metrics,
+        profiler=profiler,
+    )
@@ -0,0 +1,158 @@
+"""
+Profiling der Pipeline-Schritte mit cProfile und tracemalloc.
+
+Ist ein StageProfiler an die Pipeline übergeben (build_pipeline(..., profiler=...)),
+läuft jeder neu berechnete Schritt unter cProfile und tracemalloc. Je Schritt entstehen
+im Zielordner:
+
+    <schritt>.prof        cProfile-Daten (z. B. für snakeviz oder pstats)
+    <schritt>.stats.txt   die teuersten Funktionen nach kumulierter Zeit
+    <schritt>.alloc.txt   Spitzenverbrauch und die größten Speicherallokationen
+
+Ein erneuter Lauf eines Schritts überschreibt seine Dateien.
+
+cProfile kann seit Python 3.12 (sys.monitoring) nur einmal pro Prozess aktiv sein. Laufen
+profilierte Schritte gleichzeitig (Hintergrund-Jobs, mehrere Sitzungen), misst nur der
+erste cProfile; die übrigen laufen ohne cProfile weiter und vermerken das in ihrer
+.stats.txt, tracemalloc misst für alle. Ohne Profiler prüft die
+Pipeline nur, ob einer gesetzt ist; es entstehen keine weiteren Kosten.
+
+Eingeschaltet wird das Profiling über die Umgebungsvariable DRACOR_PROFILE=1
+oder in der App über die Seitenleiste.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules.Workspace import atomic_write_text
+
+PROFILE_ENV = "DRACOR_PROFILE"
+PROFILE_DIRNAME = "profiles"
+
+# tracemalloc ist prozessweit: gezählt wird, wie viele Schritte gerade messen
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+# hält der Schritt, dessen cProfile gerade aktiv ist
+_cprofile_lock = threading.Lock()
+
+
+def profiling_enabled_from_env():
+    return os.environ.get(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+def _enable_cprofile():
+    """Aktives cProfile.Profile oder None, wenn im Prozess schon ein Profiler läuft."""
+    if not _cprofile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # anderes Werkzeug auf sys.monitoring aktiv (z. B. Debugger oder coverage)
+        _cprofile_lock.release()
+        return None
+    except BaseException:
+        _cprofile_lock.release()
+        raise
+    return profiler
+
+
+def _disable_cprofile(profiler):
+    if profiler is not None:
+        profiler.disable()
+        _cprofile_lock.release()
+
+
+class StageProfiler:
+    """
+    Schreibt Profile der Pipeline-Schritte nach output_dir.
+
+    Parameter:
+        output_dir (str): Zielordner, z. B. <arbeitsbereich>/profiles
+        top (int): Anzahl der Einträge in den Textberichten
+    """
+
+    def __init__(self, output_dir, top=30):
+        self.output_dir = str(output_dir)
+        self.top = top
+
+    @contextmanager
+    def profile(self, stage_name):
+        profiler = _enable_cprofile()
+        try:
+            _start_tracing()
+        except BaseException:
+            _disable_cprofile(profiler)
+            raise
+        try:
+            tracemalloc.reset_peak()
+            yield
+        finally:
+            _disable_cprofile(profiler)
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            _stop_tracing()
+            self._write(stage_name, profiler, snapshot, current, peak)
+
+    def files(self):
+        """Alle bisher geschriebenen Profil-Dateien, sortiert."""
+        if not os.path.isdir(self.output_dir):
+            return []
+        return [os.path.join(self.output_dir, name) for name in sorted(os.listdir(self.output_dir))]
+
+    def _write(self, stage_name, profiler, snapshot, current, peak):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, stage_name)
+        created = datetime.now().isoformat(timespec="seconds")
+
+        stats_text = io.StringIO()
+        if profiler is not None:
+            profiler.dump_stats(base + ".prof")
+            stats = pstats.Stats(profiler, stream=stats_text)
+            stats.sort_stats("cumulative").print_stats(self.top)
+        else:
+            # keine veraltete .prof-Datei eines früheren Laufs stehen lassen
+            if os.path.exists(base + ".prof"):
+                os.remove(base + ".prof")
+            stats_text.write("cProfile übersprungen: im Prozess war bereits ein anderes Profiling aktiv.\n")
+        atomic_write_text(base + ".stats.txt", f"Schritt {stage_name}, {created}\n{stats_text.getvalue()}")
+
+        # Dateien von tracemalloc und diesem Modul selbst ausblenden
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        lines = [
+            f"Schritt {stage_name}, {created}",
+            f"Spitzenverbrauch: {peak / 1024 / 1024:.2f} MB, am Ende belegt: {current / 1024 / 1024:.2f} MB",
+            "(tracemalloc misst prozessweit; parallel laufende Schritte sind mitgezählt)",
+            "",
+            f"Größte Allokationen (Top {self.top}):",
+        ]
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} Blöcke  {frame.filename}:{frame.lineno}")
+        atomic_write_text(base + ".alloc.txt", "\n".join(lines) + "\n")
@@ -0,0 +1,178 @@
+"""
+Herkunft der Zeilen späterer Schritte: welche Zeile der EzDrama-Gesamtausgabe (Schritt 1)
+steckt hinter einer Zeile von Schritt 2–5?
+
+Die Schritte 2–5 teilen Zeilen (Sprecher in eigene Zeile), ersetzen Klammerinhalte über
+Zeilengrenzen hinweg und ziehen in Schritt 5 ganze Absätze zu einer Zeile zusammen. Jeder
+Schritt liefert dazu im selben Durchlauf eine LineMap von seiner Ausgabe auf seine
+Eingabe mit (Ergebnisse "<schritt>_map" der Pipeline); hintereinander gesetzt (LineMap.then) ergibt sich die
+Zuordnung bis zu Schritt 1 und über die .ezlines-Datei (modules/EzLines.py) weiter zu
+Seite, TextRegion und TextLine der PAGE-Vorlage.
+
+Eine LineMap speichert nur die Stellen, an denen die Zuordnung springt. Zwischen zwei
+solchen Stellen entspricht jede Ausgabezeile der jeweils nächsten Eingabezeile; das
+Nachschlagen einer Zeile ist eine binäre Suche über diese Stellen.
+"""
+
+import difflib
+import json
+from bisect import bisect_right
+
+
+class LineMap:
+    """
+    Zuordnung der Ausgabezeilen eines Schritts zur jeweils ersten Eingabezeile, aus der
+    sie entstanden sind. Ab Ausgabezeile out_starts[k] gilt
+    Eingabezeile = in_starts[k] + (Ausgabezeile - out_starts[k]).
+    size ist die Zahl der Ausgabe-, input_size die der Eingabezeilen.
+    """
+
+    def __init__(self, out_starts, in_starts, size, input_size):
+        self.out_starts = list(out_starts)
+        self.in_starts = list(in_starts)
+        self.size = size
+        self.input_size = input_size
+
+    @classmethod
+    def identity(cls, size):
+        return cls([0] if size else [], [0] if size else [], size, size)
+
+    @classmethod
+    def from_origins(cls, origins, input_size):
+        """LineMap aus der ersten Eingabezeile je Ausgabezeile (aufsteigend)."""
+        out_starts = []
+        in_starts = []
+        for line, origin in enumerate(origins):
+            if not out_starts or origin != in_starts[-1] + line - out_starts[-1]:
+                out_starts.append(line)
+                in_starts.append(origin)
+        return cls(out_starts, in_starts, len(origins), input_size)
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        return isinstance(other, LineMap) and self.to_dict() == other.to_dict()
+
+    def origin(self, line):
+        """Erste Eingabezeile der Ausgabezeile line (0-basiert)."""
+        if not 0 <= line < self.size:
+            raise IndexError(f"Zeile {line} außerhalb von 0..{self.size - 1}")
+        k = bisect_right(self.out_starts, line) - 1
+        return self.in_starts[k] + line - self.out_starts[k]
+
+    def origins(self):
+        """Erste Eingabezeile je Ausgabezeile als Liste."""
+        result = []
+        bounds = self.out_starts[1:] + [self.size]
+        for out_start, in_start, out_stop in zip(self.out_starts, self.in_starts, bounds):
+            result.extend(range(in_start, in_start + out_stop - out_start))
+        return result
+
+    def input_range(self, line):
+        """
+        Eingabezeilen (start, stop) der Ausgabezeile line. Zusammengezogene Zeilen
+        umfassen alle Eingabezeilen bis zur ersten Zeile der folgenden Ausgabezeile.
+        """
+        start = self.origin(line)
+        stop = self.origin(line + 1) if line + 1 < self.size else self.input_size
+        return start, max(stop, start + 1)
+
+    def then(self, other):
+        """Hintereinander: self (A → B), dann other (B → C) ergibt A → C."""
+        last = other.size - 1
+        return LineMap.from_origins(
+            [other.origin(min(origin, last)) for origin in self.origins()] if other.size else [],
+            other.input_size,
+        )
+
+    def patched(self, start, stop, new_count):
+        """
+        Zuordnung, nachdem die Ausgabezeilen start:stop durch new_count neue Zeilen ersetzt
+        wurden (Editor). Neue Zeilen übernehmen die Herkunft der ersetzten Zeile an
+        derselben Position, überzählige die der letzten ersetzten Zeile.
+        """
+        origins = self.origins()
+        origins[start:stop] = _replaced_origins(origins, start, stop, new_count, self.input_size)
+        return LineMap.from_origins(origins, self.input_size)
+
+    def diffed(self, old_lines, new_lines):
+        """Zuordnung für new_lines, wenn die Ausgabe old_lines ohne bekannte Stelle geändert wurde."""
+        origins = self.origins()
+        result = []
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                result.extend(origins[i1:i2])
+            else:
+                result.extend(_replaced_origins(origins, i1, i2, j2 - j1, self.input_size))
+        return LineMap.from_origins(result, self.input_size)
+
+    def to_dict(self):
+        return {"size": self.size, "input_size": self.input_size, "out": self.out_starts, "in": self.in_starts}
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, data):
+        value = json.loads(data)
+        return cls(value["out"], value["in"], value["size"], value["input_size"])
+
+
+def _replaced_origins(origins, start, stop, new_count, input_size):
+    if stop > start:
+        return [origins[min(start + k, stop - 1)] for k in range(new_count)]
+    # eingefügte Zeilen gehören zur Zeile davor (bzw. danach am Textanfang)
+    if start > 0:
+        anchor = origins[start - 1]
+    elif origins:
+        anchor = origins[0]
+    else:
+        anchor = 0 if input_size else -1
+    return [anchor] * new_count if anchor >= 0 else []
+
+
+def chain(*line_maps):
+    """Setzt die LineMaps der Schritte (spätester zuerst) zu einer Zuordnung zusammen."""
+    result = line_maps[0]
+    for line_map in line_maps[1:]:
+        result = result.then(line_map)
+    return result
+
+
+def line_sources(line_map, ezlines, line):
+    """
+    PAGE-Herkunft der Ausgabezeile line: die Quellen (dicts wie EzLines.source) aller
+    EzDrama-Zeilen, aus denen sie entstanden ist, ohne Wiederholungen und ohne Zeilen
+    ohne Herkunft.
+    """
+    start, stop = line_map.input_range(line)
+    sources = []
+    seen = set()
+    for ezdrama_line in range(start, min(stop, len(ezlines))):
+        source = ezlines.source(ezdrama_line)
+        if source is None:
+            continue
+        key = (source["page"], source["line_id"])
+        if key not in seen:
+            seen.add(key)
+            sources.append(source)
+    return sources
+
+
+def first_line_sources(line_map, ezlines):
+    """
+    Herkunft jeder Ausgabezeile in der Form von encode_ezlines: die erste EzDrama-Zeile
+    mit Herkunft, aus der sie entstanden ist, sonst None.
+    """
+    result = []
+    for line in range(line_map.size):
+        sources = line_sources(line_map, ezlines, line)
+        if sources:
+            source = sources[0]
+            result.append((source["page"], source["region_id"], source["region_type"],
+                           source["line_id"], source["box"]))
+        else:
+            result.append(None)
+    return result
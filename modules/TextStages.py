@@ -0,0 +1,383 @@
+"""
+Textbasierte Verarbeitungsschritte der Pipeline, die ohne Benutzeroberfläche
+auskommen und daher sowohl von der Streamlit-App als auch im Batch-Betrieb
+verwendet werden.
+"""
+
+import re
+
+SPEAKER_PATTERN = re.compile(r"^@(.*)\.$")
+BRACKET_PATTERN = re.compile(r"(?s)(\(.*?\))")
+
+
+def text_to_lines(text):
+    """
+    Zerlegt einen Text wie readlines() in Zeilen mit Zeilenende.
+    """
+    lines = text.split("\n")
+    result = [line + "\n" for line in lines[:-1]]
+    if lines[-1]:
+        result.append(lines[-1])
+    return result
+
+
+def lines_to_text(lines):
+    """
+    Fügt Zeilen ohne Zeilenende zu einem Text zusammen (eine Zeile pro Zeile der Datei).
+    """
+    return "".join(line + "\n" for line in lines)
+
+
+# -------- Schritt 2: Übersehene Speaker finden --------
+
+def _marked_speakers(lines):
+    speakers = set()
+    for line in lines:
+        match = SPEAKER_PATTERN.match(line.strip())
+        if match:
+            speakers.add(match.group(1))
+    return speakers
+
+
+def find_speaker_lines(lines):
+    """
+    Sucht Zeilen, die mit einem bereits als @Sprecher. markierten Namen beginnen,
+    aber selbst nicht markiert sind.
+
+    Rückgabe:
+        List[Tuple[int, str, str]]: (Zeilenindex, Sprecher, Zeile)
+    """
+    speakers = _marked_speakers(lines)
+    found_lines = []
+    for idx, line in enumerate(lines):
+        line_stripped = line.strip()
+        for speaker in speakers:
+            if line_stripped.startswith(speaker + " ") or line_stripped == speaker:
+                found_lines.append((idx, speaker, line.rstrip("\n")))
+                break
+    return found_lines
+
+
+def fix_speaker_lines(lines, selected_indices, origins=None):
+    """
+    Schreibt die ausgewählten Zeilen in eine @Sprecher.-Zeile und den Rest der Zeile um.
+    Ist origins eine Liste, wird für jede Ausgabezeile ihr Eingabeindex angehängt
+    (siehe modules/Provenance.py).
+
+    Rückgabe:
+        List[str]: Zeilen ohne Zeilenende
+    """
+    speakers = _marked_speakers(lines)
+    selected_indices = set(selected_indices)
+
+    processed_lines = []
+    for i, raw in enumerate(lines):
+        line = raw.rstrip("\n")
+        line_stripped = line.strip()
+
+        matched = False
+        if i in selected_indices:
+            for speaker in speakers:
+                if line_stripped.startswith(speaker + " ") or line_stripped == speaker:
+                    rest = line_stripped[len(speaker):].lstrip()
+                    processed_lines.append(f"@{speaker}.")
+                    if rest:
+                        processed_lines.append(rest)
+                    if origins is not None:
+                        origins.extend([i] * (2 if rest else 1))
+                    matched = True
+                    break
+
+        if not matched:
+            processed_lines.append(line)
+            if origins is not None:
+                origins.append(i)
+    return processed_lines
+
+
+# -------- Schritt 3: Klammer-Zeilen --------
+
+def extract_bracket_contents(text):
+    """
+    Extrahiert alle Klammerinhalte (auch über Zeilenumbrüche hinweg).
+    """
+    return BRACKET_PATTERN.findall(text)
+
+
+def replace_bracket_contents(text, new_contents, origins=None):
+    """
+    Ersetzt die Klammerinhalte der Reihe nach durch new_contents.
+    Ist origins eine Liste, wird für jede Zeile des Ergebnisses die Eingabezeile angehängt,
+    aus der sie stammt; Zeilen eines ersetzten Inhalts zählen zu den Zeilen des alten Inhalts.
+    """
+    replacer = iter(new_contents)
+    if origins is None:
+        def replace_match(match):
+            return next(replacer)
+
+        return BRACKET_PATTERN.sub(replace_match, text, count=len(new_contents))
+
+    parts = []
+    position = 0
+    line = 0
+    result_origins = [0]
+    for match, new_content in zip(BRACKET_PATTERN.finditer(text), replacer):
+        unchanged = text.count("\n", position, match.start())
+        result_origins.extend(range(line + 1, line + unchanged + 1))
+        line += unchanged
+        old_breaks = match.group().count("\n")
+        result_origins.extend(line + min(k, old_breaks) for k in range(1, new_content.count("\n") + 1))
+        line += old_breaks
+        parts.append(text[position:match.start()])
+        parts.append(new_content)
+        position = match.end()
+    result_origins.extend(range(line + 1, line + text.count("\n", position) + 1))
+    parts.append(text[position:])
+
+    result = "".join(parts)
+    origins.extend(result_origins[:len(text_to_lines(result))])
+    return result
+
+
+# -------- Schritt 4: Speaker-Normalisierung --------
+
+def find_speakers(text):
+    """
+    Liefert alle unterschiedlichen Sprecherzeilen (ohne @) sortiert zurück.
+    """
+    return sorted(set(re.findall(r"^@(.*?)$", text, re.MULTILINE)))
+
+
+def normalize_speakers(text, speaker_groups):
+    """
+    Ersetzt alle Sprecher-Varianten durch den Namen ihrer Gruppe.
+
+    Parameter:
+        speaker_groups (Dict[str, List[str]]): Gruppenname (z. B. "@Georg.") -> Varianten
+    """
+    normalized_text = text
+    for group_name, variants in speaker_groups.items():
+        for variant in variants:
+            pattern = r"^@" + re.escape(variant) + r"$"
+            normalized_text = re.sub(pattern, group_name, normalized_text, flags=re.MULTILINE)
+    return normalized_text
+
+
+# -------- Schritt 5: Gesamttext bereinigen --------
+
+# Zeichen- und Schreibweisen-Normalisierung für den Gesamttext
+replacements = {
+    "ſ": "s", "ʒ": "z", "Ʒ": "Z",
+    "aͤ": "ä", "oͤ": "ö", "uͤ": "ü",
+    "Jch": "Ich", "Jtzt": "Itzt", "Jst": "Ist",
+    "Jn": "In", "Jm": "Im", "Jhm": "Ihm",
+    "Jhn": "Ihn", "Jhr": "Ihr", "Jr": "Ir"
+}
+
+
+def normalize_text(text: str) -> str:
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    return text
+
+
+def process_line(line):
+    """
+    Entfernt einen Trennstrich am Zeilenende und meldet, ob die Zeile
+    mit der folgenden zusammengezogen werden muss.
+    """
+    line = line.rstrip()
+    if line.endswith("-") and not line.endswith(" -") and not line.endswith("--"):
+        return line[:-1], True
+    return line, False
+
+
+def _clean_keep_linebreaks(lines, origins=None):
+    if origins is not None:
+        # jede Eingabezeile ergibt genau eine Ausgabezeile
+        origins.extend(range(len(lines)))
+    cleaned_lines = []
+    i = 0
+    while i < len(lines):
+        raw = lines[i].rstrip("\n")
+        # Leerzeilen beibehalten
+        if raw.strip() == "":
+            cleaned_lines.append("")
+            i += 1
+            continue
+
+        line = raw.strip()
+
+        # Versmodus-Marker (~): nur normalisieren und übernehmen
+        if line.startswith("~"):
+            cleaned_lines.append(normalize_text(line))
+            i += 1
+            continue
+
+        # Sprecherzeile (@): NICHT mit folgender Klammerzeile mergen
+        if line.startswith("@"):
+            cleaned_lines.append(line)  # unverändert, aber unten global normalisiert
+            i += 1
+            continue
+
+        # Regie-/Blockzeilen ($): jede Zeile separat übernehmen, kein Mergen
+        if line.startswith("$"):
+            cleaned_lines.append("$" + line[1:].strip())
+            i += 1
+            continue
+
+        # Überschriften/Marker: unverändert durchreichen
+        if line.startswith(("#", "^")):
+            cleaned_lines.append(line)
+            i += 1
+            continue
+
+        # Standardzeile: keine Silbentrennungs-Merges
+        cleaned_lines.append(line)
+        i += 1
+
+    # am Ende nur Zeichennormalisierung anwenden
+    return [normalize_text(l) if l else "" for l in cleaned_lines]
+
+
+def _join_lines(left, right, lexicon):
+    # left endet auf einen entfernten Trennstrich; ohne Lexicon wird immer zusammengezogen
+    if lexicon is None:
+        return left + right
+    return lexicon.join(left, right)
+
+
+def _clean_merge_lines(lines, lexicon=None, origins=None):
+    cleaned_lines = []
+    buffer = ""
+    buffer_origin = 0
+    verse_mode = False
+    # Herkunft je Ausgabezeile nur mitschreiben, wenn origins übergeben wurde
+    track = origins is not None
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            i += 1
+            continue
+
+        if line.startswith("~"):
+            verse_mode = True
+            if buffer:
+                cleaned_lines.append(buffer.strip())
+                buffer = ""
+                if track:
+                    origins.append(buffer_origin)
+            cleaned_lines.append(normalize_text(line.strip()))
+            if track:
+                origins.append(i)
+            i += 1
+            continue
+
+        if verse_mode:
+            if not line.startswith(("@", "#", "^", "$", "~", "(")):
+                cleaned_lines.append(normalize_text(line.strip()))
+                if track:
+                    origins.append(i)
+                i += 1
+                continue
+            else:
+                verse_mode = False
+
+        if line.startswith("@"):
+            verse_mode = False
+            if buffer:
+                cleaned_lines.append(buffer.strip())
+                buffer = ""
+                if track:
+                    origins.append(buffer_origin)
+            if track:
+                origins.append(i)
+            speaker_line = line
+            i += 1
+            if i < len(lines):
+                next_line = lines[i].strip()
+                if next_line.startswith("(") and next_line.endswith(")"):
+                    speaker_line += f" {next_line}"
+                    i += 1
+            cleaned_lines.append(speaker_line)
+            continue
+
+        if line.startswith("$"):
+            verse_mode = False
+            block_origin = i
+            combined_line, is_hyphenated = process_line(line[1:].strip())
+            i += 1
+            while i < len(lines) and lines[i].strip().startswith("$"):
+                next_line_content = lines[i].strip()[1:].strip()
+                processed_next, next_is_hyphenated = process_line(next_line_content)
+                if is_hyphenated:
+                    combined_line = _join_lines(combined_line, processed_next, lexicon)
+                else:
+                    combined_line += " " + processed_next
+                is_hyphenated = next_is_hyphenated
+                i += 1
+            if buffer:
+                cleaned_lines.append(buffer.strip())
+                buffer = ""
+                if track:
+                    origins.append(buffer_origin)
+            cleaned_lines.append("$" + combined_line.strip())
+            if track:
+                origins.append(block_origin)
+            continue
+
+        if line.startswith(("#", "^")):
+            verse_mode = False
+            if buffer:
+                cleaned_lines.append(buffer.strip())
+                buffer = ""
+                if track:
+                    origins.append(buffer_origin)
+            cleaned_lines.append(line)
+            if track:
+                origins.append(i)
+            i += 1
+            continue
+
+        processed_line, is_hyphenated = process_line(line)
+        if not buffer:
+            buffer_origin = i
+        buffer += " " + processed_line
+
+        while is_hyphenated and i + 1 < len(lines):
+            i += 1
+            next_line = lines[i].strip()
+            processed_line, is_hyphenated = process_line(next_line)
+            buffer = _join_lines(buffer, processed_line, lexicon)
+
+        i += 1
+
+    if buffer:
+        cleaned_lines.append(buffer.strip())
+        if track:
+            origins.append(buffer_origin)
+
+    return [normalize_text(line) for line in cleaned_lines]
+
+
+def clean_text_lines(lines, keep_linebreaks=False, lexicon=None, origins=None):
+    """
+    Bereinigt den Gesamttext (Schritt 5).
+
+    Parameter:
+        lines (List[str]): Zeilen der Eingabedatei (z. B. aus readlines())
+        keep_linebreaks (bool): Zeilenumbrüche behalten statt Absätze
+            zusammenzuführen und Silbentrennungen aufzulösen
+        lexicon (Lexicon): optional, entscheidet je Trennstrich am Zeilenende, ob
+            zusammengezogen oder der Bindestrich behalten wird (siehe modules/Dehyphenation.py)
+        origins (list): optional, erhält je Ausgabezeile den Index ihrer ersten Eingabezeile
+            (siehe modules/Provenance.py)
+
+    Rückgabe:
+        List[str]: bereinigte Zeilen ohne Zeilenende
+    """
+    if keep_linebreaks:
+        return _clean_keep_linebreaks(lines, origins)
+    return _clean_merge_lines(lines, lexicon, origins)
@@ -0,0 +1,205 @@
+"""
+Arbeitsbereich einer Sitzung bzw. eines Dramas.
+
+Alle Dateien einer Sitzung liegen unter einem eigenen Wurzelordner:
+
+    <root>/pages/   hochgeladene PAGE-XML-Dateien
+    <root>/output/  Zwischenstände der Schritte 1–6
+    <root>/cache/   Ablage der Pipeline-Ergebnisse
+
+Dadurch können mehrere Nutzer gleichzeitig mit derselben Server-Instanz arbeiten,
+ohne sich gegenseitig Dateien zu überschreiben. Geschrieben wird atomar
+(temporäre Datei + os.replace), sodass nie eine halb geschriebene Datei gelesen wird.
+
+Während der Bearbeitung hält StageBuffers die Zwischenstände im Speicher; auf die
+Festplatte kommen sie erst beim Export oder bei einem Sicherungspunkt (checkpoint).
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from modules.TextStages import text_to_lines
+
+# Dateinamen der Zwischenstände je Pipeline-Schritt
+STAGE_FILES = {
+    "ezdrama": "1_drama_preprocessed.txt",
+    "speaker_fix": "2_drama_speaker_fixed.txt",
+    "brackets": "3_drama_brackets_fixed.txt",
+    "normalized": "4_normalized_speakers.txt",
+    "cleaned": "5_drama_text_cleaned.txt",
+    "tei": "5_drama_text_cleaned.xml",
+}
+
+# leere Datei, deren mtime die letzte Benutzung markiert (siehe modules/Janitor.py)
+ACTIVITY_FILE = ".last_access"
+
+# Puffergröße beim Kopieren von Datenströmen
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _atomic_write(path, write):
+    """
+    Schreibt atomar nach path: write(datei) schreibt in eine temporäre Datei im selben
+    Ordner, die danach per os.replace an den Zielort verschoben wird.
+    """
+    path = os.fspath(path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_bytes(path, data):
+    _atomic_write(path, lambda f: f.write(data))
+
+
+def atomic_write_stream(path, stream):
+    """Kopiert ein binäres Dateiobjekt mit begrenztem Puffer atomar nach path."""
+    _atomic_write(path, lambda f: shutil.copyfileobj(stream, f, COPY_BUFFER_SIZE))
+
+
+def atomic_write_text(path, text):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+class Workspace:
+    """
+    Ordnerstruktur einer Sitzung unter root (siehe Moduldokumentation).
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.pages_dir = self.root / "pages"
+        self.output_dir = self.root / "output"
+        self.cache_dir = self.root / "cache"
+        for directory in (self.pages_dir, self.output_dir, self.cache_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def touch(self):
+        """Markiert den Arbeitsbereich als gerade benutzt."""
+        (self.root / ACTIVITY_FILE).touch()
+
+    def stage_path(self, stage_name):
+        """Pfad des Zwischenstands eines Pipeline-Schritts (siehe STAGE_FILES)."""
+        return self.output_dir / STAGE_FILES[stage_name]
+
+    def write_stage(self, stage_name, text):
+        path = self.stage_path(stage_name)
+        atomic_write_text(path, text)
+        return path
+
+    def read_stage(self, stage_name):
+        with open(self.stage_path(stage_name), "r", encoding="utf-8") as f:
+            return f.read()
+
+
+class StageBuffers:
+    """
+    Zwischenstände der Pipeline-Schritte im Speicher einer Sitzung.
+
+    Texte werden als unveränderliche str abgelegt, die Zeilenliste (text_to_lines) wird
+    bei Bedarf einmal berechnet und als Tupel zwischengespeichert. Geänderte Schritte
+    werden als "dirty" markiert und erst durch checkpoint() bzw. export() geschrieben.
+    Fehlt ein Schritt im Speicher, wird ein früher gesicherter Stand von der Festplatte geladen.
+    revisions zählt die Änderungen je Schritt (z. B. für Widget-Keys im Editor).
+
+    line_maps hält je Schritt die Zuordnung seiner Zeilen zu den Zeilen von Schritt 1
+    (LineMap, siehe modules/Provenance.py); Änderungen im Editor werden darin nachgeführt.
+    """
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.texts = {}
+        self.dirty = set()
+        self.revisions = {}
+        self.line_maps = {}
+        self._lines = {}
+
+    def __contains__(self, stage_name):
+        return self.get(stage_name) is not None
+
+    def get(self, stage_name):
+        if stage_name not in self.texts:
+            try:
+                self.texts[stage_name] = self.workspace.read_stage(stage_name)
+            except FileNotFoundError:
+                return None
+        return self.texts[stage_name]
+
+    def lines(self, stage_name):
+        """Zeilen des Zwischenstands wie readlines(), als Tupel."""
+        if stage_name not in self._lines:
+            text = self.get(stage_name)
+            if text is None:
+                return None
+            self._lines[stage_name] = tuple(text_to_lines(text))
+        return self._lines[stage_name]
+
+    def line_map(self, stage_name):
+        """Zuordnung der Zeilen des Zwischenstands zu Schritt 1 oder None."""
+        return self.line_maps.get(stage_name)
+
+    def set(self, stage_name, text, line_map=None):
+        """
+        Setzt den Zwischenstand. Ohne line_map wird eine vorhandene Zuordnung über einen
+        Zeilenvergleich mit dem bisherigen Text nachgeführt (z. B. nach dem Editor).
+        """
+        if line_map is not None:
+            self.line_maps[stage_name] = line_map
+        if self.texts.get(stage_name) == text:
+            return
+        if line_map is None and stage_name in self.line_maps:
+            old_lines = self.lines(stage_name)
+            if old_lines is None:
+                del self.line_maps[stage_name]
+            else:
+                self.line_maps[stage_name] = self.line_maps[stage_name].diffed(old_lines, text_to_lines(text))
+        self.texts[stage_name] = text
+        self._lines.pop(stage_name, None)
+        self._changed(stage_name)
+
+    def patch(self, stage_name, start, stop, new_text):
+        """
+        Ersetzt die Zeilen start:stop des Zwischenstands durch new_text, ohne den übrigen
+        Text anzufassen. Fehlt am Ende von new_text der Zeilenumbruch, wird er ergänzt,
+        sofern noch Zeilen folgen.
+
+        Rückgabe:
+            int: Anzahl der neuen Zeilen
+        """
+        lines = self.lines(stage_name)
+        new_lines = text_to_lines(new_text)
+        if stop < len(lines) and new_lines and not new_lines[-1].endswith("\n"):
+            new_lines[-1] += "\n"
+        if tuple(new_lines) == lines[start:stop]:
+            return len(new_lines)
+        patched = lines[:start] + tuple(new_lines) + lines[stop:]
+        if stage_name in self.line_maps:
+            self.line_maps[stage_name] = self.line_maps[stage_name].patched(start, stop, len(new_lines))
+        self._lines[stage_name] = patched
+        self.texts[stage_name] = "".join(patched)
+        self._changed(stage_name)
+        return len(new_lines)
+
+    def _changed(self, stage_name):
+        self.dirty.add(stage_name)
+        self.revisions[stage_name] = self.revisions.get(stage_name, 0) + 1
+
+    def export(self, stage_name):
+        """Schreibt einen Zwischenstand auf die Festplatte und liefert den Pfad."""
+        path = self.workspace.write_stage(stage_name, self.texts[stage_name])
+        self.dirty.discard(stage_name)
+        return path
+
+    def checkpoint(self):
+        """Schreibt alle geänderten Zwischenstände; Rückgabe: Liste der Pfade."""
+        return [self.export(stage_name) for stage_name in sorted(self.dirty)]